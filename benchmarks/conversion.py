@@ -0,0 +1,110 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Benchmark for converting standard Sokoban levels.
+
+Converts synthetic square levels of increasing size with convert_level and reports
+the time per level and per square. Conversion should take time proportional to the
+number of squares, so the time per square should stay about the same as levels
+grow. The largest level is compared against a budget.
+
+Run from the root repository directory with
+
+    python3.9 -m benchmarks.conversion
+
+The exit status is nonzero if the budget is exceeded.
+
+"""
+import argparse
+import random
+import sys
+import time
+
+from src.sokoban_format import (
+    S_BOX,
+    S_FLOOR,
+    S_GOAL,
+    S_PLAYER,
+    S_WALL,
+    convert_level,
+)
+
+DEFAULT_SIZES = (50, 100, 200, 400)
+LARGEST_BUDGET_SECONDS = 0.5
+
+
+def make_level(size: int, seed: int = 0) -> list[str]:
+    """Return a size by size standard format level of rooms, boxes and goals.
+
+    The level is surrounded by blank space, so the conversion has to tell floor
+    from blanks.
+
+    """
+    rng = random.Random(seed)
+    inner = size - 4
+    rows = [S_FLOOR * size, S_FLOOR + S_WALL * (size - 2) + S_FLOOR]
+    for _ in range(inner):
+        squares = [
+            rng.choices((S_FLOOR, S_WALL, S_BOX, S_GOAL), (0.7, 0.2, 0.05, 0.05))[0]
+            for _ in range(inner)
+        ]
+        rows.append(S_FLOOR + S_WALL + "".join(squares) + S_WALL + S_FLOOR)
+    rows.append(rows[1])
+    rows.append(rows[0])
+    rows[2] = rows[2][:2] + S_PLAYER + rows[2][3:]
+    return rows
+
+
+def measure_conversion_time(orig_level: list[str], repeat: int) -> float:
+    """Return the best of repeat times, in seconds, to convert orig_level."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        convert_level(orig_level)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args: argparse.Namespace) -> int:
+    """Run the conversion benchmark and return the exit status."""
+    elapsed = 0.0
+    for size in args.sizes:
+        elapsed = measure_conversion_time(make_level(size), args.repeat)
+        print(
+            f"{size}x{size}: {elapsed * 1000:.1f} ms, "
+            f"{elapsed / (size * size) * 1e6:.2f} us per square"
+        )
+
+    largest = max(args.sizes)
+    verdict = "ok" if elapsed <= args.budget else "OVER BUDGET"
+    print(f"{largest}x{largest} budget {args.budget * 1000:.0f} ms {verdict}")
+    return 0 if elapsed <= args.budget else 1
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--sizes",
+        default=list(DEFAULT_SIZES),
+        help="side lengths of the levels to convert, in increasing order",
+        nargs="+",
+        type=int,
+    )
+    parser.add_argument(
+        "--repeat", default=3, help="runs per measurement, best is kept", type=int
+    )
+    parser.add_argument(
+        "--budget",
+        default=LARGEST_BUDGET_SECONDS,
+        help="budget in seconds for converting the largest level",
+        type=float,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
@@ -0,0 +1,94 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Benchmark for the memory used by a game session.
+
+Loads each level in the given level files, starts a game session (a Universe) for
+it, and reports how many bytes the session allocates, both on average and for the
+largest level in each file. The level map read from the level file is not counted,
+since it is shared by all sessions of a level.
+
+Run from the root repository directory with
+
+    python3.9 -m benchmarks.memory
+
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import NamedTuple, Sequence
+
+from src.levelloader import LevelLoader
+from src.universe import Universe
+from src.util import LEVELS_DIR, TEST_LEVELS_DIR
+
+DEFAULT_LEVEL_FILENAMES = (
+    TEST_LEVELS_DIR / "huge_level.txt",
+    *sorted(LEVELS_DIR.glob("xsokoban*.txt")),
+)
+
+
+class SessionMemory(NamedTuple):
+    """Bytes allocated by the sessions of one level file."""
+
+    level_filename: Path
+    levels: int
+    mean_bytes: float
+    max_bytes: int
+
+
+def measure_session_bytes(loader: LevelLoader, level_name: str) -> int:
+    """Return the bytes allocated by starting a session of level_name."""
+    level_map = loader.levels[level_name]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        univ = Universe(level_name, level_map, loader.symbols)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del univ
+    return after - before
+
+
+def measure_level_file(level_filename: Path) -> SessionMemory:
+    """Return the bytes allocated by sessions of each level in level_filename."""
+    loader = LevelLoader(level_filename)
+    sizes = [measure_session_bytes(loader, name) for name in loader.levels]
+    return SessionMemory(
+        level_filename, len(sizes), sum(sizes) / len(sizes), max(sizes)
+    )
+
+
+def main(args: argparse.Namespace) -> int:
+    """Run the memory benchmark and return the exit status."""
+    level_filenames: Sequence[Path] = args.level_filenames or DEFAULT_LEVEL_FILENAMES
+    for level_filename in level_filenames:
+        result = measure_level_file(level_filename)
+        print(
+            f"{result.level_filename.name}: {result.levels} levels, "
+            f"{result.mean_bytes:,.0f} bytes per session on average, "
+            f"{result.max_bytes:,} at most"
+        )
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "level_filenames",
+        help="level files to measure (default: huge_level.txt and the XSokoban packs)",
+        metavar="FILE",
+        nargs="*",
+        type=Path,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
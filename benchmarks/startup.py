@@ -0,0 +1,156 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Benchmark for game startup.
+
+Measures how long it takes to import the game's entry point modules and how long it
+takes rlsokoban.py to put its first screen on a terminal, and compares both against
+a budget. The first frame is timed by running the game in a pseudo-terminal and
+waiting for the game name to be written to it.
+
+Run from the root repository directory with
+
+    python3.9 -m benchmarks.startup
+
+The exit status is nonzero if a budget is exceeded.
+
+"""
+import argparse
+import fcntl
+import os
+import pty
+import select
+import signal
+import struct
+import subprocess
+import sys
+import termios
+import time
+from pathlib import Path
+
+from src.util import DEFAULT_LEVEL_FILENAME, GAME_NAME, QUIT, RoguelikeSokobanError
+
+IMPORT_BUDGET_SECONDS = 0.1
+FIRST_FRAME_BUDGET_SECONDS = 0.5
+
+_TERMINAL_SIZE = (24, 80)
+_FIRST_FRAME_TIMEOUT_SECONDS = 10.0
+
+
+def measure_import_time(module_name: str = "src.main") -> float:
+    """Return seconds needed to import module_name in a fresh interpreter."""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module_name}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    return float(result.stdout)
+
+
+def measure_first_frame_time(level_filename: Path, fast_start: bool = False) -> float:
+    """Return seconds from launching rlsokoban.py to its first screen."""
+    cmd = [sys.executable, "rlsokoban.py", "-L", str(level_filename)]
+    if fast_start:
+        cmd.append("--fast-start")
+
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        fcntl.ioctl(
+            sys.stdin.fileno(),
+            termios.TIOCSWINSZ,
+            struct.pack("HHHH", *_TERMINAL_SIZE, 0, 0),
+        )
+        os.environ.setdefault("TERM", "xterm")
+        os.execv(sys.executable, cmd)
+
+    output = b""
+    marker = GAME_NAME.encode()
+    try:
+        while marker not in output:
+            ready, _, _ = select.select([fd], [], [], _FIRST_FRAME_TIMEOUT_SECONDS)
+            if not ready:
+                raise RoguelikeSokobanError("timed out waiting for the first frame")
+            try:
+                output += os.read(fd, 4096)
+            except OSError as exc:
+                raise RoguelikeSokobanError(
+                    f"game exited before the first frame: {output!r}"
+                ) from exc
+        elapsed = time.perf_counter() - start
+        os.write(fd, f"{QUIT}\n".encode())
+    finally:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        os.waitpid(pid, 0)
+        os.close(fd)
+    return elapsed
+
+
+def main(args: argparse.Namespace) -> int:
+    """Run the startup benchmark and return the exit status."""
+    import_time = min(measure_import_time() for _ in range(args.repeat))
+    first_frame_time = min(
+        measure_first_frame_time(args.level_filename, args.fast_start)
+        for _ in range(args.repeat)
+    )
+
+    status = 0
+    for label, measured, budget in (
+        ("import time", import_time, args.import_budget),
+        ("time to first frame", first_frame_time, args.first_frame_budget),
+    ):
+        verdict = "ok" if measured <= budget else "OVER BUDGET"
+        print(
+            f"{label}: {measured * 1000:.1f} ms (budget {budget * 1000:.0f} ms) "
+            f"{verdict}"
+        )
+        if measured > budget:
+            status = 1
+    return status
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-L",
+        "--level-file",
+        default=DEFAULT_LEVEL_FILENAME,
+        dest="level_filename",
+        help="level file to start the game with",
+        metavar="FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--fast-start", action="store_true", help="start the game with --fast-start"
+    )
+    parser.add_argument(
+        "--repeat", default=5, help="runs per measurement, best is kept", type=int
+    )
+    parser.add_argument(
+        "--import-budget",
+        default=IMPORT_BUDGET_SECONDS,
+        help="import time budget in seconds",
+        type=float,
+    )
+    parser.add_argument(
+        "--first-frame-budget",
+        default=FIRST_FRAME_BUDGET_SECONDS,
+        help="time to first frame budget in seconds",
+        type=float,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
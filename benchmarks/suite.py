@@ -0,0 +1,295 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Benchmark suite for the game's hot paths, with regression checks.
+
+Each benchmark times one operation and reports the best time per call over several
+runs:
+
+    universe_init        creating a Universe for a large level
+    eval_action          one Universe.eval_action call
+    display_draw         one Display.draw call, on an in-memory screen
+    load/<level file>    loading and validating every level of a level file
+    update_best_score/*  saving a new best score, for each score storage
+    convert_level        converting a large standard format level
+
+Results can be written as JSON with --output. With --baseline, results are compared
+with a JSON file written earlier, and the exit status is nonzero if any benchmark
+is more than --threshold slower than its baseline. Baselines depend on the
+computer, so update the committed baseline with --update-baseline when the
+benchmarks themselves change or when moving to other hardware.
+
+Run from the root repository directory with
+
+    python3.9 -m benchmarks.suite --baseline benchmarks/baseline.json
+
+"""
+import argparse
+import curses
+import functools
+import itertools
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Iterator, Optional
+from unittest import mock
+
+from benchmarks.conversion import make_level
+from src.levelloader import LevelKey, LevelLoader, find_level_files
+from src.score_tracking import JournalScores, Scores, SqliteScores
+from src.sokoban_format import RL_SYMBOLS, convert_level
+from src.universe import Universe
+from src.util import LEVELS_DIR, UTF_8, Action
+
+DEFAULT_BASELINE_FILENAME = Path("benchmarks") / "baseline.json"
+DEFAULT_THRESHOLD = 0.5
+
+Results = dict[str, float]
+
+_SCREEN_SIZE = (50, 120)
+_MOVES = [Action.RIGHT] * 8 + [Action.DOWN] * 3 + [Action.LEFT] * 8 + [Action.UP] * 3
+
+
+class MemoryWindow:
+    """A curses window that draws into memory, for drawing without a terminal."""
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.clear()
+
+    def clear(self) -> None:
+        """Blank the window."""
+        self.chars = [[" "] * self.width for _ in range(self.height)]
+
+    def getbegyx(self) -> tuple[int, int]:
+        """Return the window's top left corner."""
+        return 0, 0
+
+    def getmaxyx(self) -> tuple[int, int]:
+        """Return the window's size."""
+        return self.height, self.width
+
+    def addch(self, y: int, x: int, char: str, attr: int = 0) -> None:
+        """Draw char at y, x."""
+        # pylint: disable=unused-argument
+        self.chars[y][x] = char
+
+    def noutrefresh(self, *args: int) -> None:
+        """Do nothing, there's no terminal to update."""
+
+
+def make_rl_level(size: int) -> list[str]:
+    """Return a size by size Roguelike Sokoban map of floor, boulders and pits."""
+    boulder, floor = RL_SYMBOLS["boulder"], RL_SYMBOLS["floor"]
+    rows = [
+        [boulder if (row_num + col_num) % 7 == 3 else floor for col_num in range(size)]
+        for row_num in range(size)
+    ]
+    rows[0][0] = RL_SYMBOLS["player"]
+    rows[-1][-1] = RL_SYMBOLS["pit"]
+    return ["".join(row) for row in rows]
+
+
+def measure(func: Callable[[], Any], number: int, repeat: int) -> float:
+    """Return the best time per call, in seconds, of repeat runs of number calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def bench_universe(repeat: int) -> Iterator[tuple[str, float]]:
+    """Time creating a Universe, evaluating actions in it and forking it."""
+    level_map = make_rl_level(100)
+    yield "universe_init", measure(
+        lambda: Universe("Benchmark", level_map, RL_SYMBOLS), 10, repeat
+    )
+
+    univ = Universe("Benchmark", level_map, RL_SYMBOLS)
+    moves = itertools.cycle(_MOVES)
+    yield "eval_action", measure(lambda: univ.eval_action(next(moves)), 1000, repeat)
+    yield "universe_fork", measure(univ.fork, 1000, repeat)
+
+
+def bench_display(repeat: int) -> Iterator[tuple[str, float]]:
+    """Time drawing a level on an in-memory screen."""
+    # pylint: disable=import-outside-toplevel
+    from src.display import Display
+
+    univ = Universe("Benchmark", make_rl_level(40), RL_SYMBOLS)
+    with mock.patch.object(curses, "newpad", MemoryWindow), mock.patch.object(
+        curses, "doupdate"
+    ), mock.patch.object(curses, "curs_set"):
+        scrn = MemoryWindow(*_SCREEN_SIZE)
+        disp = Display(scrn, univ, None)  # type: ignore[arg-type]
+        yield "display_draw", measure(lambda: disp.draw(univ), 20, repeat)
+
+
+def bench_level_loading(
+    repeat: int, level_filenames: list[Path]
+) -> Iterator[tuple[str, float]]:
+    """Time loading and validating every level of each level file."""
+
+    def load(level_filename: Path) -> None:
+        loader = LevelLoader(level_filename)
+        for level_name in loader.levels:
+            loader.levels[level_name]  # pylint: disable=pointless-statement
+
+    for level_filename in level_filenames:
+        yield f"load/{level_filename.name}", measure(
+            functools.partial(load, level_filename), 5, repeat
+        )
+
+
+def _measure_updates(scores: Scores, repeat: int) -> float:
+    """Return the time to save a new best score in scores."""
+    level = LevelKey("0" * 32, Path("benchmark.txt"), "Benchmark")
+    # Each update is a new best score, so each one is saved.
+    new_scores = iter(range(10**9, 0, -1))
+    return measure(
+        lambda: scores.update_best_score(level, next(new_scores)), 20, repeat
+    )
+
+
+def bench_scores(repeat: int) -> Iterator[tuple[str, float]]:
+    """Time saving a new best score with each kind of score storage."""
+    with TemporaryDirectory() as temp_dir_str:
+        temp_dir = Path(temp_dir_str)
+        yield "update_best_score/json", _measure_updates(
+            Scores(temp_dir / "scores.json"), repeat
+        )
+        yield "update_best_score/journal", _measure_updates(
+            JournalScores(temp_dir / "journal.json"), repeat
+        )
+        sqlite_scores = SqliteScores(temp_dir / "scores.db")
+        try:
+            yield "update_best_score/sqlite", _measure_updates(sqlite_scores, repeat)
+        finally:
+            sqlite_scores.close()
+
+
+def bench_conversion(repeat: int) -> Iterator[tuple[str, float]]:
+    """Time converting a large standard format level."""
+    orig_level = make_level(200)
+    yield "convert_level", measure(lambda: convert_level(orig_level), 3, repeat)
+
+
+def run_benchmarks(
+    repeat: int = 5, level_filenames: Optional[list[Path]] = None
+) -> Results:
+    """Run every benchmark and return the best time per call of each."""
+    if level_filenames is None:
+        level_filenames = find_level_files(LEVELS_DIR)
+    results: Results = {}
+    for benchmarks in (
+        bench_universe(repeat),
+        bench_display(repeat),
+        bench_level_loading(repeat, level_filenames),
+        bench_scores(repeat),
+        bench_conversion(repeat),
+    ):
+        results.update(benchmarks)
+    return results
+
+
+def find_regressions(
+    results: Results, baseline: Results, threshold: float
+) -> list[tuple[str, float, float]]:
+    """Return (name, result, baseline) for results more than threshold slower.
+
+    threshold is a fraction, so 0.5 means more than 50% slower than the baseline.
+    Benchmarks that aren't in both results and baseline are ignored.
+
+    """
+    return [
+        (name, result, baseline[name])
+        for name, result in results.items()
+        if name in baseline and result > baseline[name] * (1 + threshold)
+    ]
+
+
+def read_results(results_filename: Path) -> Results:
+    """Read results written by write_results(...)."""
+    results_data = json.loads(results_filename.read_text(encoding=UTF_8))
+    return {name: float(seconds) for name, seconds in results_data["results"].items()}
+
+
+def write_results(results_filename: Path, results: Results) -> None:
+    """Write results, along with the Python version and platform, as JSON."""
+    results_data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    results_filename.write_text(
+        json.dumps(results_data, indent=2, sort_keys=True) + "\n", encoding=UTF_8
+    )
+
+
+def main(args: argparse.Namespace) -> int:
+    """Run the benchmark suite and return the exit status."""
+    results = run_benchmarks(args.repeat)
+    baseline: Results = {}
+    if args.baseline is not None and not args.update_baseline:
+        baseline = read_results(args.baseline)
+    for name, seconds in results.items():
+        line = f"{name}: {seconds * 1e6:.1f} us"
+        if name in baseline:
+            line += f" (baseline {baseline[name] * 1e6:.1f} us)"
+        print(line)
+
+    if args.output is not None:
+        write_results(args.output, results)
+    if args.update_baseline:
+        write_results(args.baseline or DEFAULT_BASELINE_FILENAME, results)
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for name, result, baseline_result in regressions:
+        print(
+            f"REGRESSION {name}: {result / baseline_result - 1:.0%} slower "
+            f"than baseline"
+        )
+    return 1 if regressions else 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--repeat", default=5, help="runs per benchmark, best is kept", type=int
+    )
+    parser.add_argument(
+        "--output", help="write results as JSON to this file", type=Path
+    )
+    parser.add_argument(
+        "--baseline",
+        help=f"results to compare with, for example '{DEFAULT_BASELINE_FILENAME}'",
+        type=Path,
+    )
+    parser.add_argument(
+        "--threshold",
+        default=DEFAULT_THRESHOLD,
+        help="fraction slower than the baseline that counts as a regression",
+        type=float,
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results to the baseline file instead of comparing with it",
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
@@ -55,6 +55,12 @@ concerned is that that it describes walls that the player cannot cross, while
 Roguelike Sokoban describes the floor on which the player can move. This script
 will draw the floor after inspecting the walls.
 
+Standard format level collections, files with a .sok or .xsb suffix holding many
+levels separated by blank lines, can be converted too by selecting them with
+--glob. Their levels keep the titles from their "Title:" or ";" comment lines, and
+are read and converted a level at a time, so collections of any size can be
+converted.
+
 The levels created by this script have not all been playtested. It's possible
 some of them are unwinnable.
 
@@ -69,208 +75,180 @@ the test code for more information.
 
 """
 import argparse
-import copy
+import itertools
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-
-from src.levelloader import LevelsStr
+from typing import Iterable, Iterator, Optional
+
+from src.sokoban_format import (
+    RL_BOULDER,
+    RL_FLOOR,
+    RL_PIT,
+    RL_PLAYER,
+    STANDARD_FORMAT_SUFFIXES,
+    convert_level,
+    is_good_level,
+    iter_collection,
+    level_to_str,
+)
 from src.util import UTF_8, LevelFileConsts
 
-# Standard format
+DEFAULT_GROUP_SIZE = 10
+DEFAULT_OUTPUT_PREFIX = "xsokoban"
 
-S_WALL = "#"
-S_PLAYER = "@"
-S_PLAYER_ON_GOAL = "+"
-S_BOX = "$"
-S_BOX_ON_GOAL = "*"
-S_GOAL = "."
-S_FLOOR = " "
+# Levels sent to a worker process at a time.
+_BATCH_SIZE = 64
 
-# Roguelike Sokoban format
+_NUMBER_PATTERN = re.compile(r"(\d+)")
 
-RL_HORIZ_WALL = "-"
-RL_VERT_WALL = "|"
-RL_PLAYER = "@"
-RL_BOULDER = "0"
-RL_PIT = "^"
-RL_FLOOR = "."
+# A level's name and map lines.
+InputLevel = tuple[str, list[str]]
+# A converted level's name and map, or None if it can't be played.
+ConvertedLevel = tuple[str, Optional[str]]
 
-# Temp
 
-TEMP_FLOOR = "F"
+def get_level_name(filename: Path) -> str:
+    """Return the name of the level in the single level file "filename".
 
-_Level = list[list[str]]
+    The name is "XSokoban level <number>", where the number is the filename's
+    suffix, or "XSokoban level <filename>" if the suffix isn't a number.
+
+    """
+    # [1:] skips the leading '.'
+    level_number = filename.suffix[1:]
+    if not level_number.isdigit():
+        level_number = filename.name
+    return f"XSokoban level {level_number}"
 
 
-def rewrite_floor(level: _Level) -> None:
-    """Do first pass for floors.
+def _natural_sort_key(filename: Path) -> list[object]:
+    """Return a key that sorts "screen.2" before "screen.10"."""
+    return [
+        int(part) if part.isdigit() else part
+        for part in _NUMBER_PATTERN.split(filename.name)
+    ]
 
-    Go through level and figure out which blanks are floor and which are
-    just blanks. Change the floor-blanks to TEMP_FLOOR for later processing.
-    Leave non-floor-blanks as they are.
 
-    """
-    objects = [S_WALL, S_PLAYER, S_BOX, S_GOAL]
-    orig_level = copy.deepcopy(level)
-    for row_num, row in enumerate(orig_level):
-        for col_num, square in enumerate(row):
-            if square == " ":
-                object_in_each_dir = True
-
-                object_found = False
-                for i in range(row_num, -1, -1):
-                    if orig_level[i][col_num] in objects:
-                        object_found = True
-                        break
-                object_in_each_dir = object_in_each_dir and object_found
-
-                object_found = False
-                for i in range(row_num, len(level)):
-                    if orig_level[i][col_num] in objects:
-                        object_found = True
-                        break
-                object_in_each_dir = object_in_each_dir and object_found
-
-                object_found = False
-                for j in range(col_num, -1, -1):
-                    if orig_level[row_num][j] in objects:
-                        object_found = True
-                        break
-                object_in_each_dir = object_in_each_dir and object_found
-
-                object_found = False
-                for j in range(col_num, len(row)):
-                    if orig_level[row_num][j] in objects:
-                        object_found = True
-                        break
-                object_in_each_dir = object_in_each_dir and object_found
-
-                if object_in_each_dir:
-                    level[row_num][col_num] = TEMP_FLOOR
-
-
-def is_sideways_wall(level: _Level, i: int, j: int) -> bool:
-    """Return True if wall level[i][j] should be written with a "-", False
-    otherwise.
+def get_input_filenames(
+    input_dir: Path, max_level: int, globs: Optional[list[str]] = None
+) -> list[Path]:
+    """Get the XSokoban files to convert, in level order.
 
-    """
-    # Set each value wall_x to True if there is a wall in x direction, False if not.
-    wall_above = (i > 0) and (level[i - 1][j] == S_WALL)
-    wall_below = (i < len(level) - 1) and (level[i + 1][j] == S_WALL)
-    wall_left = (j > 0) and (level[i][j - 1] == S_WALL)
-    wall_right = (j < len(level[0]) - 1) and (level[i][j + 1] == S_WALL)
-
-    wall_status = [wall_above, wall_below, wall_left, wall_right]
-    if sum(wall_status) == 1:
-        if not (wall_above or wall_below):
-            return True
-    if sum(wall_status) == 2:
-        if not (wall_above and wall_below):
-            return True
-    if sum(wall_status) == 3:
-        return True
-    return False
-
-
-def rewrite_walls(level: _Level) -> None:
-    """Rewrite walls.
-
-    Go through level and rewrite each wall from "#" to either "-" or "|"
-    depending on what other walls are around it. Uses is_sideways_wall(...).
+    Without globs these are "screen.1" to "screen.<max_level>". Otherwise they are
+    the files in input_dir matching any of globs, sorted with numbers in their
+    names in numeric order.
 
     """
-    orig_level = copy.deepcopy(level)
-    for row_num, row in enumerate(orig_level):
-        for col_num, square in enumerate(row):
-            if square == S_WALL:
-                if is_sideways_wall(orig_level, row_num, col_num):
-                    level[row_num][col_num] = RL_HORIZ_WALL
-                else:
-                    level[row_num][col_num] = RL_VERT_WALL
+    if not globs:
+        return [input_dir / f"screen.{i}" for i in range(1, max_level + 1)]
+    filenames = {
+        filename
+        for glob in globs
+        for filename in input_dir.glob(glob)
+        if filename.is_file()
+    }
+    return sorted(filenames, key=_natural_sort_key)
 
 
-def rewrite_final(level: _Level) -> None:
-    """Finish rewriting.
+def read_input_levels(input_filenames: Iterable[Path]) -> Iterator[InputLevel]:
+    """Yield the name and map lines of each level in input_filenames, in order.
 
-    Go through level and finish rewriting, including rewriting TEMP_FLOOR to
-    actual floor symbol RL_FLOOR.
+    Files with a suffix in STANDARD_FORMAT_SUFFIXES are level collections, which
+    are read a line at a time and keep their levels' titles, see
+    src.sokoban_format.iter_collection(...). Other files hold a single level, like
+    "screen.1".
 
-    """
-    orig_level = copy.deepcopy(level)
-    for row_num, row in enumerate(orig_level):
-        for col_num, square in enumerate(row):
-            if square == S_PLAYER:
-                level[row_num][col_num] = RL_PLAYER
-            if square == S_BOX:
-                level[row_num][col_num] = RL_BOULDER
-            if square == S_GOAL:
-                level[row_num][col_num] = RL_PIT
-            if square == TEMP_FLOOR:
-                level[row_num][col_num] = RL_FLOOR
-
-
-def convert_one_level(filename: Path) -> tuple[str, _Level]:
-    """Convert the XSokoban level in "filename" to Roguelike Sokoban-style.
-
-    Convert the XSokoban level in "filename" to a list of strings that
-    represents the level in Roguelike Sokoban-style. The first line in the
-    list will be the level name "XSokoban level <number>".
+    Level names are unique across all of input_filenames, since a level file can't
+    hold two levels with the same name: a name already used, such as "Level 1" in a
+    second untitled collection, gets " (<number>)" appended.
 
     """
-    with filename.open(encoding=UTF_8) as file:
-        orig_level = file.readlines()
-    max_line_length = max([len(line) - 1 for line in orig_level])
-    # Pad each line with spaces to the end of the longest line.
-    level: _Level = []
-    for orig_line in orig_level:
-        line = list(orig_line)
-        line.pop()  # Remove trailing '\n'
-        while len(line) < max_line_length:
-            line.append(" ")
-        level.append(line)
-
-    rewrite_floor(level)
-    rewrite_walls(level)
-    rewrite_final(level)
+    seen_names: set[str] = set()
+    for filename in input_filenames:
+        with filename.open(encoding=UTF_8) as file:
+            if filename.suffix.lower() in STANDARD_FORMAT_SUFFIXES:
+                levels: Iterable[InputLevel] = (
+                    (level_name, level_map.split("\n"))
+                    for level_name, level_map in iter_collection(file)
+                )
+            else:
+                levels = [
+                    (get_level_name(filename), [line.rstrip("\n") for line in file])
+                ]
+            for level_name, level_lines in levels:
+                level_name = level_name.strip()
+                unique_name = level_name
+                copy_number = 1
+                while unique_name in seen_names:
+                    copy_number += 1
+                    unique_name = f"{level_name} ({copy_number})"
+                seen_names.add(unique_name)
+                yield unique_name, level_lines
 
-    # [1:] skips the leading '.'
-    level_name = f"XSokoban level {filename.suffix[1:]}"
 
-    return level_name, level
+def convert_level_batch(levels: list[InputLevel]) -> list[ConvertedLevel]:
+    """Convert levels, replacing the map of levels that can't be played with None.
 
+    See is_good_level(...).
 
-def is_good_level(level: _Level) -> bool:
-    """Return True if level has only valid RL characters, False otherwise."""
-    valid_char = [
-        RL_HORIZ_WALL,
-        RL_VERT_WALL,
-        RL_PLAYER,
-        RL_BOULDER,
-        RL_PIT,
-        RL_FLOOR,
-        " ",
-    ]
-    # level[1:] to skip the name
-    for line in level[1:]:
-        for square in line:
-            if square not in valid_char:
-                return False
-    return True
+    """
+    converted: list[ConvertedLevel] = []
+    for level_name, orig_level in levels:
+        level_lines = convert_level(orig_level)
+        if is_good_level(level_lines):
+            converted.append((level_name, level_to_str(level_lines) + "\n"))
+        else:
+            converted.append((level_name, None))
+    return converted
 
 
-def get_level_groups(max_level: int) -> list[tuple[int, int]]:
-    """Get level groups.
+def convert_levels(
+    levels: Iterable[InputLevel], workers: Optional[int] = None
+) -> Iterator[ConvertedLevel]:
+    """Yield each level converted, in order.
 
-    For example, if max_levels is 23, level groups will be [(1, 10), (11, 20), (21, 23)].
+    Levels are converted in batches by workers processes, by default one per CPU.
+    Only a few batches per worker are read ahead of the converted levels that
+    have been yielded, so memory use doesn't grow with the number of levels.
 
     """
-    level_groups: list[tuple[int, int]] = []
-    if max_level // 10:
-        level_groups += [(i * 10 - 9, i * 10) for i in range(1, (max_level // 10) + 1)]
-
-    if max_level % 10:
-        level_groups += [(max_level + 1 - max_level % 10, max_level)]
-
-    return level_groups
+    max_workers = workers or os.cpu_count() or 1
+    level_iter = iter(levels)
+    with ProcessPoolExecutor(max_workers) as executor:
+        pending: "deque[Future[list[ConvertedLevel]]]" = deque()
+        while True:
+            batch = list(itertools.islice(level_iter, _BATCH_SIZE))
+            if not batch:
+                break
+            pending.append(executor.submit(convert_level_batch, batch))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_level_file(output_filename: Path, levels: list[tuple[str, str]]) -> None:
+    """Write (name, map) levels to a Roguelike Sokoban level file."""
+    delimiter = LevelFileConsts.DELIMITER + " "
+    with output_filename.open(mode="w", encoding=UTF_8) as file:
+        file.writelines(
+            (
+                f"boulder{delimiter}{RL_BOULDER}\n",
+                f"floor{delimiter}{RL_FLOOR}\n",
+                f"pit{delimiter}{RL_PIT}\n",
+                f"player{delimiter}{RL_PLAYER}\n",
+                f"{LevelFileConsts.MAPS_START}\n",
+            )
+        )
+        for level_name, level_map in levels:
+            data = [
+                f"{LevelFileConsts.NAME_PREFIX}{delimiter}{level_name}\n",
+                level_map,
+            ]
+            file.writelines(data)
 
 
 def main(args: argparse.Namespace) -> None:
@@ -278,40 +256,50 @@ def main(args: argparse.Namespace) -> None:
     input_dir: Path = args.input_dir
     max_level: int = args.max_level
     output_dir: Path = args.output_dir if args.output_dir else input_dir
-    delimiter = LevelFileConsts.DELIMITER + " "
+    group_size: int = args.group_size
+
+    input_filenames = get_input_filenames(input_dir, max_level, args.globs)
+    converted = convert_levels(read_input_levels(input_filenames), args.workers)
+    skipped: list[str] = []
+    num_levels = 0
+    num_files = 0
+
+    # Each group is written as soon as its last level is converted.
+    while True:
+        group = list(itertools.islice(converted, group_size))
+        if not group:
+            break
+        levels: list[tuple[str, str]] = []
+        for level_name, level_map in group:
+            if level_map is None:
+                skipped.append(level_name)
+            else:
+                levels.append((level_name, level_map))
+        start = num_levels + 1
+        num_levels += len(group)
+        output_filename = output_dir / f"{args.output_prefix}{start}-{num_levels}.txt"
+        write_level_file(output_filename, levels)
+        num_files += 1
+
+    print(
+        f"{num_levels - len(skipped)} of {num_levels} levels converted into "
+        f"{num_files} level files"
+    )
+    if skipped:
+        print(f"Skipped {len(skipped)} levels that can't be played:")
+        for level_name in skipped:
+            print(f"  {level_name}")
 
-    for start, end in get_level_groups(max_level):
-        levels: LevelsStr = []
-        for j in range(start, end + 1):
-            level_name, level_lines = convert_one_level(input_dir / f"screen.{j}")
-            if is_good_level(level_lines):
-                levels.append(
-                    {
-                        "name": level_name.strip(),
-                        "map": "\n".join(
-                            ["".join(line).rstrip() for line in level_lines]
-                        )
-                        + "\n",
-                    }
-                )
 
-        output_filename = output_dir / f"xsokoban{start}-{end}.txt"
-        with output_filename.open(mode="w", encoding=UTF_8) as file:
-            file.writelines(
-                (
-                    f"boulder{delimiter}{RL_BOULDER}\n",
-                    f"floor{delimiter}{RL_FLOOR}\n",
-                    f"pit{delimiter}{RL_PIT}\n",
-                    f"player{delimiter}{RL_PLAYER}\n",
-                    f"{LevelFileConsts.MAPS_START}\n",
-                )
-            )
-            for level in levels:
-                data = [
-                    f"{LevelFileConsts.NAME_PREFIX}{delimiter}{level['name']}\n",
-                    level["map"],
-                ]
-                file.writelines(data)
+def _positive_int(value: str) -> int:
+    """Argparse type for a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a whole number: '{value}'") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {number}")
+    return number
 
 
 def get_parser() -> argparse.ArgumentParser:
@@ -331,6 +319,33 @@ def get_parser() -> argparse.ArgumentParser:
         help="output directory, defaults to input directory",
         type=Path,
     )
+    parser.add_argument(
+        "--glob",
+        action="append",
+        dest="globs",
+        help=(
+            "convert the files in the input directory matching this pattern instead "
+            "of 'screen.1' to 'screen.<max level>', can be given more than once; "
+            f"files with a suffix in {STANDARD_FORMAT_SUFFIXES} are read as level "
+            "collections"
+        ),
+    )
+    parser.add_argument(
+        "--group-size",
+        default=DEFAULT_GROUP_SIZE,
+        help="number of levels in each output level file",
+        type=_positive_int,
+    )
+    parser.add_argument(
+        "--output-prefix",
+        default=DEFAULT_OUTPUT_PREFIX,
+        help="start of output level file names, which end in '<first>-<last>.txt'",
+    )
+    parser.add_argument(
+        "--workers",
+        help="number of worker processes, defaults to one per CPU",
+        type=_positive_int,
+    )
     return parser
 
 
@@ -0,0 +1,102 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that finds duplicate and near duplicate levels across level files.
+
+Levels are duplicates if they have the same canonical form, meaning they play the
+same even if they use different symbols, have different blank space around them, or
+are rotated or reflected copies of each other. Levels are near duplicates if they
+have the same canonical layout, meaning the same walkable area, but different
+boulders, pits, or player starting points. See src/canonical.py for details.
+
+Levels are indexed by the content hashes of their canonical forms and layouts, so
+each level is only converted to canonical form once.
+
+"""
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from src.canonical import canonical_layout, hash_canonical_map, level_hash
+from src.levelloader import LevelLoader, find_level_files
+from src.util import LEVELS_DIR, RoguelikeSokobanError
+
+
+class LevelRef(NamedTuple):
+    """Identifies a level in a level file."""
+
+    level_filename: Path
+    level_name: str
+
+
+LevelGroups = list[list[LevelRef]]
+
+
+def find_duplicates(level_filenames: Iterable[Path]) -> tuple[LevelGroups, LevelGroups]:
+    """Return groups of duplicate levels and groups of near duplicate levels."""
+    # layout hash -> level hash -> levels
+    index: dict[str, dict[str, list[LevelRef]]] = defaultdict(dict)
+    for level_filename in level_filenames:
+        loader = LevelLoader(level_filename)
+        for level_name in loader.levels:
+            try:
+                level_map = loader.levels[level_name]
+            except RoguelikeSokobanError:
+                # Standard format levels that can't be converted can't be played.
+                continue
+            layout = canonical_layout(level_map, loader.symbols)
+            index[hash_canonical_map(layout)].setdefault(
+                level_hash(level_map, loader.symbols), []
+            ).append(LevelRef(level_filename, level_name))
+
+    duplicates = [
+        levels
+        for by_level_hash in index.values()
+        for levels in by_level_hash.values()
+        if len(levels) > 1
+    ]
+    near_duplicates = [
+        [level for levels in by_level_hash.values() for level in levels]
+        for by_level_hash in index.values()
+        if len(by_level_hash) > 1
+    ]
+    return duplicates, near_duplicates
+
+
+def _print_groups(title: str, groups: LevelGroups) -> None:
+    """Print groups of levels."""
+    print(f"{title}: {len(groups)}")
+    for group in groups:
+        print()
+        for level in group:
+            print(f"  {level.level_filename}: {level.level_name}")
+
+
+def main(args: argparse.Namespace) -> None:
+    """Main function for script."""
+    level_filenames: list[Path] = args.level_filenames or find_level_files(LEVELS_DIR)
+    duplicates, near_duplicates = find_duplicates(level_filenames)
+    _print_groups("Duplicate level groups", duplicates)
+    print()
+    _print_groups("Near duplicate level groups", near_duplicates)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "level_filenames",
+        help=f"level files to check, defaults to all level files in '{LEVELS_DIR}'",
+        metavar="level-file",
+        nargs="*",
+        type=Path,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
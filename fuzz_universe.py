@@ -0,0 +1,416 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that checks a game engine against the reference Universe on random levels.
+
+Each fuzz case is a random level and a random sequence of moves, both generated from
+the case's seed. The moves are played in the reference engine (src.universe.Universe)
+and in the engine being checked side by side, and after every move the two are
+compared on player position, boulder positions, level_map, pits_remaining,
+moves_taken and game_won. The first case that differs is shrunk to a smaller level
+and fewer moves that still differ, and printed.
+
+The engine being checked is given as module:class, for example
+src.fast_universe:FastUniverse. It's created the same way as Universe, must have an
+eval_action method, and must have the same attributes that are compared above,
+with boulders and player having curr_y and curr_x. By default the reference engine
+is checked against ModelUniverse, a plain reimplementation of the game rules in this
+script.
+
+Cases are split between worker processes, so checking many cases is fast. The exit
+status is nonzero if a difference was found.
+
+"""
+import argparse
+import importlib
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional, Sequence, Union
+
+from generate_levels import generate_level_rows
+from src.sokoban_format import RL_SYMBOLS
+from src.universe import Universe
+from src.util import Action, RoguelikeSokobanError, Symbols
+
+Engine = Callable[[str, Sequence[str], Symbols], Any]
+
+MOVES = (Action.UP, Action.DOWN, Action.LEFT, Action.RIGHT)
+MAX_WIDTH = 10
+MAX_HEIGHT = 8
+MAX_WALL_DENSITY = 0.3
+
+_DELTAS = {
+    Action.UP: (-1, 0),
+    Action.DOWN: (1, 0),
+    Action.LEFT: (0, -1),
+    Action.RIGHT: (0, 1),
+}
+_CASE_NAME = "Fuzz case"
+
+
+class EngineState(NamedTuple):
+    """Everything about an engine that is compared after each move."""
+
+    player: tuple[int, int]
+    boulders: frozenset[tuple[int, int]]
+    level_map: tuple[str, ...]
+    pits_remaining: int
+    moves_taken: int
+    game_won: bool
+
+
+# An engine's state, or a description of the error it raised.
+StepResult = Union[EngineState, str]
+
+
+class FuzzCase(NamedTuple):
+    """A level and the moves to play in it."""
+
+    level_map: tuple[str, ...]
+    actions: tuple[Action, ...]
+
+
+class Mismatch(NamedTuple):
+    """The first difference between two engines playing a FuzzCase.
+
+    step is the number of moves played before the difference, so 0 means the engines
+    differ as soon as they're created.
+
+    """
+
+    step: int
+    expected: StepResult
+    actual: StepResult
+
+
+class _Position(NamedTuple):
+    curr_y: int
+    curr_x: int
+
+
+class ModelUniverse:
+    """Plain reimplementation of the game rules, for checking Universe.
+
+    Boulders are a set of positions rather than objects, so every move is a few
+    lookups with no searching.
+
+    """
+
+    def __init__(
+        self, level_name: str, level_map: Sequence[str], level_sym: Symbols
+    ) -> None:
+        self.level_name = level_name
+        self.level_sym = level_sym
+        self.level_map = [list(row) for row in level_map]
+        self._boulders: set[_Position] = set()
+        self.pits_remaining = 0
+        self.moves_taken = 0
+        self.game_won = False
+        for row_index, row in enumerate(self.level_map):
+            for col_index, square in enumerate(row):
+                if square == level_sym["player"]:
+                    self.player = _Position(row_index, col_index)
+                    row[col_index] = level_sym["floor"]
+                elif square == level_sym["boulder"]:
+                    self._boulders.add(_Position(row_index, col_index))
+                    row[col_index] = level_sym["floor"]
+                elif square == level_sym["pit"]:
+                    self.pits_remaining += 1
+
+    @property
+    def boulders(self) -> list[_Position]:
+        """Return the positions of all boulders."""
+        return list(self._boulders)
+
+    def eval_action(self, act: Action) -> None:
+        """Move the player and see if they win."""
+        floor = self.level_sym["floor"]
+        change_y, change_x = _DELTAS[act]
+        target = _Position(self.player.curr_y + change_y, self.player.curr_x + change_x)
+        if target in self._boulders:
+            beyond = _Position(target.curr_y + change_y, target.curr_x + change_x)
+            beyond_square = self.level_map[beyond.curr_y][beyond.curr_x]
+            if beyond in self._boulders:
+                beyond_square = self.level_sym["boulder"]
+            if beyond_square == self.level_sym["pit"]:
+                self._boulders.remove(target)
+                self.level_map[beyond.curr_y][beyond.curr_x] = floor
+                self.pits_remaining -= 1
+            elif beyond_square == floor:
+                self._boulders.remove(target)
+                self._boulders.add(beyond)
+        if (
+            target not in self._boulders
+            and self.level_map[target.curr_y][target.curr_x] == floor
+        ):
+            self.player = target
+            self.moves_taken += 1
+        self.game_won = self.pits_remaining == 0
+
+
+def get_state(univ: Any) -> EngineState:
+    """Return the state of a Universe or an engine with the same attributes."""
+    return EngineState(
+        (univ.player.curr_y, univ.player.curr_x),
+        frozenset((boulder.curr_y, boulder.curr_x) for boulder in univ.boulders),
+        tuple("".join(row) for row in univ.level_map),
+        univ.pits_remaining,
+        univ.moves_taken,
+        univ.game_won,
+    )
+
+
+def load_engine(engine_spec: str) -> Engine:
+    """Return the engine class named by engine_spec, given as module:class."""
+    module_name, _, class_name = engine_spec.partition(":")
+    if not module_name or not class_name:
+        raise RoguelikeSokobanError(f"engine must be module:class: '{engine_spec}'")
+    try:
+        engine: Engine = getattr(importlib.import_module(module_name), class_name)
+    except (ImportError, AttributeError) as exc:
+        raise RoguelikeSokobanError(
+            f"can't load engine '{engine_spec}': {exc}"
+        ) from exc
+    return engine
+
+
+def make_case(seed: int, max_actions: int) -> FuzzCase:
+    """Return the random FuzzCase for seed."""
+    rng = random.Random(seed)
+    width = rng.randint(4, MAX_WIDTH)
+    height = rng.randint(4, MAX_HEIGHT)
+    max_objects = (width - 2) * (height - 2) - 1
+    pits = rng.randint(1, max(1, max_objects // 4))
+    boulders = rng.randint(pits, max(pits, max_objects // 2))
+    wall_density = rng.uniform(0, MAX_WALL_DENSITY)
+    level_map = tuple(
+        generate_level_rows(width, height, boulders, pits, wall_density, rng)
+    )
+    actions = tuple(rng.choice(MOVES) for _ in range(rng.randint(1, max_actions)))
+    return FuzzCase(level_map, actions)
+
+
+def _create(engine: Engine, level_map: Sequence[str]) -> tuple[Any, StepResult]:
+    try:
+        univ = engine(_CASE_NAME, level_map, RL_SYMBOLS)
+        return univ, get_state(univ)
+    except Exception as exc:  # pylint: disable=broad-except
+        return None, f"raised {type(exc).__name__}: {exc}"
+
+
+def _step(univ: Any, act: Action) -> StepResult:
+    try:
+        univ.eval_action(act)
+        return get_state(univ)
+    except Exception as exc:  # pylint: disable=broad-except
+        return f"raised {type(exc).__name__}: {exc}"
+
+
+def find_mismatch(
+    case: FuzzCase, engine: Engine, reference: Engine = Universe
+) -> Optional[Mismatch]:
+    """Return the first difference between engine and reference playing case.
+
+    An engine raising an exception counts as a state, so engines that raise the same
+    error agree and the rest of the case isn't played.
+
+    """
+    expected_univ, expected = _create(reference, case.level_map)
+    actual_univ, actual = _create(engine, case.level_map)
+    if expected != actual:
+        return Mismatch(0, expected, actual)
+    if expected_univ is None or actual_univ is None:
+        return None
+    for step, act in enumerate(case.actions, start=1):
+        expected = _step(expected_univ, act)
+        actual = _step(actual_univ, act)
+        if expected != actual:
+            return Mismatch(step, expected, actual)
+        if isinstance(expected, str):
+            return None
+    return None
+
+
+def _without_column(level_map: tuple[str, ...], col_index: int) -> tuple[str, ...]:
+    return tuple(row[:col_index] + row[col_index + 1 :] for row in level_map)
+
+
+def _level_candidates(level_map: tuple[str, ...]) -> list[tuple[str, ...]]:
+    """Return smaller versions of level_map that keep its outer wall and player."""
+    player = RL_SYMBOLS["player"]
+    floor = RL_SYMBOLS["floor"]
+    candidates = []
+    if len(level_map) > 3:
+        for row_index in range(1, len(level_map) - 1):
+            if player not in level_map[row_index]:
+                candidates.append(level_map[:row_index] + level_map[row_index + 1 :])
+    if len(level_map[0]) > 3:
+        for col_index in range(1, len(level_map[0]) - 1):
+            if all(row[col_index] != player for row in level_map):
+                candidates.append(_without_column(level_map, col_index))
+    for row_index in range(1, len(level_map) - 1):
+        row = level_map[row_index]
+        for col_index in range(1, len(row) - 1):
+            if row[col_index] not in (player, floor):
+                new_row = row[:col_index] + floor + row[col_index + 1 :]
+                candidates.append(
+                    level_map[:row_index] + (new_row,) + level_map[row_index + 1 :]
+                )
+    return candidates
+
+
+def _play_first_action(case: FuzzCase, reference: Engine) -> Optional[FuzzCase]:
+    """Return case with its first move played into the level, if it has one."""
+    if not case.actions:
+        return None
+    univ, _ = _create(reference, case.level_map)
+    if univ is None:
+        return None
+    state = _step(univ, case.actions[0])
+    if isinstance(state, str):
+        return None
+    rows = [list(row) for row in state.level_map]
+    for row_index, col_index in state.boulders:
+        rows[row_index][col_index] = RL_SYMBOLS["boulder"]
+    row_index, col_index = state.player
+    rows[row_index][col_index] = RL_SYMBOLS["player"]
+    return FuzzCase(tuple("".join(row) for row in rows), case.actions[1:])
+
+
+def _shrink_actions(
+    case: FuzzCase, fails: Callable[[FuzzCase], bool]
+) -> FuzzCase:
+    """Remove runs of actions from case while it still fails, longest runs first."""
+    chunk_size = max(1, len(case.actions) // 2)
+    while True:
+        start = 0
+        while start < len(case.actions):
+            actions = case.actions[:start] + case.actions[start + chunk_size :]
+            candidate = case._replace(actions=actions)
+            if fails(candidate):
+                case = candidate
+            else:
+                start += chunk_size
+        if chunk_size == 1:
+            return case
+        chunk_size //= 2
+
+
+def shrink_case(
+    case: FuzzCase, engine: Engine, reference: Engine = Universe
+) -> FuzzCase:
+    """Return a smaller case on which engine and reference still differ.
+
+    Moves after the first difference are dropped, then runs of moves, rows, columns
+    and single squares are removed, and the first move is played into the level, for
+    as long as the engines still differ.
+
+    """
+
+    def fails(candidate: FuzzCase) -> bool:
+        return find_mismatch(candidate, engine, reference) is not None
+
+    mismatch = find_mismatch(case, engine, reference)
+    if mismatch is None:
+        raise RoguelikeSokobanError("engines agree on the case to shrink")
+    case = case._replace(actions=case.actions[: mismatch.step])
+    while True:
+        case = _shrink_actions(case, fails)
+        candidates: list[Optional[FuzzCase]] = [
+            case._replace(level_map=level_map)
+            for level_map in _level_candidates(case.level_map)
+        ]
+        candidates.append(_play_first_action(case, reference))
+        for candidate in candidates:
+            if candidate is not None and fails(candidate):
+                case = candidate
+                break
+        else:
+            return case
+
+
+def fuzz_seeds(engine_spec: str, seeds: range, max_actions: int) -> Optional[int]:
+    """Return the first seed in seeds whose case finds a difference, if any."""
+    engine = load_engine(engine_spec)
+    for seed in seeds:
+        if find_mismatch(make_case(seed, max_actions), engine) is not None:
+            return seed
+    return None
+
+
+def format_case(case: FuzzCase, mismatch: Mismatch) -> str:
+    """Return a description of a failing case for printing."""
+    moves = " ".join(act.value for act in case.actions) or "(none)"
+    return "\n".join(
+        [
+            "level:",
+            *(f"    {row}" for row in case.level_map),
+            f"moves: {moves}",
+            f"first difference after {mismatch.step} moves:",
+            f"    reference: {mismatch.expected}",
+            f"    engine:    {mismatch.actual}",
+        ]
+    )
+
+
+def main(args: argparse.Namespace) -> int:
+    """Main function for script."""
+    engine = load_engine(args.engine)
+    batches = [
+        range(start, min(start + args.batch_size, args.seed + args.cases))
+        for start in range(args.seed, args.seed + args.cases, args.batch_size)
+    ]
+    failing_seed = None
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for result in executor.map(
+            fuzz_seeds,
+            [args.engine] * len(batches),
+            batches,
+            [args.max_actions] * len(batches),
+        ):
+            if result is not None:
+                failing_seed = result
+                executor.shutdown(cancel_futures=True)
+                break
+    if failing_seed is None:
+        print(f"{args.cases} cases, no differences found")
+        return 0
+
+    case = shrink_case(make_case(failing_seed, args.max_actions), engine)
+    mismatch = find_mismatch(case, engine)
+    assert mismatch is not None
+    print(f"Difference found with seed {failing_seed}, shrunk to:")
+    print(format_case(case, mismatch))
+    return 1
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--engine",
+        default="fuzz_universe:ModelUniverse",
+        help="engine to check against Universe, as module:class",
+    )
+    parser.add_argument("--cases", default=10000, help="cases to run", type=int)
+    parser.add_argument(
+        "--max-actions", default=100, help="most moves in a case", type=int
+    )
+    parser.add_argument("--seed", default=0, help="seed of the first case", type=int)
+    parser.add_argument(
+        "--batch-size", default=500, help="cases per worker task", type=int
+    )
+    parser.add_argument(
+        "--workers",
+        help="worker processes (default: one per CPU)",
+        type=int,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
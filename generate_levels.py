@@ -0,0 +1,164 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that writes level files of randomly generated levels, for scaling tests.
+
+Each level is a rectangle of the given width and height, including its outer wall,
+with the given number of boulders and pits, one player, and interior walls
+covering about wall_density of the remaining squares. Levels always pass level
+validation, but they aren't checked to be winnable, so they're for measuring how
+the game, level loader, and display scale rather than for playing.
+
+Levels are generated and written a row at a time, so levels with 10,000 by 10,000
+squares and level files with 100,000 levels don't need to fit in memory. The same
+seed always generates the same levels.
+
+"""
+import argparse
+import random
+from pathlib import Path
+from typing import Iterator, TextIO
+
+from src.sokoban_format import RL_HORIZ_WALL, RL_SYMBOLS, RL_VERT_WALL
+from src.util import UTF_8, LevelFileConsts, RoguelikeSokobanError
+
+MIN_SIZE = 3
+
+
+def check_level_params(width: int, height: int, boulders: int, pits: int) -> None:
+    """Raise RoguelikeSokobanError if no valid level has these parameters."""
+    if width < MIN_SIZE or height < MIN_SIZE:
+        raise RoguelikeSokobanError(
+            f"level must be at least {MIN_SIZE} by {MIN_SIZE}: {width} by {height}"
+        )
+    if pits < 1:
+        raise RoguelikeSokobanError("level needs at least one pit")
+    if boulders < pits:
+        raise RoguelikeSokobanError(
+            f"level needs at least as many boulders as pits: {boulders} < {pits}"
+        )
+    inner_squares = (width - 2) * (height - 2)
+    if boulders + pits + 1 > inner_squares:
+        raise RoguelikeSokobanError(
+            f"level has room for {inner_squares} boulders, pits and players, "
+            f"not {boulders + pits + 1}"
+        )
+
+
+def generate_level_rows(
+    width: int,
+    height: int,
+    boulders: int,
+    pits: int,
+    wall_density: float,
+    rng: random.Random,
+) -> Iterator[str]:
+    """Yield the rows of a random level map.
+
+    Boulders, pits and the player are placed first, so walls never cover them.
+
+    """
+    check_level_params(width, height, boulders, pits)
+    inner_width = width - 2
+    objects = (
+        [RL_SYMBOLS["player"]]
+        + [RL_SYMBOLS["boulder"]] * boulders
+        + [RL_SYMBOLS["pit"]] * pits
+    )
+    # inner row -> inner column -> symbol
+    placed: dict[int, dict[int, str]] = {}
+    positions = rng.sample(range(inner_width * (height - 2)), len(objects))
+    for position, symbol in zip(positions, objects):
+        row_num, col_num = divmod(position, inner_width)
+        placed.setdefault(row_num, {})[col_num] = symbol
+
+    walls_per_row = wall_density * inner_width
+    yield RL_HORIZ_WALL * width
+    for row_num in range(height - 2):
+        row = [RL_SYMBOLS["floor"]] * inner_width
+        # Round randomly so the density is right on average even in narrow levels.
+        num_walls = int(walls_per_row + rng.random())
+        for col_num in rng.sample(range(inner_width), min(num_walls, inner_width)):
+            row[col_num] = RL_HORIZ_WALL
+        for col_num, symbol in placed.get(row_num, {}).items():
+            row[col_num] = symbol
+        yield RL_VERT_WALL + "".join(row) + RL_VERT_WALL
+    yield RL_HORIZ_WALL * width
+
+
+def write_levels(
+    file: TextIO,
+    num_levels: int,
+    width: int,
+    height: int,
+    boulders: int,
+    pits: int,
+    wall_density: float,
+    seed: int = 0,
+) -> None:
+    """Write a level file of num_levels random levels to file."""
+    check_level_params(width, height, boulders, pits)
+    rng = random.Random(seed)
+    delimiter = LevelFileConsts.DELIMITER + " "
+    for symbol_name, symbol in RL_SYMBOLS.items():
+        file.write(f"{symbol_name}{delimiter}{symbol}\n")
+    file.write(f"{LevelFileConsts.MAPS_START}\n")
+    for level_num in range(1, num_levels + 1):
+        file.write(f"{LevelFileConsts.NAME_PREFIX}{delimiter}Generated {level_num}\n")
+        for row in generate_level_rows(
+            width, height, boulders, pits, wall_density, rng
+        ):
+            file.write(row + "\n")
+
+
+def main(args: argparse.Namespace) -> None:
+    """Main function for script."""
+    output_filename: Path = args.output_filename
+    with output_filename.open(mode="w", encoding=UTF_8) as file:
+        write_levels(
+            file,
+            args.levels,
+            args.width,
+            args.height,
+            args.boulders,
+            args.pits,
+            args.wall_density,
+            args.seed,
+        )
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "output_filename",
+        help="level file to write",
+        metavar="output-file",
+        type=Path,
+    )
+    parser.add_argument(
+        "--width", default=20, help="level width, including walls", type=int
+    )
+    parser.add_argument(
+        "--height", default=10, help="level height, including walls", type=int
+    )
+    parser.add_argument("--boulders", default=4, help="boulders per level", type=int)
+    parser.add_argument("--pits", default=3, help="pits per level", type=int)
+    parser.add_argument(
+        "--wall-density",
+        default=0.1,
+        help="fraction of the squares inside the outer wall that are walls",
+        type=float,
+    )
+    parser.add_argument(
+        "--levels", default=1, help="number of levels in the level file", type=int
+    )
+    parser.add_argument("--seed", default=0, help="random seed", type=int)
+    return parser
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
@@ -0,0 +1,53 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that writes a metadata index next to each level file.
+
+The index for a level file like "levels/default_levels.txt" is written to
+"levels/default_levels.txt.index.json". It holds each level's size, floor area,
+boulder and pit counts, and a lower bound on the moves needed to win. See
+src/level_index.py for details.
+
+With a current index, the level prompt shows this information for each level, and
+sorting or filtering the levels doesn't need to load the level maps. An index is
+ignored once its level file changes, so rerun this script after editing levels.
+
+"""
+import argparse
+from pathlib import Path
+
+from src.level_index import build_metadata, write_index
+from src.levelloader import LevelLoader, find_level_files
+from src.util import LEVELS_DIR
+
+
+def main(args: argparse.Namespace) -> None:
+    """Main function for script."""
+    level_filenames: list[Path] = args.level_filenames or find_level_files(LEVELS_DIR)
+    for level_filename in level_filenames:
+        loader = LevelLoader(level_filename, fast_start=True)
+        metadata = build_metadata(loader)
+        index_filename = write_index(level_filename, metadata)
+        print(
+            f"{index_filename}: {len(metadata)} of {len(loader.levels)} levels indexed"
+        )
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "level_filenames",
+        help=f"level files to index, defaults to all level files in '{LEVELS_DIR}'",
+        metavar="level-file",
+        nargs="*",
+        type=Path,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
@@ -0,0 +1,189 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that merges many score files into one file of the best score for each level.
+
+Score files are read in parallel worker processes, and each worker's scores are
+folded into the merged scores as soon as they're read, so memory use depends on the
+number of levels, not the number of score files. The best score for each level and
+the solution that set it are kept. The merged scores are written to the output file
+in one step, so it never holds a partial merge. The output file is always a JSON
+score file. The input score files are only read, never changed, and a missing one
+is an error.
+
+Scores are matched by level content hash, so scores from the same level file saved
+under different paths on different computers are merged. Scores saved by older
+versions are only keyed by level file path. They are matched to the levels of the
+level files given with -L by level file name and level name, and otherwise merged
+with scores for the same level file name and level name.
+
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+from src.levelloader import LevelLoader
+from src.score_tracking import (
+    JOURNAL_SUFFIX,
+    SQLITE_SUFFIXES,
+    ScoreRecord,
+    read_score_records,
+    write_score_file,
+)
+from src.util import RoguelikeSokobanError
+
+# Key of a merged score: a content hash, or a level file name and level name for
+# scores that couldn't be matched to a content hash.
+MergeKey = Union[str, tuple[str, str]]
+
+
+def _iter_read_scores(
+    scores_filenames: Iterable[Path], workers: Optional[int]
+) -> Iterator[list[ScoreRecord]]:
+    """Yield the records of each score file as it's read.
+
+    At most twice as many files as there are workers are read or waiting to be
+    merged at once.
+
+    """
+    max_workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        pending: set["concurrent.futures.Future[list[ScoreRecord]]"] = set()
+        for scores_filename in scores_filenames:
+            pending.add(executor.submit(read_score_records, scores_filename))
+            if len(pending) >= 2 * max_workers:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+
+
+def get_legacy_hashes(level_filenames: Iterable[Path]) -> dict[tuple[str, str], str]:
+    """Return content hashes by level file name and level name."""
+    legacy_hashes: dict[tuple[str, str], str] = {}
+    for level_filename in level_filenames:
+        loader = LevelLoader(level_filename, fast_start=True)
+        for level_name in loader.levels:
+            try:
+                level_key = loader.get_level_key(level_name)
+            except RoguelikeSokobanError:
+                continue
+            legacy_hashes[(level_filename.name, level_name)] = level_key.content_hash
+    return legacy_hashes
+
+
+def _is_better(record: ScoreRecord, current: Optional[ScoreRecord]) -> bool:
+    """Return True if record should replace current as the best score."""
+    if current is None or record.score < current.score:
+        return True
+    return (
+        record.score == current.score
+        and current.solution is None
+        and record.solution is not None
+    )
+
+
+def merge_scores(
+    scores_filenames: Iterable[Path],
+    level_filenames: Iterable[Path] = (),
+    workers: Optional[int] = None,
+) -> list[ScoreRecord]:
+    """Return the best score for each level in scores_filenames.
+
+    level_filenames are used to match scores saved by level file path to content
+    hashes. workers is the number of worker processes, by default one per CPU.
+
+    """
+    legacy_hashes = get_legacy_hashes(level_filenames)
+    merged: dict[MergeKey, ScoreRecord] = {}
+    for records in _iter_read_scores(scores_filenames, workers):
+        for record in records:
+            if record.content_hash is None:
+                legacy_key = (record.level_filename.name, record.level_name)
+                content_hash = legacy_hashes.get(legacy_key)
+                if content_hash is not None:
+                    record = record._replace(content_hash=content_hash)
+            key: MergeKey = (
+                (record.level_filename.name, record.level_name)
+                if record.content_hash is None
+                else record.content_hash
+            )
+            if _is_better(record, merged.get(key)):
+                merged[key] = record
+    return list(merged.values())
+
+
+def main(args: argparse.Namespace) -> int:
+    """Main function for script."""
+    journal_filename = args.output.with_name(args.output.name + JOURNAL_SUFFIX)
+    try:
+        if args.output.suffix.lower() in SQLITE_SUFFIXES:
+            raise RoguelikeSokobanError(
+                f"output score file must be a JSON file, not '{args.output}'"
+            )
+        if journal_filename.exists() and journal_filename.stat().st_size:
+            raise RoguelikeSokobanError(
+                f"output score file has unsaved scores in '{journal_filename}', "
+                "choose another output file"
+            )
+        records = merge_scores(
+            args.scores_filenames, args.level_filenames or [], args.workers
+        )
+    except RoguelikeSokobanError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    write_score_file(args.output, records)
+    print(
+        f"{args.output}: {len(records)} best scores from "
+        f"{len(args.scores_filenames)} score files"
+    )
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "scores_filenames",
+        help="score files to merge",
+        metavar="scores-file",
+        nargs="+",
+        type=Path,
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="JSON score file to write the merged scores to",
+        required=True,
+        type=Path,
+    )
+    parser.add_argument(
+        "-L",
+        "--level-file",
+        action="append",
+        dest="level_filenames",
+        help=(
+            "level file to match scores saved by older versions with, can be given "
+            "more than once"
+        ),
+        type=Path,
+    )
+    parser.add_argument(
+        "--workers",
+        help="number of worker processes, defaults to one per CPU",
+        type=int,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
@@ -4,11 +4,16 @@ Licensed under the GNU General Public License (GPL) v3.
 
 """
 import argparse
+import contextlib
 import curses
 from pathlib import Path
+from typing import TYPE_CHECKING, ContextManager, Optional
 
 from src.main import main
-from src.util import DEFAULT_LEVEL_FILENAME
+from src.util import DEFAULT_LEVEL_FILENAME, SCORES_FILENAME
+
+if TYPE_CHECKING:
+    from src.action_log import ActionLogWriter
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -22,9 +27,94 @@ if __name__ == "__main__":
         metavar="FILE",
         type=Path,
     )
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        help="skip checking every level at startup, check each level when chosen",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="reload the level being played when the level file changes",
+    )
+    parser.add_argument(
+        "--scores-file",
+        default=SCORES_FILENAME,
+        dest="scores_filename",
+        help=(
+            "save scores to specified file, use a .db suffix for a database that "
+            "several players can share (default: %(default)s)"
+        ),
+        metavar="FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--write-behind",
+        action="store_true",
+        help="save new best scores in batches instead of as soon as they are set",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile_filename",
+        help=(
+            "profile the game and write the profile to specified file when it exits, "
+            "and the slowest functions to the same file name plus .txt"
+        ),
+        metavar="FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help=(
+            "with --profile, also trace memory allocations and write the top "
+            "allocation sites to the profile file name plus .memory.txt"
+        ),
+    )
+    parser.add_argument(
+        "--action-log",
+        dest="action_log_filename",
+        help=(
+            "append every action, with its time and the time taken to draw the "
+            "next frame, to specified binary file"
+        ),
+        metavar="FILE",
+        type=Path,
+    )
     args = parser.parse_args()
+    if args.profile_memory and args.profile_filename is None:
+        parser.error("--profile-memory requires --profile")
+
+    profiling: ContextManager[None] = contextlib.nullcontext()
+    if args.profile_filename is not None:
+        # pylint: disable=import-outside-toplevel
+        from src.profiling import profile_session
+
+        profiling = profile_session(args.profile_filename, args.profile_memory)
+
+    action_logging: ContextManager[Optional["ActionLogWriter"]] = (
+        contextlib.nullcontext()
+    )
+    if args.action_log_filename is not None:
+        # pylint: disable=import-outside-toplevel
+        from src.action_log import ActionLogWriter
+
+        action_logging = ActionLogWriter(args.action_log_filename)
 
     try:
-        curses.wrapper(main, args.level_filename)
+        with profiling, action_logging as action_log:
+            curses.wrapper(
+                main,
+                args.level_filename,
+                fast_start=args.fast_start,
+                watch=args.watch,
+                scores_filename=args.scores_filename,
+                write_behind=args.write_behind,
+                action_log=action_log,
+            )
     except KeyboardInterrupt:
+        # pylint: disable=import-outside-toplevel
+        from src.score_tracking import flush_all_scores
+
+        flush_all_scores()
         print("Exiting at user request. Thanks for playing!")
@@ -0,0 +1,82 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that hosts games for many players at once over TCP or a Unix socket.
+
+The level file is loaded once and shared by every player. Each player gets their own
+game, drawn as text for a terminal, so players connect with a telnet client, for
+example with
+
+    telnet 127.0.0.1 2323
+
+Scores aren't saved and hints aren't offered by the server.
+
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from src.levelloader import LevelLoader
+from src.server import IDLE_TIMEOUT_SECONDS, MAX_SESSIONS, GameServer
+from src.util import DEFAULT_LEVEL_FILENAME
+
+
+def main(args: argparse.Namespace) -> None:
+    """Main function for script."""
+    loader = LevelLoader(args.level_filename, fast_start=args.fast_start)
+    server = GameServer(loader, args.max_sessions, args.idle_timeout)
+    if args.unix_socket is not None:
+        print(f"Serving '{args.level_filename}' on '{args.unix_socket}'")
+    else:
+        print(f"Serving '{args.level_filename}' on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "-L",
+        "--level-file",
+        default=DEFAULT_LEVEL_FILENAME,
+        dest="level_filename",
+        help="level file to serve",
+        metavar="FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        help="skip checking every level at startup, check each level when chosen",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", default=2323, help="TCP port", type=int)
+    parser.add_argument(
+        "--unix-socket",
+        help="listen on a Unix socket at this path instead of on TCP",
+        metavar="PATH",
+        type=Path,
+    )
+    parser.add_argument(
+        "--max-sessions",
+        default=MAX_SESSIONS,
+        help="most players at once, more are turned away",
+        type=int,
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        default=IDLE_TIMEOUT_SECONDS,
+        help="seconds without input before a player is disconnected",
+        type=float,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    main(get_parser().parse_args())
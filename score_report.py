@@ -0,0 +1,146 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that reports statistics about best scores.
+
+The report shows how many levels of each level file have a best score, the lowest
+best scores, the levels that have never been solved, and, given a score file of
+known optimal scores, how far each best score is above its optimum. See
+src/score_stats.py for details.
+
+With --json the report is printed as a JSON object instead, for use by other
+programs.
+
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from src.levelloader import find_level_files
+from src.score_stats import ScoreStats
+from src.score_tracking import ScoreRecord, read_score_records
+from src.util import LEVELS_DIR, SCORES_FILENAME, RoguelikeSokobanError
+
+
+def _record_to_dict(record: ScoreRecord) -> dict[str, Any]:
+    """Return record as a JSON object."""
+    return {
+        "file": str(record.level_filename),
+        "level": record.level_name,
+        "score": record.score,
+    }
+
+
+def get_report(stats: ScoreStats, top: int) -> dict[str, Any]:
+    """Return the report as a JSON object."""
+    return {
+        "packs": [
+            {
+                "file": str(pack.level_filename),
+                "levels": pack.levels,
+                "solved": pack.solved,
+                "completion": pack.completion,
+            }
+            for pack in stats.pack_stats()
+        ],
+        "top_scores": [_record_to_dict(record) for record in stats.top_scores(top)],
+        "unsolved": [
+            {"file": str(level.level_filename), "level": level.level_name}
+            for level in stats.unsolved_levels()
+        ],
+        "gaps": [
+            dict(_record_to_dict(gap.record), optimum=gap.optimum, gap=gap.gap)
+            for gap in stats.score_gaps()
+        ],
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    """Print the report as text."""
+    print("Completion:")
+    for pack in report["packs"]:
+        print(
+            f"  {pack['file']}: {pack['solved']} of {pack['levels']} levels "
+            f"({pack['completion']:.0%})"
+        )
+    print("Lowest best scores:")
+    for record in report["top_scores"]:
+        print(f"  {record['score']}: {record['file']}: {record['level']}")
+    print("Never solved:")
+    for level in report["unsolved"]:
+        print(f"  {level['file']}: {level['level']}")
+    if report["gaps"]:
+        print("Moves above optimum:")
+        for gap in report["gaps"]:
+            print(
+                f"  {gap['gap']}: {gap['file']}: {gap['level']} "
+                f"({gap['score']}, optimum {gap['optimum']})"
+            )
+
+
+def main(args: argparse.Namespace) -> int:
+    """Main function for script."""
+    level_filenames: list[Path] = args.level_filenames or find_level_files(LEVELS_DIR)
+    try:
+        optimum_records = (
+            read_score_records(args.optimum_scores_filename)
+            if args.optimum_scores_filename is not None
+            else []
+        )
+        records = read_score_records(args.scores_filename)
+        stats = ScoreStats(records, level_filenames, optimum_records)
+        report = get_report(stats, args.top)
+    except (OSError, RoguelikeSokobanError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "scores_filename",
+        default=SCORES_FILENAME,
+        help="score file to report on",
+        metavar="scores-file",
+        nargs="?",
+        type=Path,
+    )
+    parser.add_argument(
+        "-L",
+        "--level-file",
+        action="append",
+        dest="level_filenames",
+        help=(
+            "level file to report completion for, can be given more than once, "
+            f"defaults to all level files in '{LEVELS_DIR}'"
+        ),
+        type=Path,
+    )
+    parser.add_argument(
+        "--optimum-scores",
+        dest="optimum_scores_filename",
+        help="score file of known optimal scores to compare best scores with",
+        type=Path,
+    )
+    parser.add_argument(
+        "--top", default=10, help="number of lowest best scores to show", type=int
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))
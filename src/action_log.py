@@ -0,0 +1,345 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Compact binary logs of the actions taken while playing.
+
+An action log starts with LOG_MAGIC and is followed by blocks, appended as records
+are flushed. Each block is written by one session with a single write to the end of
+the file, so sessions running at once can share a log, and a block never depends on
+an earlier one. A block starts with the byte BLOCK_START, the session's id and the
+time of its first record, in microseconds since the epoch. It's followed by
+records, each starting with one byte:
+
+- LEVEL_START marks the start of a level. It's followed by the microseconds since
+  the previous record in the block, and by the level file, level name and level
+  content hash, each as a length and UTF-8 bytes.
+- Any other byte is the code of an Action in ACTION_CODES. It's followed by the
+  microseconds since the previous record in the block and the microseconds taken to
+  draw the frame that followed the action, or 0 if no frame followed it.
+
+The first record in a block is 0 microseconds after the block's time. All numbers
+and lengths are unsigned LEB128 varints, so most actions take 3 or 4 bytes.
+
+"""
+import os
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Union
+
+from src.levelloader import LevelKey
+from src.util import UTF_8, Action, RoguelikeSokobanError
+
+LOG_MAGIC = b"RLSKLOG2"
+BLOCK_START = 0xFE
+LEVEL_START = 0xFF
+ACTION_CODES = {
+    Action.UP: 0,
+    Action.DOWN: 1,
+    Action.LEFT: 2,
+    Action.RIGHT: 3,
+    Action.QUIT: 4,
+    Action.PLAY_AGAIN: 5,
+    Action.OTHER: 6,
+    Action.NONE: 7,
+    Action.HINT: 8,
+}
+FLUSH_INTERVAL_SECONDS = 1.0
+READ_CHUNK_SIZE = 1 << 16
+
+_CODE_ACTIONS = {code: act for act, code in ACTION_CODES.items()}
+
+
+class LevelStart(NamedTuple):
+    """A LEVEL_START record, with time in seconds since the epoch.
+
+    session is the id of the session that logged the record.
+
+    """
+
+    session: int
+    time: float
+    level_filename: Path
+    level_name: str
+    content_hash: str
+
+
+class LoggedAction(NamedTuple):
+    """An action record, with times in seconds.
+
+    render_time is None if no frame was drawn after the action. The action belongs
+    to the level in the last LevelStart with the same session.
+
+    """
+
+    session: int
+    action: Action
+    time: float
+    render_time: Optional[float]
+
+
+def _encode_varint(value: int, buffer: bytearray) -> None:
+    """Append value to buffer as an unsigned LEB128 varint."""
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _encode_text(text: str, buffer: bytearray) -> None:
+    """Append text to buffer as a length and UTF-8 bytes."""
+    data = text.encode(UTF_8)
+    _encode_varint(len(data), buffer)
+    buffer += data
+
+
+class ActionLogWriter:
+    """Appends records to an action log.
+
+    Records are kept in memory and written to the file every flush_interval seconds
+    from a background thread, so logging doesn't wait for the disk. Each flush
+    writes one block, see the module docstring. Use as a context manager, or call
+    close() when done.
+
+    """
+
+    def __init__(
+        self, log_filename: Path, flush_interval: float = FLUSH_INTERVAL_SECONDS
+    ):
+        self._fd = _open_log(log_filename)
+        self.session = int.from_bytes(os.urandom(8), "big")
+        # Records are timed with the monotonic clock, and logged as times since the
+        # epoch by adding this.
+        self._epoch_offset_us = time.time_ns() // 1000 - time.monotonic_ns() // 1000
+        # The block being built, see the module docstring.
+        self._buffer = bytearray()
+        # Time (us since the epoch) of the last record in the buffer.
+        self._last_time_us = 0
+        # Action and time (us) of an action waiting to see if a frame follows it.
+        self._pending: Optional[tuple[Action, int]] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop_flushing = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,), daemon=True
+        )
+        self._flusher.start()
+
+    def __enter__(self) -> "ActionLogWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _flush_periodically(self, flush_interval: float) -> None:
+        """Flush every flush_interval seconds until closed."""
+        while not self._stop_flushing.wait(flush_interval):
+            self.flush()
+
+    def _now_us(self) -> int:
+        """Return the time now in microseconds since the epoch."""
+        return time.monotonic_ns() // 1000 + self._epoch_offset_us
+
+    def _start_record_locked(self, code: int, time_us: int) -> None:
+        """Add the start of a record to the buffer. The lock must be held."""
+        if not self._buffer:
+            self._buffer.append(BLOCK_START)
+            _encode_varint(self.session, self._buffer)
+            _encode_varint(time_us, self._buffer)
+            self._last_time_us = time_us
+        self._buffer.append(code)
+        _encode_varint(time_us - self._last_time_us, self._buffer)
+        self._last_time_us = time_us
+
+    def _write_pending_locked(self, render_us: int) -> None:
+        """Add the pending action to the buffer. The lock must be held."""
+        if self._pending is None:
+            return
+        act, time_us = self._pending
+        self._pending = None
+        self._start_record_locked(ACTION_CODES[act], time_us)
+        _encode_varint(render_us, self._buffer)
+
+    def start_level(self, level: LevelKey) -> None:
+        """Record the start of a level."""
+        with self._lock:
+            self._write_pending_locked(0)
+            self._start_record_locked(LEVEL_START, self._now_us())
+            _encode_text(str(level.level_filename), self._buffer)
+            _encode_text(level.level_name, self._buffer)
+            _encode_text(level.content_hash, self._buffer)
+
+    def record_action(self, act: Action) -> None:
+        """Record an action taken now."""
+        with self._lock:
+            self._write_pending_locked(0)
+            self._pending = (act, self._now_us())
+
+    def record_frame(self, render_time: float) -> None:
+        """Record that a frame took render_time seconds to draw.
+
+        The time is recorded with the last action, if no frame was recorded since it.
+
+        """
+        with self._lock:
+            # At least 1, since 0 means no frame.
+            self._write_pending_locked(max(1, round(render_time * 1_000_000)))
+
+    def flush(self) -> None:
+        """Write buffered records to the file as one block."""
+        # _write_lock keeps blocks in order if flushes overlap. _lock is only held
+        # to take the buffer, so recording doesn't wait for the write.
+        with self._write_lock:
+            with self._lock:
+                block, self._buffer = self._buffer, bytearray()
+            if not block:
+                return
+            # A single write to a file opened with O_APPEND lands whole at the end
+            # of the file, even with other sessions writing to it.
+            _write_all(self._fd, block)
+
+    def close(self) -> None:
+        """Stop the background thread and write all records."""
+        self._stop_flushing.set()
+        self._flusher.join()
+        with self._lock:
+            self._write_pending_locked(0)
+        self.flush()
+        os.close(self._fd)
+
+
+def _open_log(log_filename: Path) -> int:
+    """Open log_filename for appending, creating it if needed, and return the fd.
+
+    Raise RoguelikeSokobanError if the file exists and isn't an action log.
+
+    """
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+    try:
+        fd = os.open(log_filename, flags | os.O_EXCL)
+    except FileExistsError:
+        pass
+    else:
+        _write_all(fd, LOG_MAGIC)
+        return fd
+    fd = os.open(log_filename, flags)
+    with log_filename.open(mode="rb") as file:
+        magic = file.read(len(LOG_MAGIC))
+    # A log just created by another session may not have its LOG_MAGIC yet.
+    if not LOG_MAGIC.startswith(magic):
+        os.close(fd)
+        raise RoguelikeSokobanError(f"not an action log: '{log_filename}'")
+    return fd
+
+
+def _write_all(fd: int, data: Union[bytes, bytearray]) -> None:
+    """Write data to fd, normally with a single write."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+class _ChunkReader:
+    """Reads bytes and varints from a file a chunk at a time."""
+
+    def __init__(self, file: BinaryIO):
+        self._file = file
+        self._chunk = b""
+        self._pos = 0
+
+    def _fill(self) -> bool:
+        """Read the next chunk. Return False at the end of the file."""
+        self._chunk = self._file.read(READ_CHUNK_SIZE)
+        self._pos = 0
+        return bool(self._chunk)
+
+    def read_byte(self) -> Optional[int]:
+        """Return the next byte, or None at the end of the file."""
+        if self._pos == len(self._chunk) and not self._fill():
+            return None
+        byte = self._chunk[self._pos]
+        self._pos += 1
+        return byte
+
+    def read_varint(self) -> int:
+        """Return the next unsigned LEB128 varint."""
+        value = 0
+        shift = 0
+        while True:
+            byte = self.read_byte()
+            if byte is None:
+                raise RoguelikeSokobanError("action log ends in the middle of a record")
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_text(self) -> str:
+        """Return the next length and UTF-8 bytes as text."""
+        length = self.read_varint()
+        data = bytearray()
+        while len(data) < length:
+            if self._pos == len(self._chunk) and not self._fill():
+                raise RoguelikeSokobanError("action log ends in the middle of a record")
+            end = self._pos + length - len(data)
+            data += self._chunk[self._pos : end]
+            self._pos = min(end, len(self._chunk))
+        return data.decode(UTF_8)
+
+
+def read_action_log(log_filename: Path) -> Iterator[Union[LevelStart, LoggedAction]]:
+    """Yield the records in an action log in order.
+
+    Records from sessions that shared the log are interleaved a block at a time, use
+    each record's session to tell them apart. The log is read a chunk at a time, so
+    logs of any size can be read.
+
+    """
+    with log_filename.open(mode="rb") as file:
+        if file.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise RoguelikeSokobanError(f"not an action log: '{log_filename}'")
+        reader = _ChunkReader(file)
+        # Sessions that have started a level.
+        started: set[int] = set()
+        session: Optional[int] = None
+        time_us = 0
+        while True:
+            code = reader.read_byte()
+            if code is None:
+                return
+            if code == BLOCK_START:
+                session = reader.read_varint()
+                time_us = reader.read_varint()
+                continue
+            if session is None:
+                raise RoguelikeSokobanError("action log record outside a block")
+            if code == LEVEL_START:
+                time_us += reader.read_varint()
+                started.add(session)
+                yield LevelStart(
+                    session,
+                    time_us / 1_000_000,
+                    Path(reader.read_text()),
+                    reader.read_text(),
+                    reader.read_text(),
+                )
+                continue
+            if code not in _CODE_ACTIONS:
+                raise RoguelikeSokobanError(f"unknown action log record: {code}")
+            if session not in started:
+                raise RoguelikeSokobanError("action logged before any level started")
+            time_us += reader.read_varint()
+            render_us = reader.read_varint()
+            yield LoggedAction(
+                session,
+                _CODE_ACTIONS[code],
+                time_us / 1_000_000,
+                render_us / 1_000_000 if render_us else None,
+            )
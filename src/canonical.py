@@ -0,0 +1,96 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Canonical forms and content hashes for level maps.
+
+Two levels have the same canonical form if they play the same, regardless of the
+symbols their level files use, how much blank space surrounds them, or how they are
+rotated or reflected. Walls and blanks both block the player and boulders, so they
+are treated as the same thing.
+
+"""
+import hashlib
+from typing import Sequence
+
+from src.util import Symbols
+
+CANONICAL_SYMBOLS = {"boulder": "0", "floor": ".", "pit": "^", "player": "@"}
+CANONICAL_SOLID = "#"
+
+CanonicalMap = tuple[str, ...]
+
+
+def _to_canonical_symbols(level_map: Sequence[str], symbols: Symbols) -> list[str]:
+    """Rewrite level_map with CANONICAL_SYMBOLS and CANONICAL_SOLID."""
+    lookup = {
+        symbols[symbol_name]: canonical_symbol
+        for symbol_name, canonical_symbol in CANONICAL_SYMBOLS.items()
+    }
+    return [
+        "".join(lookup.get(char, CANONICAL_SOLID) for char in row) for row in level_map
+    ]
+
+
+def _trim(grid: list[str]) -> list[str]:
+    """Remove rows and columns of CANONICAL_SOLID from the edges of grid."""
+    rows = [i for i, row in enumerate(grid) if row.strip(CANONICAL_SOLID)]
+    if not rows:
+        return []
+    cols = [
+        j for j in range(len(grid[0])) if any(row[j] != CANONICAL_SOLID for row in grid)
+    ]
+    return [row[cols[0] : cols[-1] + 1] for row in grid[rows[0] : rows[-1] + 1]]
+
+
+def _rotate(grid: CanonicalMap) -> CanonicalMap:
+    """Rotate grid 90 degrees clockwise."""
+    return tuple("".join(col) for col in zip(*reversed(grid)))
+
+
+def _symmetries(grid: CanonicalMap) -> list[CanonicalMap]:
+    """Return the 8 rotations and reflections of grid."""
+    results: list[CanonicalMap] = []
+    for candidate in (grid, tuple(row[::-1] for row in grid)):
+        for _ in range(4):
+            results.append(candidate)
+            candidate = _rotate(candidate)
+    return results
+
+
+def canonical_form(level_map: Sequence[str], symbols: Symbols) -> CanonicalMap:
+    """Return the canonical form of level_map, which uses symbols."""
+    grid = tuple(_trim(_to_canonical_symbols(level_map, symbols)))
+    return min(_symmetries(grid))
+
+
+def canonical_layout(level_map: Sequence[str], symbols: Symbols) -> CanonicalMap:
+    """Return the canonical form of level_map with everything on the floor removed.
+
+    Levels with the same layout have the same walkable area, but may have different
+    boulders, pits, or player starting points.
+
+    """
+    floor_translation = str.maketrans(
+        {
+            CANONICAL_SYMBOLS[symbol_name]: CANONICAL_SYMBOLS["floor"]
+            for symbol_name in ("boulder", "pit", "player")
+        }
+    )
+    grid = tuple(
+        row.translate(floor_translation)
+        for row in _trim(_to_canonical_symbols(level_map, symbols))
+    )
+    return min(_symmetries(grid))
+
+
+def hash_canonical_map(canonical_map: CanonicalMap) -> str:
+    """Return a content hash of canonical_map."""
+    return hashlib.blake2b(
+        "\n".join(canonical_map).encode(), digest_size=16
+    ).hexdigest()
+
+
+def level_hash(level_map: Sequence[str], symbols: Symbols) -> str:
+    """Return a content hash that is the same for all levels that play the same."""
+    return hash_canonical_map(canonical_form(level_map, symbols))
@@ -9,6 +9,7 @@ from typing import Literal, Optional
 from src.universe import Universe
 from src.util import (
     GAME_NAME,
+    HINT,
     PLAY_AGAIN,
     QUIT,
     TERMINAL_TOO_SMALL_TEXT,
@@ -16,6 +17,8 @@ from src.util import (
     RoguelikeSokobanError,
 )
 
+HINT_PROMPT = f"Press '{HINT}' for a hint."
+
 _Lines = dict[Literal["top", "bottom"], list[str]]
 _Scroll = dict[str, bool]
 
@@ -133,6 +136,7 @@ class Display:
             "goal": "Fill every pit to solve the puzzle.",
             "play_again_prompt": f"-- Press '{PLAY_AGAIN}' to play again --",
             "quit_prompt": f"-- Press '{QUIT}' to quit --",
+            "hint_line": HINT_PROMPT,
         }
         self.best_score = best_score
 
@@ -179,6 +183,7 @@ class Display:
                         + self.text["status_moves"]
                     ),
                     self.text["best_score"],
+                    self.text["hint_line"],
                     self.text["bug_line"],
                 ],
             }
@@ -263,6 +268,9 @@ class Display:
     def get_action(self) -> Action:
         """Get an action from the player."""
         k = self.scrn.getch()
+        if k == -1:
+            # No key was pressed before the screen's timeout.
+            return Action.NONE
         if k == curses.KEY_RESIZE:
             self.scrn.clear()
             curses.endwin()
@@ -280,6 +288,8 @@ class Display:
             act = Action.QUIT
         elif k == ord(PLAY_AGAIN):
             act = Action.PLAY_AGAIN
+        elif k == ord(HINT):
+            act = Action.HINT
         else:
             act = Action.OTHER
         return act
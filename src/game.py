@@ -0,0 +1,214 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import curses
+import time
+from typing import TYPE_CHECKING, Optional
+
+from src.display import HINT_PROMPT, Display
+from src.hints import HintFinder
+from src.levelloader import LevelKey, LevelLoader
+from src.score_tracking import Scores
+from src.solutions import encode_moves
+from src.universe import Universe
+from src.util import Action, RoguelikeSokobanError
+
+if TYPE_CHECKING:
+    from src.action_log import ActionLogWriter
+
+# How often to check for level file changes when watching the level file.
+_WATCH_INTERVAL_MS = 500
+# How often to check whether a hint search has finished.
+_HINT_POLL_INTERVAL_MS = 100
+
+
+class Game:
+    """Plays levels from loader on scrn until the player quits.
+
+    See src.main.main for watch and action_log.
+
+    """
+
+    def __init__(
+        self,
+        scrn: curses.window,
+        loader: LevelLoader,
+        scores: Scores,
+        watch: bool = False,
+        action_log: Optional["ActionLogWriter"] = None,
+    ):
+        self._scrn = scrn
+        self._loader = loader
+        self._scores = scores
+        self._watch = watch
+        self._action_log = action_log
+        # level -> hints for the level. Keyed by the whole LevelKey, not just the
+        # content hash, since rotated or mirrored copies of a level share a hash
+        # but need hints in different directions.
+        self._hint_finders: dict[LevelKey, HintFinder] = {}
+        # The level being played, set by _start_level.
+        self._univ: Universe
+        self._level_key: LevelKey
+        self._disp: Display
+        self._hints: HintFinder
+        self._hint_pending = False
+
+    def play(self, level_name: Optional[str]) -> None:
+        """Play levels, starting with level_name if given, until the player quits.
+
+        If a chosen level can't be played, the player is asked for another level.
+        Quitting raises KeyboardInterrupt.
+
+        """
+        error: Optional[str] = None
+        while True:
+            if level_name is None:
+                self._scrn.timeout(-1)
+                level_name = self._loader.level_prompt(self._scrn, error)
+                error = None
+            try:
+                self._start_level(level_name)
+            except RoguelikeSokobanError as exc:
+                # Levels checked when chosen, such as standard format levels, may
+                # turn out to be unplayable.
+                error = str(exc)
+                level_name = None
+                continue
+            level_name = self._play_level()
+
+    def _start_level(self, level_name: str) -> None:
+        """Start playing level_name from the beginning."""
+        loader = self._loader
+        univ = Universe(level_name, loader.levels[level_name], loader.symbols)
+        level_key = loader.get_level_key(univ.level_name)
+        if self._action_log is not None:
+            self._action_log.start_level(level_key)
+        self._univ = univ
+        self._level_key = level_key
+        self._disp = Display(self._scrn, univ, self._scores.get_score(level_key))
+        self._hints = self._hint_finders.setdefault(level_key, HintFinder())
+        self._set_hint_pending(False)
+
+    def _set_hint_pending(self, hint_pending: bool) -> None:
+        """Remember whether a hint is being searched for and set the key timeout.
+
+        While waiting for a key, the game stops to check for other work as often as
+        that work needs.
+
+        """
+        self._hint_pending = hint_pending
+        if hint_pending:
+            self._scrn.timeout(_HINT_POLL_INTERVAL_MS)
+        elif self._watch:
+            self._scrn.timeout(_WATCH_INTERVAL_MS)
+        else:
+            self._scrn.timeout(-1)
+
+    def _draw(self) -> None:
+        """Draw the level, timing it if actions are logged."""
+        draw_start = time.perf_counter()
+        self._disp.draw(self._univ)
+        if self._action_log is not None:
+            self._action_log.record_frame(time.perf_counter() - draw_start)
+
+    def _play_level(self) -> Optional[str]:
+        """Play the current level until the player leaves it.
+
+        Return the name of the level to play next, or None to ask the player.
+
+        """
+        redraw = True
+        while True:
+            if redraw:
+                self._draw()
+            act = self._disp.get_action()
+            if act == Action.NONE:
+                redraw = self._check_background_work()
+                continue
+
+            if self._action_log is not None:
+                self._action_log.record_action(act)
+            redraw = True
+            if act == Action.OTHER:
+                continue
+
+            if act == Action.QUIT:
+                raise KeyboardInterrupt
+
+            if act == Action.PLAY_AGAIN:
+                self._hints.cancel()
+                self._scores.flush()
+                return None if self._univ.game_won else self._univ.level_name
+
+            if act == Action.HINT:
+                self._request_hint()
+            else:
+                self._move(act)
+
+    def _check_background_work(self) -> bool:
+        """Show a hint that was found and reload the level if it changed.
+
+        Return True if the screen needs to be drawn again.
+
+        """
+        redraw = False
+        if self._hint_pending:
+            hint = self._hints.get_hint(self._univ)
+            if hint is not None:
+                self._disp.text["hint_line"] = hint.describe()
+                self._set_hint_pending(False)
+                redraw = True
+        if self._watch:
+            redraw = self._reload_if_changed() or redraw
+        return redraw
+
+    def _reload_if_changed(self) -> bool:
+        """Restart the level with its new map if the level file changed it.
+
+        Return True if the screen needs to be drawn again.
+
+        """
+        level_name = self._univ.level_name
+        hints = self._hints
+        try:
+            if level_name not in self._loader.reload_if_changed():
+                return False
+            if level_name not in self._loader.levels:
+                raise RoguelikeSokobanError(f"level removed: '{level_name}'")
+            self._start_level(level_name)
+            hints.cancel()
+        except (OSError, ValueError, RoguelikeSokobanError) as exc:
+            # The level file may be read while an editor is saving it.
+            self._disp.text["bug_line"] = f"Level not reloaded: {exc}"
+        return True
+
+    def _request_hint(self) -> None:
+        """Show the hint for the current state, or start searching for it."""
+        if self._univ.game_won:
+            return
+        hint = self._hints.request_hint(self._univ)
+        if hint is None:
+            self._disp.text["hint_line"] = "Hint: searching..."
+            self._set_hint_pending(True)
+        else:
+            self._disp.text["hint_line"] = hint.describe()
+
+    def _move(self, act: Action) -> None:
+        """Take a move and save the score if it wins the level."""
+        univ = self._univ
+        already_won = univ.game_won
+        moves_taken = univ.moves_taken
+        univ.eval_action(act)
+        if univ.moves_taken != moves_taken:
+            self._hints.cancel()
+            self._disp.text["hint_line"] = HINT_PROMPT
+            if self._hint_pending:
+                self._set_hint_pending(False)
+        if univ.game_won and not already_won:
+            self._scores.update_best_score(
+                self._level_key,
+                univ.moves_taken,
+                encode_moves(univ.actions_taken),
+            )
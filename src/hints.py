@@ -0,0 +1,236 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Hints for the next move, found by searching in a background thread.
+
+The search is breadth first over every move, so a hint is the first move of a
+solution with the fewest moves. Searches give up after SEARCH_LIMIT game states, so
+hints aren't found in levels that are too big to search.
+
+"""
+import threading
+from collections import deque
+from typing import NamedTuple, Optional
+
+from src.universe import MOVE_DELTAS, Universe
+from src.util import Action, Symbols
+
+SEARCH_LIMIT = 100_000
+
+_Position = tuple[int, int]
+# player, boulders and unfilled pits
+_SearchState = tuple[_Position, frozenset[_Position], frozenset[_Position]]
+
+# How many states to search between checks for cancellation.
+_CANCEL_CHECK_INTERVAL = 1000
+
+
+class Hint(NamedTuple):
+    """The result of a hint search.
+
+    action is the next move of a shortest solution, or None if no solution was
+    found. If no solution was found, exhausted is True if there is no solution from
+    here, and False if the search gave up. error describes why the search failed, if
+    it did.
+
+    """
+
+    action: Optional[Action]
+    exhausted: bool
+    error: Optional[str] = None
+
+    def describe(self) -> str:
+        """Return the hint as text for the player."""
+        if self.action is not None:
+            return f"Hint: move {self.action.value}"
+        if self.error is not None:
+            return f"Hint: search failed: {self.error}"
+        if self.exhausted:
+            return "Hint: no solution from here"
+        return "Hint: none found, the level is too big to search"
+
+
+def get_search_state(univ: Universe) -> _SearchState:
+    """Return the parts of univ that can change while playing."""
+    pit = univ.level_sym["pit"]
+    pits = frozenset(
+        (row_index, col_index)
+        for row_index, row in enumerate(univ.level_map)
+        if pit in row
+        for col_index, square in enumerate(row)
+        if square == pit
+    )
+    return (
+        (univ.player.curr_y, univ.player.curr_x),
+        frozenset(univ.boulders_by_position),
+        pits,
+    )
+
+
+class _SearchStart(NamedTuple):
+    """What a search needs from a Universe, so it can be changed while searching."""
+
+    state: _SearchState
+    level_map: list[str]
+    level_sym: Symbols
+
+
+def _get_search_start(univ: Universe) -> _SearchStart:
+    """Return what a search from the current state of univ needs."""
+    return _SearchStart(get_search_state(univ), list(univ.level_map), univ.level_sym)
+
+
+def _search(
+    start: _SearchStart, search_limit: int, cancelled: Optional[threading.Event]
+) -> Optional[dict[_SearchState, Hint]]:
+    """Search for a shortest solution from start. See search_hints."""
+    level_map = start.level_map
+    height = len(level_map)
+    width = len(level_map[0])
+    floor = start.level_sym["floor"]
+    pit = start.level_sym["pit"]
+    parents: dict[_SearchState, Optional[tuple[_SearchState, Action]]] = {
+        start.state: None
+    }
+    queue = deque([start.state])
+    searched = 0
+    while queue:
+        if len(parents) > search_limit:
+            return {start.state: Hint(None, False)}
+        searched += 1
+        if cancelled is not None and searched % _CANCEL_CHECK_INTERVAL == 0:
+            if cancelled.is_set():
+                return None
+        state = queue.popleft()
+        (player_y, player_x), boulders, pits = state
+        for act, (change_y, change_x) in MOVE_DELTAS.items():
+            target = (player_y + change_y, player_x + change_x)
+            if not (0 <= target[0] < height and 0 <= target[1] < width):
+                continue
+            if target not in boulders:
+                square = level_map[target[0]][target[1]]
+                # Pits filled during the search are still pits in level_map.
+                if square != floor and (square != pit or target in pits):
+                    continue
+                next_state = (target, boulders, pits)
+            else:
+                beyond = (target[0] + change_y, target[1] + change_x)
+                if not (0 <= beyond[0] < height and 0 <= beyond[1] < width):
+                    continue
+                square = level_map[beyond[0]][beyond[1]]
+                if beyond in boulders or square not in (floor, pit):
+                    continue
+                if beyond in pits:
+                    next_state = (target, boulders - {target}, pits - {beyond})
+                else:
+                    next_state = (target, boulders - {target} | {beyond}, pits)
+            if next_state in parents:
+                continue
+            parents[next_state] = (state, act)
+            if not next_state[2]:
+                return _path_hints(parents, next_state)
+            queue.append(next_state)
+    return {start.state: Hint(None, True)}
+
+
+def search_hints(
+    univ: Universe,
+    search_limit: int = SEARCH_LIMIT,
+    cancelled: Optional[threading.Event] = None,
+) -> Optional[dict[_SearchState, Hint]]:
+    """Search for a shortest solution from the current state of univ.
+
+    Return hints for the states along the solution, starting with the current
+    state, or a hint for the current state if no solution was found. Return None if
+    cancelled was set before the search finished.
+
+    """
+    return _search(_get_search_start(univ), search_limit, cancelled)
+
+
+def _path_hints(
+    parents: dict[_SearchState, Optional[tuple[_SearchState, Action]]],
+    solved: _SearchState,
+) -> dict[_SearchState, Hint]:
+    """Return the hint for every state on the path from the start to solved."""
+    hints: dict[_SearchState, Hint] = {}
+    parent = parents[solved]
+    while parent is not None:
+        state, act = parent
+        hints[state] = Hint(act, False)
+        parent = parents[state]
+    return hints
+
+
+class HintFinder:
+    """Finds hints in a background thread and remembers them.
+
+    Remembered hints are for game states of one level, so use a new HintFinder for
+    each level.
+
+    """
+
+    def __init__(self, search_limit: int = SEARCH_LIMIT):
+        self._search_limit = search_limit
+        self._hints: dict[_SearchState, Hint] = {}
+        self._lock = threading.Lock()
+        self._cancelled: Optional[threading.Event] = None
+
+    @property
+    def searching(self) -> bool:
+        """Return True if a search is running."""
+        return self._cancelled is not None
+
+    def get_hint(self, univ: Universe) -> Optional[Hint]:
+        """Return the hint for the current state of univ, if it's known."""
+        state = get_search_state(univ)
+        with self._lock:
+            return self._hints.get(state)
+
+    def request_hint(self, univ: Universe) -> Optional[Hint]:
+        """Return the hint for the current state of univ, or start searching for it.
+
+        If the hint isn't known, a search is started in a background thread, unless
+        one is already running, and None is returned. Use get_hint to check for the
+        result.
+
+        """
+        hint = self.get_hint(univ)
+        if hint is not None or self.searching:
+            return hint
+        cancelled = threading.Event()
+        self._cancelled = cancelled
+        thread = threading.Thread(
+            target=self._search,
+            args=(_get_search_start(univ), cancelled),
+            daemon=True,
+        )
+        thread.start()
+        return None
+
+    def _search(self, start: _SearchStart, cancelled: threading.Event) -> None:
+        """Search for hints from start and remember them.
+
+        If the search fails, the failure is remembered as the hint for start, so the
+        player isn't left waiting for a hint.
+
+        """
+        hints = None
+        try:
+            hints = _search(start, self._search_limit, cancelled)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            hints = {start.state: Hint(None, False, f"{type(exc).__name__}: {exc}")}
+        finally:
+            with self._lock:
+                if hints is not None:
+                    self._hints.update(hints)
+                if self._cancelled is cancelled:
+                    self._cancelled = None
+
+    def cancel(self) -> None:
+        """Stop the running search, if any, without waiting for it."""
+        with self._lock:
+            if self._cancelled is not None:
+                self._cancelled.set()
+                self._cancelled = None
@@ -0,0 +1,175 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Per-level metadata, and sidecar index files that store it for each level file.
+
+A level file's index is stored next to it as "<level file name>.index.json". The
+index records the size and modification time of the level file it was built from,
+and is ignored once the level file changes.
+
+"""
+import json
+import operator
+import os
+import re
+from pathlib import Path
+from typing import Callable, Optional, Sequence, TypedDict
+
+from src.levelloader import LevelLoader
+from src.util import METADATA_FIELDS, UTF_8, RoguelikeSokobanError, Symbols
+
+INDEX_SUFFIX = ".index.json"
+_INDEX_VERSION = 1
+
+
+class LevelMetadata(TypedDict):
+    """Represents summary information about a level."""
+
+    width: int
+    height: int
+    floor: int
+    boulders: int
+    pits: int
+    spare: int
+    min_moves: int
+
+
+LevelsMetadata = dict[str, LevelMetadata]
+
+_FILTER_PATTERN = re.compile(r"^(\w+)\s*(<=|>=|<|>|=)\s*(\d+)$")
+_FILTER_OPERATORS: dict[str, Callable[[int, int], bool]] = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+    "=": operator.eq,
+}
+
+
+def compute_metadata(level_map: Sequence[str], symbols: Symbols) -> LevelMetadata:
+    """Return metadata for a level array from LevelLoader.levels.
+
+    The level array's padding isn't counted in the width and height. "floor" counts
+    every square the player could stand on, and "spare" is how many more boulders
+    there are than pits. "min_moves" is a lower bound on the moves needed to win:
+    each pit needs its own boulder pushed into it, which takes at least as many
+    moves as the grid distance from the closest boulder to the pit.
+
+    """
+    walkable = {symbols[name] for name in ("boulder", "floor", "pit", "player")}
+    boulders: list[tuple[int, int]] = []
+    pits: list[tuple[int, int]] = []
+    floor = 0
+    for row_index, row in enumerate(level_map):
+        for col_index, square in enumerate(row):
+            if square in walkable:
+                floor += 1
+            if square == symbols["boulder"]:
+                boulders.append((row_index, col_index))
+            elif square == symbols["pit"]:
+                pits.append((row_index, col_index))
+
+    min_moves = 0
+    if boulders:
+        for pit_y, pit_x in pits:
+            min_moves += min(
+                abs(pit_y - boulder_y) + abs(pit_x - boulder_x)
+                for boulder_y, boulder_x in boulders
+            )
+
+    return {
+        "width": len(level_map[0]) - 2,
+        "height": len(level_map) - 2,
+        "floor": floor,
+        "boulders": len(boulders),
+        "pits": len(pits),
+        "spare": len(boulders) - len(pits),
+        "min_moves": min_moves,
+    }
+
+
+def build_metadata(loader: LevelLoader) -> LevelsMetadata:
+    """Return metadata for every level in loader that can be played."""
+    metadata: LevelsMetadata = {}
+    for level_name in loader.levels:
+        try:
+            level_map = loader.levels[level_name]
+        except RoguelikeSokobanError:
+            continue
+        metadata[level_name] = compute_metadata(level_map, loader.symbols)
+    return metadata
+
+
+def describe_metadata(level_metadata: LevelMetadata) -> str:
+    """Return level_metadata as a short line of text."""
+    return (
+        f"{level_metadata['width']}x{level_metadata['height']} "
+        f"floor={level_metadata['floor']} "
+        f"boulders={level_metadata['boulders']} "
+        f"pits={level_metadata['pits']} "
+        f"spare={level_metadata['spare']} "
+        f"min_moves={level_metadata['min_moves']}"
+    )
+
+
+def _index_filename(level_filename: Path) -> Path:
+    """Return the index filename for level_filename."""
+    return level_filename.with_name(level_filename.name + INDEX_SUFFIX)
+
+
+def _source_stamp(level_filename: Path) -> list[int]:
+    """Return values that change whenever level_filename changes."""
+    stat = level_filename.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_index(level_filename: Path) -> Optional[LevelsMetadata]:
+    """Return the metadata in level_filename's index, or None if it's not current."""
+    try:
+        data = json.loads(_index_filename(level_filename).read_text(encoding=UTF_8))
+    except (FileNotFoundError, ValueError):
+        return None
+    if data.get("version") != _INDEX_VERSION:
+        return None
+    if data.get("source") != _source_stamp(level_filename):
+        return None
+    levels_metadata: LevelsMetadata = data["levels"]
+    return levels_metadata
+
+
+def write_index(level_filename: Path, metadata: LevelsMetadata) -> Path:
+    """Write metadata to level_filename's index and return the index filename."""
+    index_filename = _index_filename(level_filename)
+    temp_filename = index_filename.with_name(index_filename.name + ".tmp")
+    data = {
+        "version": _INDEX_VERSION,
+        "source": _source_stamp(level_filename),
+        "levels": metadata,
+    }
+    with temp_filename.open(mode="w", encoding=UTF_8) as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+    os.replace(temp_filename, index_filename)
+    return index_filename
+
+
+def check_field(field: str) -> str:
+    """Return field if it's a metadata field, otherwise raise an error."""
+    if field not in METADATA_FIELDS:
+        raise RoguelikeSokobanError(f"unknown level field: '{field}'")
+    return field
+
+
+def parse_filter(expression: str) -> Callable[[LevelMetadata], bool]:
+    """Return a test for expressions like "boulders>10" or "width<=20"."""
+    match = _FILTER_PATTERN.match(expression.strip())
+    if match is None:
+        raise RoguelikeSokobanError(f"invalid filter: '{expression}'")
+    field, operator_str, value_str = match.groups()
+    check_field(field)
+    compare = _FILTER_OPERATORS[operator_str]
+    value = int(value_str)
+    return lambda level_metadata: compare(
+        level_metadata[field], value  # type: ignore[literal-required]
+    )
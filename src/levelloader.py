@@ -4,16 +4,60 @@ Licensed under the GNU General Public License (GPL) v3.
 
 """
 import curses
+import io
+import re
 from pathlib import Path
-from typing import Sequence, TypedDict
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TypedDict,
+)
 
+from src.sokoban_format import (
+    RL_SYMBOLS,
+    STANDARD_FORMAT_SUFFIXES,
+    convert_level,
+    is_good_level,
+    iter_collection,
+    level_to_str,
+)
 from src.util import (
+    FILTER_LEVELS,
     GAME_NAME,
+    METADATA_FIELDS,
+    NEXT_PAGE,
+    PREVIOUS_PAGE,
     QUIT,
+    SORT_LEVELS,
     TERMINAL_TOO_SMALL_TEXT,
     UTF_8,
     LevelFileConsts,
     RoguelikeSokobanError,
+    Symbols,
+)
+
+if TYPE_CHECKING:
+    from src.level_index import LevelsMetadata
+
+LEVEL_FILE_SUFFIXES = (".txt",) + STANDARD_FORMAT_SUFFIXES
+
+_MAPS_START_PATTERN = re.compile(
+    rf"^{re.escape(LevelFileConsts.MAPS_START)}[^\S\n]*(\n|\Z)", re.MULTILINE
+)
+_LEVEL_START_PATTERN = re.compile(
+    rf"^(?={re.escape(LevelFileConsts.NAME_PREFIX)})", re.MULTILINE
+)
+
+_FIRST_PROMPT = f"Enter the number of the level you want to play, or '{QUIT}' to quit: "
+_INVALID_INPUT_PROMPT = (
+    f"Invalid choice, please enter the number of an available level, or '{QUIT}' to "
+    "quit: "
 )
 
 
@@ -26,17 +70,56 @@ class LevelStr(TypedDict):
 
 LevelsStr = list[LevelStr]
 
-Symbols = dict[str, str]
 
+class LevelKey(NamedTuple):
+    """Identifies a level that scores are saved for.
 
-def _get_levels_from_file(level_filename: Path) -> tuple[Symbols, LevelsStr]:
-    """Return all level information from a file."""
-    with level_filename.open(encoding=UTF_8) as file:
-        lines = file.readlines()
+    Scores are looked up by content_hash, see src/canonical.py, so they still apply
+    when the level file is moved. level_filename and level_name are where the level
+    was played from.
+
+    """
+
+    content_hash: str
+    level_filename: Path
+    level_name: str
+
+
+def find_level_files(level_dir: Path) -> list[Path]:
+    """Return all level files in level_dir, sorted by name."""
+    return sorted(
+        filename
+        for filename in level_dir.iterdir()
+        if filename.suffix.lower() in LEVEL_FILE_SUFFIXES
+    )
+
+
+def _get_source_stamp(level_filename: Path) -> tuple[int, int]:
+    """Return values that change whenever level_filename changes."""
+    stat = level_filename.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _split_level_text(text: str) -> tuple[str, list[str]]:
+    """Split the text of a level file into its symbols part and one part per level.
+
+    The symbols part ends with the maps start line. Each level part starts with the
+    level's name line, except the first, which has anything before the first name
+    line.
+
+    """
+    match = _MAPS_START_PATTERN.search(text)
+    if match is None:
+        return text, []
+    return text[: match.end()], _LEVEL_START_PATTERN.split(text[match.end() :])
 
+
+def _get_levels_from_lines(
+    lines: Iterable[str], in_maps: bool = False
+) -> tuple[Symbols, LevelsStr]:
+    """Return all level information from lines of a level file."""
     symbols: Symbols = {}
     levels: LevelsStr = []
-    in_maps = False
     for line in lines:
         line = line.rstrip()
         if line.startswith(LevelFileConsts.COMMENT_MARKER):
@@ -69,8 +152,22 @@ def _get_levels_from_file(level_filename: Path) -> tuple[Symbols, LevelsStr]:
     return symbols, levels
 
 
-def _validate_level_data(symbols: Symbols, levels: LevelsStr) -> None:
-    """Validate level data."""
+def _get_standard_levels_from_file(level_filename: Path) -> LevelsStr:
+    """Return all levels from a standard format file, without converting them."""
+    with level_filename.open(encoding=UTF_8) as file:
+        return [{"name": name, "map": map_} for name, map_ in iter_collection(file)]
+
+
+def _convert_standard_level(level: LevelStr) -> LevelStr:
+    """Convert a standard format level to one using RL_SYMBOLS."""
+    converted = convert_level(level["map"].split("\n"))
+    if not is_good_level(converted):
+        raise RoguelikeSokobanError(f"level can't be converted: '{level['name']}'")
+    return {"name": level["name"], "map": level_to_str(converted)}
+
+
+def _validate_symbols(symbols: Symbols) -> None:
+    """Validate symbol definitions."""
     for symbol_name, symbol_value in symbols.items():
         if len(symbol_value) < 1:
             raise RoguelikeSokobanError(f"empty symbol: '{symbol_name}'")
@@ -87,43 +184,48 @@ def _validate_level_data(symbols: Symbols, levels: LevelsStr) -> None:
         values = ", ".join(f"{k}={v}" for k, v in symbols.items())
         raise RoguelikeSokobanError(f"duplicate symbols in: '{values}'")
 
-    level_names: list[str] = []
-    for level in levels:
-        level_names.append(level["name"])
-        level_counts = {"boulder": 0, "player": 0, "pit": 0}
 
-        if not level["map"]:
-            raise RoguelikeSokobanError(
-                f"empty map for level: '{level['name']}'".format(name=level["name"])
-            )
+def _validate_level(symbols: Symbols, level: LevelStr) -> None:
+    """Validate a single level against already validated symbols."""
+    level_counts = {"boulder": 0, "player": 0, "pit": 0}
 
-        lines = level["map"].split("\n")
-        for line in lines:
-            if not line:
-                raise RoguelikeSokobanError(f"blank line in level: '{level['name']}'")
-            for char in line:
-                if char == symbols["boulder"]:
-                    level_counts["boulder"] += 1
-                elif char == symbols["player"]:
-                    level_counts["player"] += 1
-                elif char == symbols["pit"]:
-                    level_counts["pit"] += 1
-
-        if level_counts["player"] == 0:
-            raise RoguelikeSokobanError(
-                f"no player in level: '{level['name']}'".format(name=level["name"])
-            )
+    if not level["map"]:
+        raise RoguelikeSokobanError(
+            f"empty map for level: '{level['name']}'".format(name=level["name"])
+        )
+
+    lines = level["map"].split("\n")
+    for line in lines:
+        if not line:
+            raise RoguelikeSokobanError(f"blank line in level: '{level['name']}'")
+        for char in line:
+            if char == symbols["boulder"]:
+                level_counts["boulder"] += 1
+            elif char == symbols["player"]:
+                level_counts["player"] += 1
+            elif char == symbols["pit"]:
+                level_counts["pit"] += 1
+
+    if level_counts["player"] == 0:
+        raise RoguelikeSokobanError(
+            f"no player in level: '{level['name']}'".format(name=level["name"])
+        )
 
-        if level_counts["player"] > 1:
-            raise RoguelikeSokobanError(f"multiple players in level: '{level['name']}'")
+    if level_counts["player"] > 1:
+        raise RoguelikeSokobanError(f"multiple players in level: '{level['name']}'")
 
-        if level_counts["pit"] == 0:
-            raise RoguelikeSokobanError(f"no pits in level: '{level['name']}'")
+    if level_counts["pit"] == 0:
+        raise RoguelikeSokobanError(f"no pits in level: '{level['name']}'")
+
+    if level_counts["boulder"] < level_counts["pit"]:
+        raise RoguelikeSokobanError(f"not enough boulders in level: '{level['name']}'")
 
-        if level_counts["boulder"] < level_counts["pit"]:
-            raise RoguelikeSokobanError(
-                f"not enough boulders in level: '{level['name']}'"
-            )
+
+def _validate_level_data(symbols: Symbols, levels: LevelsStr) -> None:
+    """Validate level data."""
+    _validate_symbols(symbols)
+    for level in levels:
+        _validate_level(symbols, level)
 
 
 def _create_level_array(level_string: str) -> Sequence[str]:
@@ -141,75 +243,385 @@ def _create_level_array(level_string: str) -> Sequence[str]:
     return lines
 
 
+class _LevelMaps(Mapping[str, Sequence[str]]):
+    """Level maps by name, each converted to a level array on first access.
+
+    If validate is True, each level is validated on first access. Levels that are
+    changed by replace_levels are always validated again on their next access.
+
+    """
+
+    def __init__(
+        self,
+        symbols: Symbols,
+        levels_str: LevelsStr,
+        validate: bool,
+        convert: Optional[Callable[[LevelStr], LevelStr]] = None,
+    ):
+        self._symbols = symbols
+        self._levels_str = {level["name"]: level for level in levels_str}
+        self._convert = convert
+        self._arrays: dict[str, Sequence[str]] = {}
+        self._unvalidated = set(self._levels_str) if validate else set()
+
+    def __getitem__(self, level_name: str) -> Sequence[str]:
+        try:
+            return self._arrays[level_name]
+        except KeyError:
+            pass
+        level = self._levels_str[level_name]
+        if self._convert is not None:
+            level = self._convert(level)
+        if level_name in self._unvalidated:
+            _validate_level(self._symbols, level)
+            self._unvalidated.discard(level_name)
+        level_array = _create_level_array(level["map"])
+        self._arrays[level_name] = level_array
+        return level_array
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._levels_str)
+
+    def __len__(self) -> int:
+        return len(self._levels_str)
+
+    def replace_levels(self, levels_str: LevelsStr) -> set[str]:
+        """Replace all levels and return the names of added, removed, or changed levels.
+
+        Only changed levels are converted and validated again.
+
+        """
+        new_levels_str = {level["name"]: level for level in levels_str}
+        changed_names = set(self._levels_str).symmetric_difference(new_levels_str)
+        for level_name, level in new_levels_str.items():
+            old_level = self._levels_str.get(level_name)
+            if old_level is not None and old_level["map"] != level["map"]:
+                changed_names.add(level_name)
+
+        for level_name in changed_names:
+            self._arrays.pop(level_name, None)
+        self._unvalidated = (self._unvalidated | changed_names) & set(new_levels_str)
+        self._levels_str = new_levels_str
+        return changed_names
+
+
+def _read_choice(scrn: curses.window, prompt_y: int, prompt: str) -> str:
+    """Show prompt on row prompt_y and return what the player types."""
+    scrn.addstr(prompt_y, 0, prompt)
+    curses.echo()
+    curses.curs_set(1)
+    # FIXME: Weird things happen if you resize the terminal while being
+    # prompted for raw_choice. Various workarounds such as using getch
+    # rather than getstr or redrawing the screen if curses.KEY_RESIZE
+    # is found in raw_choice have not fixed everything.
+    raw_choice_unknown = scrn.getstr()
+    if isinstance(raw_choice_unknown, bytes):
+        raw_choice = raw_choice_unknown.decode("utf-8").strip()
+    else:
+        raise RoguelikeSokobanError("unknown value from getstr")
+    curses.curs_set(0)
+    curses.noecho()
+    return raw_choice
+
+
 class LevelLoader:
-    """Manages initializing levels."""
+    """Manages initializing levels.
+
+    With fast_start, only the symbols are validated up front and each level is
+    validated when it is first accessed, so the level prompt can be shown without
+    checking every map in the file.
+
+    Files with a suffix in STANDARD_FORMAT_SUFFIXES are read as standard Sokoban
+    level collections. Their levels are always converted and validated when first
+    accessed.
 
-    def __init__(self, level_filename: Path):
+    """
+
+    def __init__(self, level_filename: Path, fast_start: bool = False):
         self.level_filename = level_filename
-        self.symbols, levels_str = _get_levels_from_file(self.level_filename)
-        _validate_level_data(self.symbols, levels_str)
-        self.levels: dict[str, Sequence[str]] = {
-            level["name"]: _create_level_array(level["map"]) for level in levels_str
-        }
-
-    def _draw_names(self, scrn: curses.window) -> int:
-        """Paint text to prepare for asking the player to choose a level."""
-        # Two header lines + blank + level list + blank + prompt
-        min_height = 2 + 1 + len(self.levels) + 1 + 1
-        if min_height > scrn.getmaxyx()[0]:
+        self._resolved_filename = level_filename.resolve()
+        self._level_keys: dict[str, LevelKey] = {}
+        self._source_stamp = _get_source_stamp(self.level_filename)
+        self._parsed_level_text: dict[str, LevelsStr] = {}
+        self.levels: _LevelMaps
+        if self._is_standard_format():
+            self.symbols = dict(RL_SYMBOLS)
+            levels_str = _get_standard_levels_from_file(self.level_filename)
+            self.levels = _LevelMaps(
+                self.symbols,
+                levels_str,
+                validate=True,
+                convert=_convert_standard_level,
+            )
+        else:
+            self.symbols, levels_str = self._read_levels()
+            if fast_start:
+                _validate_symbols(self.symbols)
+            else:
+                _validate_level_data(self.symbols, levels_str)
+            self.levels = _LevelMaps(self.symbols, levels_str, validate=fast_start)
+        self._metadata: Optional["LevelsMetadata"] = None
+
+    def _is_standard_format(self) -> bool:
+        """Return True if the level file is a standard format level collection."""
+        return self.level_filename.suffix.lower() in STANDARD_FORMAT_SUFFIXES
+
+    def _read_levels(self) -> tuple[Symbols, LevelsStr]:
+        """Return all level information from a level file in this game's format.
+
+        The text of each level is only parsed if it wasn't already parsed by the
+        previous call.
+
+        """
+        symbols_text, level_texts = _split_level_text(
+            self.level_filename.read_text(encoding=UTF_8)
+        )
+        symbols, _ = _get_levels_from_lines(io.StringIO(symbols_text))
+
+        parsed_level_text: dict[str, LevelsStr] = {}
+        levels: LevelsStr = []
+        for level_text in level_texts:
+            if level_text in self._parsed_level_text:
+                level_text_levels = self._parsed_level_text[level_text]
+            else:
+                _, level_text_levels = _get_levels_from_lines(
+                    io.StringIO(level_text), in_maps=True
+                )
+            parsed_level_text[level_text] = level_text_levels
+            levels += level_text_levels
+        self._parsed_level_text = parsed_level_text
+
+        return symbols, levels
+
+    def reload_if_changed(self) -> set[str]:
+        """Reload the level file if it changed and return the names of changed levels.
+
+        Checking for changes only needs the level file's size and modification time.
+        After a change, only the levels whose text changed are parsed again, and
+        they're converted and validated again when next accessed. If the symbols
+        changed, every level has changed. Added and removed levels also count as
+        changed.
+
+        If the level file can't be read, for example while an editor is saving it,
+        the levels are left as they were and the file is read again on the next
+        call.
+
+        """
+        source_stamp = _get_source_stamp(self.level_filename)
+        if source_stamp == self._source_stamp:
+            return set()
+
+        try:
+            if self._is_standard_format():
+                changed_names = self.levels.replace_levels(
+                    _get_standard_levels_from_file(self.level_filename)
+                )
+            else:
+                symbols, levels_str = self._read_levels()
+                if symbols == self.symbols:
+                    changed_names = self.levels.replace_levels(levels_str)
+                else:
+                    _validate_symbols(symbols)
+                    levels = _LevelMaps(symbols, levels_str, validate=True)
+                    changed_names = set(self.levels) | set(levels)
+                    self.symbols = symbols
+                    self.levels = levels
+        except (ValueError, IndexError) as exc:
+            # Such as a file saved halfway, with a partial character or line.
+            raise RoguelikeSokobanError(
+                f"can't read level file '{self.level_filename}': {exc}"
+            ) from exc
+
+        # Only set once the file has been read, so a failed reload is tried again.
+        self._source_stamp = source_stamp
+        self._metadata = None
+        for level_name in changed_names:
+            self._level_keys.pop(level_name, None)
+        return changed_names
+
+    def get_level_key(self, level_name: str) -> LevelKey:
+        """Return the key that scores for a level are saved under.
+
+        The level's content hash is computed the first time and kept until the level
+        changes, so later calls are a dictionary lookup.
+
+        """
+        try:
+            return self._level_keys[level_name]
+        except KeyError:
+            pass
+        # pylint: disable=import-outside-toplevel
+        from src.canonical import level_hash
+
+        level_key = LevelKey(
+            level_hash(self.levels[level_name], self.symbols),
+            self._resolved_filename,
+            level_name,
+        )
+        self._level_keys[level_name] = level_key
+        return level_key
+
+    def _get_indexed_metadata(self) -> Optional["LevelsMetadata"]:
+        """Return level metadata if known or in a current index, otherwise None."""
+        # pylint: disable=import-outside-toplevel
+        from src.level_index import read_index
+
+        if self._metadata is None:
+            self._metadata = read_index(self.level_filename)
+        return self._metadata
+
+    def get_metadata(self) -> "LevelsMetadata":
+        """Return metadata for each level that can be played.
+
+        The metadata is read from the level file's index if it's current, otherwise
+        it's computed from the level maps.
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from src.level_index import build_metadata
+
+        metadata = self._get_indexed_metadata()
+        if metadata is None:
+            metadata = self._metadata = build_metadata(self)
+        return metadata
+
+    def list_levels(
+        self, sort_by: Optional[str] = None, level_filter: Optional[str] = None
+    ) -> list[str]:
+        """Return level names, optionally filtered and sorted by metadata fields.
+
+        level_filter is an expression like "boulders>10". Levels without metadata,
+        which can't be played, are left out when filtering and sorted last.
+
+        """
+        # pylint: disable=import-outside-toplevel
+        from src.level_index import check_field, parse_filter
+
+        level_names = list(self.levels)
+        if sort_by is None and level_filter is None:
+            return level_names
+
+        metadata = self.get_metadata()
+        if level_filter is not None:
+            level_test = parse_filter(level_filter)
+            level_names = [
+                level_name
+                for level_name in level_names
+                if level_name in metadata and level_test(metadata[level_name])
+            ]
+        if sort_by is not None:
+            check_field(sort_by)
+            level_names.sort(
+                key=lambda level_name: (
+                    level_name not in metadata,
+                    metadata[level_name][sort_by]  # type: ignore[literal-required]
+                    if level_name in metadata
+                    else 0,
+                )
+            )
+        return level_names
+
+    def _get_page_size(self, scrn: curses.window) -> int:
+        """Return how many level names fit on the screen at once."""
+        # Two header lines + blank + level list + blank + two help lines + prompt
+        page_size = scrn.getmaxyx()[0] - (2 + 1 + 1 + 2 + 1)
+        if page_size < 1:
             raise RoguelikeSokobanError(TERMINAL_TOO_SMALL_TEXT)
+        return page_size
+
+    def _draw_names(
+        self, scrn: curses.window, level_names: list[str], first: int, page_size: int
+    ) -> int:
+        """Paint text to prepare for asking the player to choose a level.
+
+        Only page_size level names are shown, starting with level_names[first].
+        Metadata is only shown once it's been loaded for sorting or filtering.
+
+        """
+        max_x = scrn.getmaxyx()[1]
         welcome = f"Welcome to {GAME_NAME}"
         levels_found_header = (
             f"The following levels were found in {self.level_filename}:"
         )
+        help_lines = (
+            f"Type '{SORT_LEVELS} <field>' or '{FILTER_LEVELS} <field><op><number>' "
+            "to change the list.",
+            f"Fields: {', '.join(METADATA_FIELDS)}",
+        )
+        page_names = level_names[first : first + page_size]
         scrn.clear()
         curses.endwin()
         curses.curs_set(0)
         scrn.refresh()
         scrn.addstr(0, 0, welcome)
-        scrn.addstr(1, 0, levels_found_header)
-        for i, level_name in enumerate(self.levels):
-            scrn.addstr(i + 3, 0, str(i + 1) + ". " + level_name)
+        scrn.addstr(1, 0, levels_found_header[: max_x - 1])
+        if len(page_names) < len(level_names):
+            page_line = (
+                f"Levels {first + 1}-{first + len(page_names)} of {len(level_names)}, "
+                f"type '{NEXT_PAGE}' or '{PREVIOUS_PAGE}' to see more:"
+            )
+            scrn.addstr(2, 0, page_line[: max_x - 1])
+        for i, level_name in enumerate(page_names, start=first):
+            line = str(i + 1) + ". " + level_name
+            if self._metadata is not None and level_name in self._metadata:
+                # pylint: disable=import-outside-toplevel
+                from src.level_index import describe_metadata
+
+                line += "  " + describe_metadata(self._metadata[level_name])
+            scrn.addstr(i - first + 3, 0, line[: max_x - 1])
+        help_y = scrn.getyx()[0] + 2
+        for i, help_line in enumerate(help_lines):
+            scrn.addstr(help_y + i, 0, help_line[: max_x - 1])
         # Write prompt here
-        return scrn.getyx()[0] + 2
+        return scrn.getyx()[0] + 1
 
-    def level_prompt(self, scrn: curses.window) -> str:
-        """Prompt the user for the level to play from the available choices."""
+    def level_prompt(self, scrn: curses.window, error: Optional[str] = None) -> str:
+        """Prompt the user for the level to play from the available choices.
 
-        first_prompt = (
-            f"Enter the number of the level you want to play, or '{QUIT}' to quit: "
-        )
-        invalid_input_prompt = (
-            f"Invalid choice, please enter the number of an available level, or '{QUIT}' to "
-            "quit: "
-        )
+        If error is given, it's shown with the first prompt, and the level is asked
+        for even if there is only one. Levels that don't fit on the screen are shown
+        a page at a time.
 
+        """
         level_names = list(self.levels.keys())
 
-        if len(level_names) == 1:
-            chosen_level_name = level_names[0]
-            return chosen_level_name
+        if len(level_names) == 1 and error is None:
+            return level_names[0]
 
-        prompt = first_prompt
+        sort_by: Optional[str] = None
+        level_filter: Optional[str] = None
+        prompt = _FIRST_PROMPT if error is None else f"Error: {error}. {_FIRST_PROMPT}"
+        page = 0
         while True:
-            prompt_y = self._draw_names(scrn)
-            scrn.addstr(prompt_y, 0, prompt)
-            curses.echo()
-            curses.curs_set(1)
-            # FIXME: Weird things happen if you resize the terminal while being
-            # prompted for raw_choice. Various workarounds such as using getch
-            # rather than getstr or redrawing the screen if curses.KEY_RESIZE
-            # is found in raw_choice have not fixed everything.
-            raw_choice_unknown = scrn.getstr()
-            if isinstance(raw_choice_unknown, bytes):
-                raw_choice = raw_choice_unknown.decode("utf-8").strip()
-            else:
-                raise RoguelikeSokobanError("unknown value from getstr")
-            curses.curs_set(0)
-            curses.noecho()
+            page_size = self._get_page_size(scrn)
+            page = max(0, min(page, (len(level_names) - 1) // page_size))
+            prompt_y = self._draw_names(scrn, level_names, page * page_size, page_size)
+            raw_choice = _read_choice(scrn, prompt_y, prompt)
             if raw_choice == QUIT:
                 raise KeyboardInterrupt
 
+            if raw_choice in (NEXT_PAGE, PREVIOUS_PAGE):
+                page += 1 if raw_choice == NEXT_PAGE else -1
+                prompt = _FIRST_PROMPT
+                continue
+
+            command, _, argument = raw_choice.partition(" ")
+            if command in (SORT_LEVELS, FILTER_LEVELS):
+                new_sort_by, new_level_filter = sort_by, level_filter
+                if command == SORT_LEVELS:
+                    new_sort_by = argument.strip() or None
+                else:
+                    new_level_filter = argument.strip() or None
+                try:
+                    level_names = self.list_levels(new_sort_by, new_level_filter)
+                except RoguelikeSokobanError as exc:
+                    prompt = f"Error: {exc}. {_FIRST_PROMPT}"
+                else:
+                    sort_by, level_filter = new_sort_by, new_level_filter
+                    prompt = _FIRST_PROMPT
+                    page = 0
+                continue
+
             try:
                 choice = int(raw_choice)
                 if choice in range(1, len(level_names) + 1):
@@ -217,8 +629,6 @@ class LevelLoader:
             except ValueError:
                 pass
 
-            prompt = invalid_input_prompt
+            prompt = _INVALID_INPUT_PROMPT
 
-        choice -= 1
-        chosen_level_name = level_names[choice]
-        return chosen_level_name.rstrip()
+        return level_names[choice - 1].rstrip()
@@ -5,52 +5,58 @@ Licensed under the GNU General Public License (GPL) v3.
 """
 import curses
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from src.display import Display
 from src.levelloader import LevelLoader
-from src.score_tracking import Scores
-from src.universe import Universe
-from src.util import SCORES_FILENAME, Action
+from src.util import SCORES_FILENAME
 
+if TYPE_CHECKING:
+    from src.action_log import ActionLogWriter
 
-def main(
+
+def main(  # pylint: disable=too-many-arguments,too-many-positional-arguments
     scrn: curses.window,
     level_filename: Path,
     update_scores: bool = True,
+    fast_start: bool = False,
+    watch: bool = False,
+    scores_filename: Path = SCORES_FILENAME,
+    write_behind: bool = False,
+    action_log: Optional["ActionLogWriter"] = None,
 ) -> None:
-    """Main function for game."""
+    """Main function for game.
+
+    If watch is True, the level file is checked for changes while playing, and the
+    current level is restarted with its new map if it changed.
+
+    If write_behind is True, new best scores are saved in batches rather than right
+    away, and at the latest when the level is left.
+
+    Hints are searched for in a background thread, and remembered for each level
+    while the game runs.
+
+    If action_log is given, the start of each level, every action and the time
+    taken to draw each frame are recorded in it.
+
+    """
     if curses.has_colors():
         curses.use_default_colors()
 
+    loader = LevelLoader(level_filename, fast_start=fast_start)
+    level_name: Optional[str] = loader.level_prompt(scrn)
+
+    # These aren't needed to draw the level prompt, so they are imported after it
+    # is on screen to keep startup fast.
+    # pylint: disable=import-outside-toplevel
+    from src.game import Game
+    from src.score_tracking import BufferedScores, Scores, open_scores
+
+    scores: Scores
     if update_scores:
-        scores = Scores(SCORES_FILENAME)
+        scores = open_scores(scores_filename)
+        if write_behind:
+            scores = BufferedScores(scores)
     else:
         scores = Scores()
 
-    loader = LevelLoader(level_filename)
-    level_name = None
-    keep_playing = True
-    while keep_playing:
-        if level_name is None:
-            level_name = loader.level_prompt(scrn)
-        univ = Universe(level_name, loader.levels[level_name], loader.symbols)
-        best_score = scores.get_score(level_filename, univ.level_name)
-        disp = Display(scrn, univ, best_score)
-        while True:
-            disp.draw(univ)
-            act = disp.get_action()
-            if act == Action.OTHER:
-                continue
-
-            if act == Action.QUIT:
-                raise KeyboardInterrupt
-
-            if act == Action.PLAY_AGAIN:
-                level_name = None if univ.game_won else univ.level_name
-                break
-
-            univ.eval_action(act)
-            if univ.game_won:
-                scores.update_best_score(
-                    level_filename, univ.level_name, univ.moves_taken
-                )
+    Game(scrn, loader, scores, watch, action_log).play(level_name)
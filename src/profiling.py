@@ -0,0 +1,72 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Profiling of whole game sessions.
+
+"""
+import cProfile
+import io
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from src.util import UTF_8
+
+TEXT_SUFFIX = ".txt"
+MEMORY_SUFFIX = ".memory.txt"
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 50
+
+
+def _write_stats_text(profiler: cProfile.Profile, text_filename: Path) -> None:
+    """Write the functions with the most cumulative time to text_filename."""
+    stats_text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_text)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+    text_filename.write_text(stats_text.getvalue(), encoding=UTF_8)
+
+
+def _write_allocations_text(
+    snapshot: tracemalloc.Snapshot, memory_filename: Path
+) -> None:
+    """Write the lines that allocated the most memory still in use."""
+    with memory_filename.open(mode="w", encoding=UTF_8) as file:
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            file.write(f"{stat}\n")
+
+
+@contextmanager
+def profile_session(stats_filename: Path, trace_memory: bool = False) -> Iterator[None]:
+    """Profile the code run in the with block.
+
+    When the block is left, even by an exception such as KeyboardInterrupt, the
+    profile is written to stats_filename, which can be read with pstats or other
+    profile viewers, and the slowest functions are written as text to
+    stats_filename with TEXT_SUFFIX added. If trace_memory is True, memory
+    allocations are traced too and the lines that allocated the most memory still
+    in use are written to stats_filename with MEMORY_SUFFIX added.
+
+    """
+    if trace_memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if trace_memory:
+            # Before writing the profile, so its allocations aren't included.
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            _write_allocations_text(
+                snapshot,
+                stats_filename.with_name(stats_filename.name + MEMORY_SUFFIX),
+            )
+        profiler.dump_stats(stats_filename)
+        _write_stats_text(
+            profiler, stats_filename.with_name(stats_filename.name + TEXT_SUFFIX)
+        )
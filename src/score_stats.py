@@ -0,0 +1,179 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Statistics and leaderboards over best scores.
+
+ScoreStats indexes best scores by level content hash once, along with the levels of
+each level file ("pack"), so each query is answered from memory without walking the
+score file again.
+
+"""
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from src.levelloader import LevelKey, LevelLoader
+from src.score_tracking import ScoreRecord
+from src.util import RoguelikeSokobanError
+
+
+class PackStats(NamedTuple):
+    """Represents how many levels of a level file have a best score."""
+
+    level_filename: Path
+    levels: int
+    solved: int
+
+    @property
+    def completion(self) -> float:
+        """Return the fraction of levels that have a best score."""
+        return self.solved / self.levels if self.levels else 0.0
+
+
+class ScoreGap(NamedTuple):
+    """Represents how many moves a best score is above the known optimum."""
+
+    record: ScoreRecord
+    optimum: int
+
+    @property
+    def gap(self) -> int:
+        """Return how many moves the best score is above the optimum."""
+        return self.record.score - self.optimum
+
+
+def _get_pack_levels(level_filename: Path) -> list[LevelKey]:
+    """Return the keys of the levels in level_filename that can be played."""
+    loader = LevelLoader(level_filename, fast_start=True)
+    level_keys: list[LevelKey] = []
+    for level_name in loader.levels:
+        try:
+            level_keys.append(loader.get_level_key(level_name))
+        except RoguelikeSokobanError:
+            pass
+    return level_keys
+
+
+class ScoreStats:
+    """Answers questions about best scores and the level files they were set in.
+
+    records are the best scores, for example from Scores.all_scores(). The levels of
+    level_filenames are the ones counted for completion and unsolved levels.
+    optimum_records are known optimal scores, for example from a score file of
+    optimal solutions, and are what gaps are measured against.
+
+    """
+
+    def __init__(
+        self,
+        records: Iterable[ScoreRecord],
+        level_filenames: Iterable[Path] = (),
+        optimum_records: Iterable[ScoreRecord] = (),
+    ):
+        self._records: dict[str, ScoreRecord] = {}
+        self._legacy_records: dict[tuple[str, str], ScoreRecord] = {}
+        for record in records:
+            self._add_record(record)
+        self._optimums = {
+            record.content_hash: record.score
+            for record in optimum_records
+            if record.content_hash is not None
+        }
+        self._pack_levels = {
+            level_filename: _get_pack_levels(level_filename)
+            for level_filename in level_filenames
+        }
+        self._by_score = sorted(
+            self.all_records(), key=lambda record: (record.score, record.level_name)
+        )
+
+    def _add_record(self, record: ScoreRecord) -> None:
+        """Index record, keeping the best score for each level."""
+        if record.content_hash is None:
+            legacy_key = (str(record.level_filename), record.level_name)
+            current = self._legacy_records.get(legacy_key)
+            if current is None or record.score < current.score:
+                self._legacy_records[legacy_key] = record
+        else:
+            current = self._records.get(record.content_hash)
+            if current is None or record.score < current.score:
+                self._records[record.content_hash] = record
+
+    def all_records(self) -> list[ScoreRecord]:
+        """Return the best score of every level."""
+        return list(self._records.values()) + list(self._legacy_records.values())
+
+    def get_record(self, level: LevelKey) -> Optional[ScoreRecord]:
+        """Return the best score of level, or None if it has no score."""
+        record = self._records.get(level.content_hash)
+        if record is None:
+            record = self._legacy_records.get(
+                (str(level.level_filename), level.level_name)
+            )
+        return record
+
+    def _get_pack_levels(self, level_filename: Path) -> list[LevelKey]:
+        """Return the levels of level_filename.
+
+        Raise RoguelikeSokobanError if level_filename isn't one of the level files
+        these statistics were made with.
+
+        """
+        try:
+            return self._pack_levels[level_filename]
+        except KeyError:
+            raise RoguelikeSokobanError(
+                f"no score statistics for level file '{level_filename}'"
+            ) from None
+
+    def pack_stats(self) -> list[PackStats]:
+        """Return the completion of each level file."""
+        return [
+            PackStats(
+                level_filename,
+                len(level_keys),
+                sum(1 for level in level_keys if self.get_record(level) is not None),
+            )
+            for level_filename, level_keys in self._pack_levels.items()
+        ]
+
+    def top_scores(
+        self, count: int, level_filename: Optional[Path] = None
+    ) -> list[ScoreRecord]:
+        """Return the count lowest best scores, optionally only for level_filename."""
+        if level_filename is None:
+            return self._by_score[:count]
+        records = [
+            self.get_record(level) for level in self._get_pack_levels(level_filename)
+        ]
+        return sorted(
+            (record for record in records if record is not None),
+            key=lambda record: (record.score, record.level_name),
+        )[:count]
+
+    def unsolved_levels(
+        self, level_filename: Optional[Path] = None
+    ) -> list[LevelKey]:
+        """Return levels without a best score, optionally only for level_filename."""
+        level_filenames = (
+            list(self._pack_levels) if level_filename is None else [level_filename]
+        )
+        return [
+            level
+            for pack_filename in level_filenames
+            for level in self._get_pack_levels(pack_filename)
+            if self.get_record(level) is None
+        ]
+
+    def score_gaps(self) -> list[ScoreGap]:
+        """Return the gap to the optimum of each best score with a known optimum.
+
+        The largest gaps come first.
+
+        """
+        gaps = [
+            ScoreGap(record, self._optimums[record.content_hash])
+            for record in self._records.values()
+            if record.content_hash in self._optimums
+        ]
+        return sorted(gaps, key=lambda gap: (-gap.gap, gap.record.level_name))
@@ -3,77 +3,750 @@ Copyright Jeremy Nation <jeremy@jeremynation.me>.
 Licensed under the GNU General Public License (GPL) v3.
 
 """
-import filecmp
+import contextlib
+import fcntl
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
 from pathlib import Path
-import shutil
-from tempfile import TemporaryDirectory
-from typing import Optional
+from typing import IO, Any, Iterable, Iterator, NamedTuple, Optional, Union
 
-from src.util import UTF_8
+from src.levelloader import LevelKey
+from src.util import UTF_8, RoguelikeSokobanError
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_AFTER = 1000
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+FLUSH_AFTER = 10
+FLUSH_INTERVAL_SECONDS = 5.0
+SCORE_FILE_VERSION = 2
+
+
+class ScoreRecord(NamedTuple):
+    """Represents a best score and, if known, the moves that set it.
+
+    level_filename and level_name are where the score was set. content_hash is the
+    hash of the level it was set on, or None for a score saved before scores were
+    saved by content hash and not yet matched to its level.
+
+    """
+
+    level_filename: Path
+    level_name: str
+    score: int
+    solution: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+# A score file entry saved before scores were saved by content hash is either just
+# the score, or the score and its solution.
+_ScoreEntry = Union[int, dict[str, Union[int, str]]]
+
+
+def _parse_entry(entry: _ScoreEntry) -> tuple[int, Optional[str]]:
+    """Return the score and solution in a score file entry."""
+    if isinstance(entry, int):
+        return entry, None
+    solution = entry.get("solution")
+    return int(entry["score"]), None if solution is None else str(solution)
+
+
+def _format_entry(score: int, solution: Optional[str]) -> _ScoreEntry:
+    """Return a score file entry for score and solution."""
+    if solution is None:
+        return score
+    return {"score": score, "solution": solution}
+
+
+def _record_to_json(record: ScoreRecord) -> dict[str, Union[int, str]]:
+    """Return record as a JSON object for the score file or journal."""
+    record_data: dict[str, Union[int, str]] = {
+        "file": str(record.level_filename),
+        "level": record.level_name,
+        "score": record.score,
+    }
+    if record.content_hash is not None:
+        record_data["hash"] = record.content_hash
+    if record.solution is not None:
+        record_data["solution"] = record.solution
+    return record_data
+
+
+def _record_from_json(record_data: dict[str, Union[int, str]]) -> ScoreRecord:
+    """Return the record in a JSON object from the score file or journal."""
+    solution = record_data.get("solution")
+    content_hash = record_data.get("hash")
+    return ScoreRecord(
+        Path(str(record_data["file"])),
+        str(record_data["level"]),
+        int(record_data["score"]),
+        None if solution is None else str(solution),
+        None if content_hash is None else str(content_hash),
+    )
+
+
+def _make_record(
+    level: LevelKey, score: int, solution: Optional[str] = None
+) -> ScoreRecord:
+    """Return a record of score being set on level."""
+    return ScoreRecord(
+        level.level_filename, level.level_name, score, solution, level.content_hash
+    )
+
+
+def write_score_file(scores_filename: Path, records: Iterable[ScoreRecord]) -> None:
+    """Write records to a JSON score file, replacing it in one step.
+
+    records must have at most one record for each level.
+
+    """
+    scores_data: dict[str, object] = {"version": SCORE_FILE_VERSION}
+    level_scores: dict[str, dict[str, Union[int, str]]] = {}
+    legacy_data: dict[str, dict[str, _ScoreEntry]] = {}
+    for record in records:
+        if record.content_hash is None:
+            legacy_data.setdefault(str(record.level_filename), {})[
+                record.level_name
+            ] = _format_entry(record.score, record.solution)
+        else:
+            level_scores[record.content_hash] = _record_to_json(record)
+    scores_data["scores"] = level_scores
+    if legacy_data:
+        scores_data["legacy"] = legacy_data
+
+    # write first to a temp file in the same directory and then replace the score
+    # file with it, so if the program crashes, we don't destroy the existing score
+    # file. The temp file gets a unique name, so games saving at once don't write to
+    # the same temp file.
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        encoding=UTF_8,
+        dir=scores_filename.parent,
+        prefix=scores_filename.name + ".",
+        suffix=".tmp",
+        delete=False,
+    ) as file:
+        temp_filename = Path(file.name)
+        try:
+            json.dump(scores_data, file, sort_keys=True, indent=2)
+            file.write("\n")
+            file.flush()
+            os.fsync(file.fileno())
+        except BaseException:
+            file.close()
+            temp_filename.unlink()
+            raise
+    os.replace(temp_filename, scores_filename)
+
+
+def _read_score_file(scores_filename: Path) -> list[ScoreRecord]:
+    """Return the records in a JSON score file, without its journal."""
+    scores_data = json.loads(scores_filename.read_text(encoding=UTF_8))
+    if "version" not in scores_data:
+        scores_data = {"legacy": scores_data}
+    records = [
+        _record_from_json(record_data)
+        for record_data in scores_data.get("scores", {}).values()
+    ]
+    for filename_str, level_scores in scores_data.get("legacy", {}).items():
+        for level_name, entry in level_scores.items():
+            score, solution = _parse_entry(entry)
+            records.append(ScoreRecord(Path(filename_str), level_name, score, solution))
+    return records
+
+
+def _parse_journal(journal: bytes) -> list[ScoreRecord]:
+    """Return the complete records in a journal, oldest first."""
+    complete_length = journal.rfind(b"\n") + 1
+    return [
+        _record_from_json(json.loads(record_str))
+        for record_str in journal[:complete_length].decode(UTF_8).splitlines()
+    ]
 
 
 class Scores:
-    """Manages scores."""
+    """Manages scores.
+
+    Scores are kept by the content hash of their level, so looking one up doesn't
+    touch the file system, and scores still apply after a level file is moved or
+    copied to another computer. Scores saved by level file path by older versions
+    are matched to their level's content hash the first time the level is looked
+    up.
+
+    """
 
     def __init__(self, scores_filename: Optional[Path] = None):
         self._scores_filename = scores_filename
-        self._scores: dict[Path, dict[str, int]]
-        if self._scores_filename is None:
-            self._scores = {}
-        else:
+        self._scores: dict[str, ScoreRecord] = {}
+        self._legacy_scores: dict[tuple[str, str], ScoreRecord] = {}
+        if self._scores_filename is not None:
             try:
-                self._scores = {
-                    Path(k): v
-                    for k, v in json.loads(
-                        self._scores_filename.read_text(encoding=UTF_8)
-                    ).items()
-                }
+                records = _read_score_file(self._scores_filename)
             except FileNotFoundError:
-                self._scores = {}
+                records = []
+            for record in records:
+                self._set(record)
 
-    def get_score(self, level_filename: Path, level_name: str) -> Optional[int]:
-        """Get current (best) score for given info, or None if no score."""
-        level_filename = level_filename.resolve()
-        try:
-            best_score: Optional[int] = self._scores[level_filename][level_name]
-        except KeyError:
-            best_score = None
-        return best_score
+    def _set(self, record: ScoreRecord) -> None:
+        """Set the score in record, replacing any score for its level."""
+        if record.content_hash is None:
+            self._legacy_scores[(str(record.level_filename), record.level_name)] = (
+                record
+            )
+        else:
+            self._legacy_scores.pop(
+                (str(record.level_filename), record.level_name), None
+            )
+            self._scores[record.content_hash] = record
+
+    def get_record(self, level: LevelKey) -> Optional[ScoreRecord]:
+        """Get the record of the current (best) score for level, or None if no score."""
+        record = self._scores.get(level.content_hash)
+        if record is None and self._legacy_scores:
+            legacy_record = self._legacy_scores.pop(
+                (str(level.level_filename), level.level_name), None
+            )
+            if legacy_record is not None:
+                record = legacy_record._replace(content_hash=level.content_hash)
+                self._scores[level.content_hash] = record
+        return record
 
-    def set_score(self, level_filename: Path, level_name: str, score: int) -> None:
+    def get_score(self, level: LevelKey) -> Optional[int]:
+        """Get current (best) score for given level, or None if no score."""
+        record = self.get_record(level)
+        return None if record is None else record.score
+
+    def get_solution(self, level: LevelKey) -> Optional[str]:
+        """Get the moves that set the current (best) score, or None if not known."""
+        record = self.get_record(level)
+        return None if record is None else record.solution
+
+    def all_scores(self) -> Iterator[ScoreRecord]:
+        """Return every best score."""
+        yield from self._scores.values()
+        yield from self._legacy_scores.values()
+
+    def set_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
         """Unconditionally set a score."""
-        level_filename = level_filename.resolve()
-        if level_filename in self._scores:
-            self._scores[level_filename][level_name] = score
-        else:
-            self._scores[level_filename] = {level_name: score}
+        self._set(_make_record(level, score, solution))
 
     def update_best_score(
-        self, level_filename: Path, level_name: str, score: int
+        self, level: LevelKey, score: int, solution: Optional[str] = None
     ) -> None:
-        """Update score if it's better (lower) and rewrite score file if defined."""
-        current_best_score = self.get_score(level_filename, level_name)
+        """Update score if it's better (lower) and save it if there's a score file.
+
+        solution is the moves that got the score, see src/solutions.py.
+
+        """
+        current_best_score = self.get_score(level)
         if (current_best_score is None) or (score < current_best_score):
-            self.set_score(level_filename, level_name, score)
+            record = _make_record(level, score, solution)
+            self._set(record)
             if self._scores_filename is not None:
-                # write first to a temp file so if the program crashes, we don't destroy
-                # the existing score file
-                with TemporaryDirectory() as temp_dir_str:
-                    temp_filename = Path(temp_dir_str) / "new_scores.json"
-                    with temp_filename.open(mode="w", encoding=UTF_8) as file:
-                        json.dump(
-                            {str(k): v for k, v in self._scores.items()},
-                            file,
-                            sort_keys=True,
-                            indent=2,
-                        )
-                        file.write("\n")
-
-                    files_match = False
-                    try:
-                        files_match = filecmp.cmp(temp_filename, self._scores_filename)
-                    except FileNotFoundError:
-                        pass
-                    if not files_match:
-                        shutil.move(temp_filename, self._scores_filename)
+                self._save_score(record)
+
+    def flush(self) -> None:
+        """Save any scores that haven't been saved yet."""
+
+    def _save_score(self, record: ScoreRecord) -> None:
+        """Save a new best score to the score file."""
+        # pylint: disable=unused-argument
+        self._write_scores_file()
+
+    def _write_scores_file(self) -> None:
+        """Rewrite the score file with all scores."""
+        assert self._scores_filename is not None
+        write_score_file(self._scores_filename, self.all_scores())
+
+
+class JournalScores(Scores):
+    """Manages scores, saving each new best score to a journal.
+
+    Saving a score appends one line to the journal next to the score file, so it
+    takes the same time however many scores there are. The journal is replayed on
+    top of the score file at startup, and is folded into the score file once it has
+    compact_after records.
+
+    Several games can share a score file. Appending to the journal takes a shared
+    lock on it, and replaying and folding the journal take an exclusive lock, see
+    fcntl.flock(...). Scores saved by other games are read again before the journal
+    is folded into the score file, so they aren't lost.
+
+    """
+
+    def __init__(self, scores_filename: Path, compact_after: int = COMPACT_AFTER):
+        super().__init__(scores_filename)
+        self._journal_filename = scores_filename.with_name(
+            scores_filename.name + JOURNAL_SUFFIX
+        )
+        self._compact_after = compact_after
+        with self._lock_journal(fcntl.LOCK_EX) as journal_file:
+            self._journal_records = self._replay_journal(journal_file)
+
+    @contextlib.contextmanager
+    def _lock_journal(self, operation: int) -> Iterator[IO[bytes]]:
+        """Open the journal for appending and lock it with operation.
+
+        The lock is released when the journal is closed.
+
+        """
+        with self._journal_filename.open(mode="ab") as journal_file:
+            fcntl.flock(journal_file, operation)
+            yield journal_file
+
+    def _replay_journal(self, journal_file: IO[bytes]) -> int:
+        """Apply the journal's records to the scores and return how many there are.
+
+        The journal must be locked exclusively.
+
+        """
+        journal = self._journal_filename.read_bytes()
+
+        # A crash while appending can leave a partial last record. Drop it so later
+        # records start on their own line.
+        complete_length = journal.rfind(b"\n") + 1
+        if complete_length < len(journal):
+            journal_file.truncate(complete_length)
+
+        records = _parse_journal(journal)
+        for record in records:
+            self._set(record)
+        return len(records)
+
+    def _save_score(self, record: ScoreRecord) -> None:
+        """Append a new best score to the journal."""
+        with self._lock_journal(fcntl.LOCK_SH) as journal_file:
+            record_str = json.dumps(_record_to_json(record)) + "\n"
+            journal_file.write(record_str.encode(UTF_8))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        self._journal_records += 1
+        if self._journal_records >= self._compact_after:
+            self.compact()
+
+    def compact(self) -> None:
+        """Write all scores to the score file and empty the journal."""
+        with self._lock_journal(fcntl.LOCK_EX) as journal_file:
+            # Other games sharing the score file may have saved better scores since
+            # this game read it.
+            assert self._scores_filename is not None
+            try:
+                records = _read_score_file(self._scores_filename)
+            except FileNotFoundError:
+                records = []
+            records += _parse_journal(self._journal_filename.read_bytes())
+            for record in records:
+                # Scores saved by level file path were all read at startup.
+                if record.content_hash is None:
+                    continue
+                current = self._scores.get(record.content_hash)
+                if current is None or record.score < current.score:
+                    self._set(record)
+            self._write_scores_file()
+            journal_file.truncate(0)
+            os.fsync(journal_file.fileno())
+        self._journal_records = 0
+
+
+class SqliteScores(Scores):
+    """Manages scores in an SQLite database that several games can share at once.
+
+    Scores aren't loaded into memory. Each lookup and update is a single indexed
+    statement, and a score is only replaced by a lower one within the statement that
+    saves it, so games finishing at the same time don't lose each other's scores.
+
+    Scores saved by level file path by older versions stay in the old scores table
+    until their level is first looked up, and the table is dropped once it's empty.
+
+    """
+
+    def __init__(self, scores_filename: Path):
+        super().__init__()
+        self._scores_filename = scores_filename
+        # BufferedScores may save scores from its own thread, and only uses the
+        # connection from one thread at a time.
+        self._connection = sqlite3.connect(
+            scores_filename, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS level_scores (
+                content_hash TEXT PRIMARY KEY,
+                level_file TEXT NOT NULL,
+                level_name TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                solution TEXT
+            ) WITHOUT ROWID
+            """
+        )
+        self._has_legacy_scores = (
+            self._connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scores'"
+            ).fetchone()
+            is not None
+        )
+        if self._has_legacy_scores:
+            columns = [
+                row[1] for row in self._connection.execute("PRAGMA table_info(scores)")
+            ]
+            if "solution" not in columns:
+                # Databases created before solutions were saved.
+                self._connection.execute(
+                    "ALTER TABLE scores ADD COLUMN solution TEXT"
+                )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def _query_legacy_scores(
+        self, query: str, parameters: tuple[str, ...] = ()
+    ) -> list[Any]:
+        """Return the rows of a query on the old scores table.
+
+        Return no rows if another game has dropped the table since it was opened.
+
+        """
+        try:
+            return self._connection.execute(query, parameters).fetchall()
+        except sqlite3.OperationalError:
+            if self._connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scores'"
+            ).fetchone() is not None:
+                raise
+            self._has_legacy_scores = False
+            return []
+
+    def _drop_empty_legacy_scores(self) -> None:
+        """Drop the old scores table if every score in it has been moved.
+
+        Must be called in a write transaction.
+
+        """
+        if not self._query_legacy_scores("SELECT 1 FROM scores LIMIT 1"):
+            self._connection.execute("DROP TABLE IF EXISTS scores")
+            self._has_legacy_scores = False
+
+    def _migrate_legacy_score(self, level: LevelKey) -> None:
+        """Move a score saved by level file path to level's content hash.
+
+        The database is only locked for writing if there's a score to move, so
+        looking up levels without scores doesn't hold up other games. The old scores
+        table is dropped once it's empty.
+
+        """
+        legacy_key = (str(level.level_filename), level.level_name)
+        query = (
+            "SELECT score, solution FROM scores WHERE level_file = ? AND level_name = ?"
+        )
+        if not self._query_legacy_scores(query, legacy_key):
+            # Nothing to move, so only lock the database to drop an empty table.
+            if not self._has_legacy_scores or self._query_legacy_scores(
+                "SELECT 1 FROM scores LIMIT 1"
+            ):
+                return
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked again, since another game may have moved it first.
+            rows = self._query_legacy_scores(query, legacy_key)
+            if rows:
+                self._connection.execute(
+                    "DELETE FROM scores WHERE level_file = ? AND level_name = ?",
+                    legacy_key,
+                )
+                self.update_best_score(level, *rows[0])
+            self._drop_empty_legacy_scores()
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    def get_record(self, level: LevelKey) -> Optional[ScoreRecord]:
+        """Get the record of the current (best) score for level, or None if no score."""
+        query = (
+            "SELECT level_file, level_name, score, solution FROM level_scores "
+            "WHERE content_hash = ?"
+        )
+        row = self._connection.execute(query, (level.content_hash,)).fetchone()
+        if row is None and self._has_legacy_scores:
+            self._migrate_legacy_score(level)
+            row = self._connection.execute(query, (level.content_hash,)).fetchone()
+        if row is None:
+            return None
+        level_file, level_name, score, solution = row
+        return ScoreRecord(
+            Path(level_file), level_name, score, solution, level.content_hash
+        )
+
+    def all_scores(self) -> Iterator[ScoreRecord]:
+        """Return every best score."""
+        for content_hash, level_file, level_name, score, solution in list(
+            self._connection.execute(
+                "SELECT content_hash, level_file, level_name, score, solution "
+                "FROM level_scores"
+            )
+        ):
+            yield ScoreRecord(
+                Path(level_file), level_name, score, solution, content_hash
+            )
+        if self._has_legacy_scores:
+            for level_file, level_name, score, solution in self._query_legacy_scores(
+                "SELECT level_file, level_name, score, solution FROM scores"
+            ):
+                yield ScoreRecord(Path(level_file), level_name, score, solution)
+
+    def set_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
+        """Unconditionally set a score."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO level_scores "
+            "(content_hash, level_file, level_name, score, solution) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                level.content_hash,
+                str(level.level_filename),
+                level.level_name,
+                score,
+                solution,
+            ),
+        )
+
+    def update_best_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
+        """Update score if it's better (lower)."""
+        self._connection.execute(
+            "INSERT INTO level_scores "
+            "(content_hash, level_file, level_name, score, solution) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (content_hash) DO UPDATE "
+            "SET level_file = excluded.level_file, "
+            "level_name = excluded.level_name, "
+            "score = excluded.score, solution = excluded.solution "
+            "WHERE excluded.score < level_scores.score",
+            (
+                level.content_hash,
+                str(level.level_filename),
+                level.level_name,
+                score,
+                solution,
+            ),
+        )
+
+
+class BufferedScores(Scores):
+    """Keeps new best scores in memory and saves them to other scores in batches.
+
+    Pending scores are saved once there are flush_after of them, every
+    flush_interval seconds from a background thread, and whenever flush() or
+    flush_all_scores() is called. Scores can be looked up and kept while a batch is
+    being saved.
+
+    """
+
+    def __init__(
+        self,
+        saved_scores: Scores,
+        flush_after: int = FLUSH_AFTER,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ):
+        super().__init__()
+        self._saved_scores = saved_scores
+        self._flush_after = flush_after
+        self._pending: dict[str, tuple[LevelKey, ScoreRecord]] = {}
+        # Scores taken from _pending by flush() that it hasn't finished saving.
+        self._flushing: dict[str, tuple[LevelKey, ScoreRecord]] = {}
+        # Guards _pending and _flushing. Never held while saving, so a slow save
+        # doesn't hold up the game.
+        self._lock = threading.Lock()
+        # Held while saving, so batches are saved one at a time and in order.
+        self._flush_lock = threading.Lock()
+        self._stop_flushing = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically, args=(flush_interval,), daemon=True
+        )
+        self._flusher.start()
+        _all_buffered_scores.add(self)
+
+    def _flush_periodically(self, flush_interval: float) -> None:
+        """Flush every flush_interval seconds until closed."""
+        while not self._stop_flushing.wait(flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the background thread and save any pending scores."""
+        self._stop_flushing.set()
+        self._flusher.join()
+        self.flush()
+
+    def _get_unsaved_locked(self, level: LevelKey) -> Optional[ScoreRecord]:
+        """Get the best score record not saved yet. The lock must be held."""
+        records = [
+            scores[level.content_hash][1]
+            for scores in (self._pending, self._flushing)
+            if level.content_hash in scores
+        ]
+        return min(records, key=lambda record: record.score, default=None)
+
+    def get_record(self, level: LevelKey) -> Optional[ScoreRecord]:
+        """Get the record of the current (best) score for level, or None if no score."""
+        with self._lock:
+            unsaved = self._get_unsaved_locked(level)
+        # Looked up after the unsaved scores, so a score being saved meanwhile is
+        # found in one or the other.
+        saved = self._saved_scores.get_record(level)
+        if saved is None or (unsaved is not None and unsaved.score < saved.score):
+            return unsaved
+        return saved
+
+    def all_scores(self) -> Iterator[ScoreRecord]:
+        """Return every best score."""
+        self.flush()
+        return self._saved_scores.all_scores()
+
+    def set_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
+        """Unconditionally set a score."""
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop(level.content_hash, None)
+            self._saved_scores.set_score(level, score, solution)
+
+    def update_best_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
+        """Keep score if it's better (lower) than any unsaved score, saving it later.
+
+        Scores no better than the saved score are dropped when they're saved.
+
+        """
+        with self._lock:
+            unsaved = self._get_unsaved_locked(level)
+            if (unsaved is None) or (score < unsaved.score):
+                self._pending[level.content_hash] = (
+                    level,
+                    _make_record(level, score, solution),
+                )
+            flush_now = len(self._pending) >= self._flush_after
+        if flush_now:
+            self.flush()
+
+    def flush(self) -> None:
+        """Save any scores that haven't been saved yet."""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            for level, record in self._flushing.values():
+                self._saved_scores.update_best_score(
+                    level, record.score, record.solution
+                )
+            self._saved_scores.flush()
+            with self._lock:
+                self._flushing = {}
+
+
+_all_buffered_scores: "weakref.WeakSet[BufferedScores]" = weakref.WeakSet()
+
+
+def flush_all_scores() -> None:
+    """Save the pending scores of every BufferedScores."""
+    for buffered_scores in list(_all_buffered_scores):
+        buffered_scores.flush()
+
+
+def open_scores(scores_filename: Path) -> Scores:
+    """Return the scores in scores_filename, stored according to its suffix.
+
+    Files with a suffix in SQLITE_SUFFIXES are SQLite databases. Other files are
+    JSON files with a journal.
+
+    """
+    if scores_filename.suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteScores(scores_filename)
+    return JournalScores(scores_filename)
+
+
+def _read_sqlite_records(scores_filename: Path) -> list[ScoreRecord]:
+    """Return every score in an SQLite score database, opened read-only."""
+    uri = f"{scores_filename.resolve().as_uri()}?mode=ro"
+    connection = sqlite3.connect(uri, uri=True)
+    try:
+        tables = {
+            row[0]
+            for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        records: list[ScoreRecord] = []
+        if "level_scores" in tables:
+            for content_hash, level_file, level_name, score, solution in (
+                connection.execute(
+                    "SELECT content_hash, level_file, level_name, score, solution "
+                    "FROM level_scores"
+                )
+            ):
+                records.append(
+                    ScoreRecord(
+                        Path(level_file), level_name, score, solution, content_hash
+                    )
+                )
+        if "scores" in tables:
+            columns = [
+                row[1] for row in connection.execute("PRAGMA table_info(scores)")
+            ]
+            # Databases created before solutions were saved have no solution column.
+            solution_column = "solution" if "solution" in columns else "NULL"
+            for level_file, level_name, score, solution in connection.execute(
+                f"SELECT level_file, level_name, score, {solution_column} FROM scores"
+            ):
+                records.append(
+                    ScoreRecord(Path(level_file), level_name, score, solution)
+                )
+        return records
+    finally:
+        connection.close()
+
+
+def read_score_records(scores_filename: Path) -> list[ScoreRecord]:
+    """Return every best score in scores_filename without changing any file.
+
+    Unlike open_scores, a missing score file is an error, a journal is read but not
+    folded into the score file or trimmed, and a database isn't upgraded or created.
+    Use this for score files that are only read, such as the inputs of reports.
+
+    """
+    journal_filename = scores_filename.with_name(scores_filename.name + JOURNAL_SUFFIX)
+    try:
+        if scores_filename.suffix.lower() in SQLITE_SUFFIXES:
+            if not scores_filename.is_file():
+                raise FileNotFoundError(scores_filename)
+            return _read_sqlite_records(scores_filename)
+        scores = Scores()
+        try:
+            records = _read_score_file(scores_filename)
+        except FileNotFoundError:
+            if not journal_filename.exists():
+                raise
+            records = []
+        if journal_filename.exists():
+            records += _parse_journal(journal_filename.read_bytes())
+        for record in records:
+            # pylint: disable=protected-access
+            scores._set(record)
+        return list(scores.all_scores())
+    except FileNotFoundError as exc:
+        raise RoguelikeSokobanError(
+            f"score file not found: '{scores_filename}'"
+        ) from exc
+    except (OSError, ValueError, KeyError, sqlite3.Error) as exc:
+        raise RoguelikeSokobanError(
+            f"can't read score file '{scores_filename}': {exc}"
+        ) from exc
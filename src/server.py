@@ -0,0 +1,408 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Game server that hosts many players over TCP or Unix sockets.
+
+Every session runs in one asyncio event loop, with its own Universe, and all sessions
+share one LevelLoader, so levels are read and checked once however many players
+there are. Sessions are drawn as ANSI text for a terminal, such as telnet, instead
+of with curses, which can only draw to the server's own terminal.
+
+"""
+import asyncio
+import contextlib
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from src.levelloader import LevelLoader
+from src.universe import Universe
+from src.util import GAME_NAME, PLAY_AGAIN, QUIT, UTF_8, Action, RoguelikeSokobanError
+
+MAX_SESSIONS = 500
+IDLE_TIMEOUT_SECONDS = 30 * 60
+DEFAULT_WINDOW_SIZE = (24, 80)
+
+# Keys returned by _InputDecoder, besides single characters.
+KEY_UP = "up"
+KEY_DOWN = "down"
+KEY_LEFT = "left"
+KEY_RIGHT = "right"
+KEY_ENTER = "\n"
+KEY_BACKSPACE = "\b"
+
+_KEY_ACTIONS = {
+    KEY_UP: Action.UP,
+    KEY_DOWN: Action.DOWN,
+    KEY_LEFT: Action.LEFT,
+    KEY_RIGHT: Action.RIGHT,
+    QUIT: Action.QUIT,
+    PLAY_AGAIN: Action.PLAY_AGAIN,
+}
+
+# Telnet commands and options, see RFC 854, RFC 857, RFC 858 and RFC 1073.
+_IAC = 255
+_DONT = 254
+_DO = 253
+_WONT = 252
+_WILL = 251
+_SB = 250
+_SE = 240
+_ECHO = 1
+_SUPPRESS_GO_AHEAD = 3
+_NAWS = 31
+# Ask the client to send each key as it's pressed, without echoing it, and to send
+# its window size.
+_NEGOTIATION = bytes(
+    [_IAC, _WILL, _ECHO, _IAC, _WILL, _SUPPRESS_GO_AHEAD, _IAC, _DO, _NAWS]
+)
+
+_ESC = 0x1B
+_ARROW_KEYS = {
+    ord("A"): KEY_UP,
+    ord("B"): KEY_DOWN,
+    ord("C"): KEY_RIGHT,
+    ord("D"): KEY_LEFT,
+}
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
+_REVERSE = "\x1b[7m"
+_NORMAL = "\x1b[0m"
+_READ_SIZE = 1024
+_MAX_PENDING_INPUT = 4096
+# Lines around the level: game name and level name above, status and keys below.
+_TEXT_LINES = 4
+
+
+class _InputDecoder:
+    """Turns bytes from a client into keys, handling telnet commands.
+
+    Telnet commands and escape sequences may be split between reads, so incomplete
+    ones are kept until the rest arrives.
+
+    """
+
+    def __init__(self) -> None:
+        self.window_size: tuple[int, int] = DEFAULT_WINDOW_SIZE
+        self._pending = bytearray()
+        self._after_cr = False
+
+    def feed(self, data: bytes) -> list[str]:
+        """Return the keys in data."""
+        buf = self._pending
+        buf += data
+        keys: list[str] = []
+        pos = 0
+        while pos < len(buf):
+            byte = buf[pos]
+            after_cr, self._after_cr = self._after_cr, False
+            if byte == _IAC:
+                used = self._telnet_command(buf, pos)
+                if used == 0:
+                    break
+                pos += used
+            elif byte == _ESC:
+                if pos + 2 >= len(buf):
+                    break
+                if buf[pos + 1] in b"[O" and buf[pos + 2] in _ARROW_KEYS:
+                    keys.append(_ARROW_KEYS[buf[pos + 2]])
+                    pos += 3
+                else:
+                    pos += 1
+            else:
+                pos += 1
+                if byte in b"\r\n":
+                    # Telnet sends CR LF or CR NUL for the enter key.
+                    if not (after_cr and byte == ord("\n")):
+                        keys.append(KEY_ENTER)
+                    self._after_cr = byte == ord("\r")
+                elif byte in b"\b\x7f":
+                    keys.append(KEY_BACKSPACE)
+                elif 0x20 <= byte < 0x7F:
+                    keys.append(chr(byte))
+        del buf[:pos]
+        if len(buf) > _MAX_PENDING_INPUT:
+            buf.clear()
+        return keys
+
+    def _telnet_command(self, buf: bytearray, pos: int) -> int:
+        """Handle the telnet command at pos and return its length, or 0 if partial."""
+        if pos + 1 >= len(buf):
+            return 0
+        command = buf[pos + 1]
+        if command in (_WILL, _WONT, _DO, _DONT):
+            return 3 if pos + 2 < len(buf) else 0
+        if command == _SB:
+            end = buf.find(bytes([_IAC, _SE]), pos + 2)
+            if end == -1:
+                return 0
+            option = buf[pos + 2 : end]
+            if len(option) == 5 and option[0] == _NAWS:
+                width = int.from_bytes(option[1:3], "big")
+                height = int.from_bytes(option[3:5], "big")
+                if width > 0 and height > 0:
+                    self.window_size = (height, width)
+            return end + 2 - pos
+        return 2
+
+
+def _view_start(position: int, level_size: int, view_size: int) -> int:
+    """Return the first row or column to show to keep position near the middle."""
+    if level_size <= view_size:
+        return 0
+    return max(0, min(position - view_size // 2, level_size - view_size))
+
+
+def render_level(univ: Universe, height: int, width: int) -> list[str]:
+    """Return the rows of univ to draw in height rows and width columns.
+
+    Only the part of the level around the player is returned if the level doesn't
+    fit, and the player is shown in reverse video.
+
+    """
+    top = _view_start(univ.player.curr_y, len(univ.level_map), height)
+    left = _view_start(univ.player.curr_x, len(univ.level_map[0]), width)
+    boulder_sym = univ.level_sym["boulder"]
+    # row -> columns of boulders in the view
+    boulder_cols: dict[int, list[int]] = {}
+    for boulder in univ.boulders:
+        in_rows = top <= boulder.curr_y < top + height
+        if in_rows and left <= boulder.curr_x < left + width:
+            boulder_cols.setdefault(boulder.curr_y, []).append(boulder.curr_x - left)
+    rows = []
+    for row_index in range(top, min(top + height, len(univ.level_map))):
+        row = univ.level_map[row_index][left : left + width]
+        if row_index in boulder_cols or row_index == univ.player.curr_y:
+            squares = list(row)
+            for col_index in boulder_cols.get(row_index, ()):
+                squares[col_index] = boulder_sym
+            if row_index == univ.player.curr_y:
+                col_index = univ.player.curr_x - left
+                squares[col_index] = f"{_REVERSE}{univ.player.symbol}{_NORMAL}"
+            row = "".join(squares)
+        rows.append(row)
+    return rows
+
+
+class _Session:
+    """One player's connection to the server."""
+
+    def __init__(
+        self,
+        loader: LevelLoader,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        idle_timeout: float,
+    ):
+        self._loader = loader
+        self._reader = reader
+        self._writer = writer
+        self._idle_timeout = idle_timeout
+        self._decoder = _InputDecoder()
+        self._keys: deque[str] = deque()
+
+    async def _next_key(self) -> Optional[str]:
+        """Return the next key, or None if the player left or was idle too long."""
+        while not self._keys:
+            try:
+                data = await asyncio.wait_for(
+                    self._reader.read(_READ_SIZE), self._idle_timeout
+                )
+            except asyncio.TimeoutError:
+                return None
+            if not data:
+                return None
+            self._keys.extend(self._decoder.feed(data))
+        return self._keys.popleft()
+
+    async def _send(self, lines: list[str]) -> None:
+        """Replace the player's screen with lines."""
+        self._writer.write((_CLEAR_SCREEN + "\r\n".join(lines)).encode(UTF_8))
+        await self._writer.drain()
+
+    async def _choose_level(self, message: str = "") -> Optional[str]:
+        """Ask the player for a level and return its name, or None to quit."""
+        level_names = list(self._loader.levels)
+        if len(level_names) == 1 and not message:
+            return level_names[0]
+        choice = ""
+        while True:
+            height, width = self._decoder.window_size
+            shown = max(1, height - 4)
+            lines = [GAME_NAME[:width]]
+            for number, level_name in enumerate(level_names[:shown], start=1):
+                lines.append(f"{number}) {level_name}"[:width])
+            if len(level_names) > shown:
+                lines[-1] = f"... and {len(level_names) - shown + 1} more"
+            lines.append(message[:width])
+            lines.append(
+                f"Enter the number of the level you want to play, or '{QUIT}' to "
+                f"quit: {choice}"
+            )
+            await self._send(lines)
+            key = await self._next_key()
+            if key is None or (key == QUIT and not choice):
+                return None
+            if key == KEY_ENTER:
+                if choice.isdigit() and 1 <= int(choice) <= len(level_names):
+                    return level_names[int(choice) - 1]
+                message = f"Invalid choice: '{choice}'"
+                choice = ""
+            elif key == KEY_BACKSPACE:
+                choice = choice[:-1]
+            elif len(key) == 1 and len(choice) < 20:
+                choice += key
+
+    def _screen(self, univ: Universe) -> list[str]:
+        """Return the lines showing univ."""
+        height, width = self._decoder.window_size
+        lines = [GAME_NAME, f"Level: {univ.level_name}"]
+        lines += render_level(univ, max(1, height - _TEXT_LINES), width)
+        if univ.game_won:
+            lines.append(
+                f"You solved the puzzle in {univ.moves_taken} "
+                f"move{'s' if univ.moves_taken > 1 else ''}! Congratulations!"
+            )
+            lines.append(f"Press '{PLAY_AGAIN}' to play again or '{QUIT}' to quit.")
+        else:
+            lines.append(
+                f"Pits remaining: {univ.pits_remaining}      "
+                f"Boulders remaining: {len(univ.boulders)}      "
+                f"Moves used: {univ.moves_taken}"
+            )
+            lines.append(
+                f"Use the arrow keys to move around, '{QUIT}' to quit, and "
+                f"'{PLAY_AGAIN}' to restart this level."
+            )
+        return lines
+
+    async def _play(self, level_name: str) -> Optional[bool]:
+        """Play level_name until the player leaves it.
+
+        Return True to choose another level, False to restart it, and None to quit.
+
+        """
+        level_map = self._loader.levels[level_name]
+        univ = Universe(level_name, level_map, self._loader.symbols)
+        while True:
+            await self._send(self._screen(univ))
+            act = _KEY_ACTIONS.get(await self._next_key() or QUIT)
+            if act == Action.QUIT:
+                return None
+            if act == Action.PLAY_AGAIN:
+                return univ.game_won
+            if act is not None and not univ.game_won:
+                univ.eval_action(act)
+
+    async def run(self) -> None:
+        """Run the session until the player quits or leaves."""
+        self._writer.write(_NEGOTIATION)
+        message = ""
+        level_name = await self._choose_level()
+        while level_name is not None:
+            try:
+                choose_another = await self._play(level_name)
+            except RoguelikeSokobanError as exc:
+                # Only possible when levels are checked as they're chosen.
+                message = f"Level can't be played: {exc}"
+                choose_another = True
+            if choose_another is None:
+                break
+            if choose_another:
+                level_name = await self._choose_level(message)
+                message = ""
+        await self._send(["Thanks for playing!", ""])
+
+
+class GameServer:
+    """Serves games of the levels in loader to up to max_sessions players at once.
+
+    Players idle for idle_timeout seconds are disconnected.
+
+    """
+
+    def __init__(
+        self,
+        loader: LevelLoader,
+        max_sessions: int = MAX_SESSIONS,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+    ):
+        self.loader = loader
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = 0
+        # Tasks running handle_client(...), one per connected player.
+        self._handlers: set["asyncio.Task[None]"] = set()
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Run a session for a newly connected player.
+
+        If the server is shut down, the session is cancelled and the player is
+        disconnected.
+
+        """
+        handler = asyncio.current_task()
+        # Always set, since the server runs each call in a task of its own.
+        assert handler is not None
+        self._handlers.add(handler)
+        try:
+            if self.sessions >= self.max_sessions:
+                writer.write(b"The server is full, please try again later.\r\n")
+                await writer.drain()
+                return
+            self.sessions += 1
+            try:
+                await _Session(self.loader, reader, writer, self.idle_timeout).run()
+            finally:
+                self.sessions -= 1
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled when the server shuts down. Nothing awaits this task, so the
+            # cancellation ends here instead of being reported as an error.
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+            self._handlers.discard(handler)
+
+    async def wait_closed(self) -> None:
+        """Wait until every connected player's session has ended."""
+        while self._handlers:
+            await asyncio.wait(self._handlers)
+
+    async def start(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        unix_socket: Optional[Path] = None,
+    ) -> asyncio.Server:
+        """Start listening on a Unix socket if unix_socket is given, else on TCP."""
+        # Let every player connect at once without waiting to be accepted.
+        backlog = max(100, self.max_sessions)
+        if unix_socket is not None:
+            return await asyncio.start_unix_server(
+                self.handle_client,
+                str(unix_socket),
+                limit=_MAX_PENDING_INPUT,
+                backlog=backlog,
+            )
+        return await asyncio.start_server(
+            self.handle_client,
+            host,
+            port,
+            limit=_MAX_PENDING_INPUT,
+            backlog=backlog,
+        )
+
+    async def serve_forever(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        unix_socket: Optional[Path] = None,
+    ) -> None:
+        """Start listening and serve players until cancelled."""
+        server = await self.start(host, port, unix_socket)
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,267 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Conversion of standard Sokoban levels into Roguelike Sokoban-style levels.
+
+The standard level format is described here:
+
+http://www.sokobano.de/wiki/index.php?title=Level_format
+
+See convert_xsokoban.py for an example conversion and for how Roguelike Sokoban
+gameplay differs from normal Sokoban gameplay.
+
+"""
+import re
+from typing import Iterable, Iterator, Optional, Sequence
+
+# Standard format
+
+S_WALL = "#"
+S_PLAYER = "@"
+S_PLAYER_ON_GOAL = "+"
+S_BOX = "$"
+S_BOX_ON_GOAL = "*"
+S_GOAL = "."
+S_FLOOR = " "
+S_ALT_FLOORS = ("-", "_")
+S_COMMENT_MARKER = ";"
+S_TITLE_PREFIX = "Title:"
+
+# Roguelike Sokoban format
+
+RL_HORIZ_WALL = "-"
+RL_VERT_WALL = "|"
+RL_PLAYER = "@"
+RL_BOULDER = "0"
+RL_PIT = "^"
+RL_FLOOR = "."
+
+RL_SYMBOLS = {
+    "boulder": RL_BOULDER,
+    "floor": RL_FLOOR,
+    "pit": RL_PIT,
+    "player": RL_PLAYER,
+}
+
+# Temp
+
+TEMP_FLOOR = "F"
+
+STANDARD_FORMAT_SUFFIXES = (".sok", ".xsb")
+
+_MAP_CHARS = frozenset(
+    (S_WALL, S_PLAYER, S_PLAYER_ON_GOAL, S_BOX, S_BOX_ON_GOAL, S_GOAL, S_FLOOR)
+    + S_ALT_FLOORS
+)
+_KEY_VALUE_LINE = re.compile(r"^\w[\w ]*:")
+
+Level = list[list[str]]
+
+
+def rewrite_floor(level: Level) -> None:
+    """Do first pass for floors.
+
+    Go through level and figure out which blanks are floor and which are
+    just blanks. Change the floor-blanks to TEMP_FLOOR for later processing.
+    Leave non-floor-blanks as they are.
+
+    A blank is floor if there is an object (wall, player, box or goal) somewhere
+    above, below, left and right of it. Objects are counted per row and column
+    first, so each square is only visited twice.
+
+    """
+    objects = frozenset((S_WALL, S_PLAYER, S_BOX, S_GOAL))
+    num_cols = max((len(row) for row in level), default=0)
+    # Objects above and below the current square in each column.
+    objects_above = [0] * num_cols
+    objects_below = [0] * num_cols
+    for row in level:
+        for col_num, square in enumerate(row):
+            if square in objects:
+                objects_below[col_num] += 1
+
+    for row in level:
+        objects_left = 0
+        objects_right = sum(1 for square in row if square in objects)
+        for col_num, square in enumerate(row):
+            if square in objects:
+                objects_left += 1
+                objects_right -= 1
+                objects_above[col_num] += 1
+                objects_below[col_num] -= 1
+            elif (
+                square == S_FLOOR
+                and objects_left
+                and objects_right
+                and objects_above[col_num]
+                and objects_below[col_num]
+            ):
+                row[col_num] = TEMP_FLOOR
+
+
+def is_sideways_wall(level: Level, i: int, j: int) -> bool:
+    """Return True if wall level[i][j] should be written with a "-", False
+    otherwise.
+
+    """
+    # Set each value wall_x to True if there is a wall in x direction, False if not.
+    wall_above = (i > 0) and (level[i - 1][j] == S_WALL)
+    wall_below = (i < len(level) - 1) and (level[i + 1][j] == S_WALL)
+    wall_left = (j > 0) and (level[i][j - 1] == S_WALL)
+    wall_right = (j < len(level[0]) - 1) and (level[i][j + 1] == S_WALL)
+
+    wall_status = [wall_above, wall_below, wall_left, wall_right]
+    if sum(wall_status) == 1:
+        if not (wall_above or wall_below):
+            return True
+    if sum(wall_status) == 2:
+        if not (wall_above and wall_below):
+            return True
+    if sum(wall_status) == 3:
+        return True
+    return False
+
+
+def rewrite_walls(level: Level) -> None:
+    """Rewrite walls.
+
+    Go through level and rewrite each wall from "#" to either "-" or "|"
+    depending on what other walls are around it. Uses is_sideways_wall(...).
+
+    """
+    # Decide every wall before rewriting any, since is_sideways_wall looks at the
+    # walls around each one.
+    wall_symbols: list[tuple[int, int, str]] = []
+    for row_num, row in enumerate(level):
+        for col_num, square in enumerate(row):
+            if square == S_WALL:
+                if is_sideways_wall(level, row_num, col_num):
+                    wall_symbols.append((row_num, col_num, RL_HORIZ_WALL))
+                else:
+                    wall_symbols.append((row_num, col_num, RL_VERT_WALL))
+    for row_num, col_num, symbol in wall_symbols:
+        level[row_num][col_num] = symbol
+
+
+def rewrite_final(level: Level) -> None:
+    """Finish rewriting.
+
+    Go through level and finish rewriting, including rewriting TEMP_FLOOR to
+    actual floor symbol RL_FLOOR.
+
+    """
+    final_symbols = {
+        S_PLAYER: RL_PLAYER,
+        S_BOX: RL_BOULDER,
+        S_GOAL: RL_PIT,
+        TEMP_FLOOR: RL_FLOOR,
+    }
+    for row in level:
+        for col_num, square in enumerate(row):
+            row[col_num] = final_symbols.get(square, square)
+
+
+def convert_level(orig_level: Sequence[str]) -> Level:
+    """Convert the standard level in "orig_level" to Roguelike Sokoban-style.
+
+    "orig_level" is a sequence of map lines without trailing newlines.
+
+    """
+    max_line_length = max([len(line) for line in orig_level])
+    # Pad each line with spaces to the end of the longest line.
+    level: Level = []
+    for orig_line in orig_level:
+        for alt_floor in S_ALT_FLOORS:
+            orig_line = orig_line.replace(alt_floor, S_FLOOR)
+        level.append(list(orig_line.ljust(max_line_length)))
+
+    rewrite_floor(level)
+    rewrite_walls(level)
+    rewrite_final(level)
+
+    return level
+
+
+def is_good_level(level: Level) -> bool:
+    """Return True if level has only valid RL characters, False otherwise."""
+    valid_char = [
+        RL_HORIZ_WALL,
+        RL_VERT_WALL,
+        RL_PLAYER,
+        RL_BOULDER,
+        RL_PIT,
+        RL_FLOOR,
+        " ",
+    ]
+    for line in level:
+        for square in line:
+            if square not in valid_char:
+                return False
+    return True
+
+
+def level_to_str(level: Level) -> str:
+    """Join a converted level into a map string without trailing blanks."""
+    return "\n".join(["".join(line).rstrip() for line in level])
+
+
+def is_map_line(line: str) -> bool:
+    """Return True if line is part of a standard format map, False otherwise."""
+    return S_WALL in line and set(line) <= _MAP_CHARS
+
+
+def iter_collection(lines: Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Yield (name, map) for each level in a standard format level collection.
+
+    Maps are returned as-is, one line per map row. Levels are separated by
+    non-map lines. A level's name is taken from a "Title:" line following its
+    map, otherwise from the last comment or plain text line before its map,
+    otherwise it is "Level <number>". Other "Key: value" lines are ignored.
+    Repeated names get " (<number>)" appended.
+
+    """
+    seen_names: set[str] = set()
+    map_lines: list[str] = []
+    in_map = False
+    title: Optional[str] = None
+    pre_title: Optional[str] = None
+    next_pre_title: Optional[str] = None
+    level_number = 0
+
+    def make_name() -> str:
+        name = title or pre_title or f"Level {level_number}"
+        if name in seen_names:
+            name = f"{name} ({level_number})"
+        seen_names.add(name)
+        return name
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if is_map_line(line):
+            if not in_map:
+                if map_lines:
+                    yield make_name(), "\n".join(map_lines)
+                in_map = True
+                map_lines = []
+                level_number += 1
+                title = None
+                pre_title, next_pre_title = next_pre_title, None
+            map_lines.append(line.rstrip())
+            continue
+
+        in_map = False
+        stripped = line.strip()
+        if stripped.startswith(S_TITLE_PREFIX):
+            new_title = stripped[len(S_TITLE_PREFIX) :].strip()
+            if map_lines and title is None:
+                title = new_title
+            else:
+                next_pre_title = new_title
+        elif stripped.startswith(S_COMMENT_MARKER):
+            next_pre_title = stripped.lstrip(S_COMMENT_MARKER).strip() or next_pre_title
+        elif stripped and not _KEY_VALUE_LINE.match(stripped):
+            next_pre_title = stripped
+
+    if map_lines:
+        yield make_name(), "\n".join(map_lines)
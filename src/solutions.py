@@ -0,0 +1,140 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+Compact solution strings, and replaying them to verify best scores.
+
+A solution is the moves that solved a level, written with the letters "u", "d", "l"
+and "r" as in the standard Sokoban LURD notation. Runs of the same move are written
+as a count followed by the move, so "rrrul" is written "3rul". Uppercase letters,
+which LURD uses for pushes, are also accepted.
+
+"""
+import itertools
+import re
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from src.levelloader import LevelLoader
+from src.score_tracking import ScoreRecord
+from src.universe import Universe
+from src.util import Action, RoguelikeSokobanError
+
+_MOVE_LETTERS = {
+    Action.UP: "u",
+    Action.DOWN: "d",
+    Action.LEFT: "l",
+    Action.RIGHT: "r",
+}
+_LETTER_MOVES = {letter: act for act, letter in _MOVE_LETTERS.items()}
+_SOLUTION_PATTERN = re.compile(r"(?:\d*[udlrUDLR])*")
+_RUN_PATTERN = re.compile(r"(\d*)([udlrUDLR])")
+
+
+def encode_moves(actions: Iterable[Action]) -> str:
+    """Return actions as a solution string."""
+    parts: list[str] = []
+    for letter, run in itertools.groupby(_MOVE_LETTERS[act] for act in actions):
+        count = sum(1 for _ in run)
+        parts.append(f"{count}{letter}" if count > 1 else letter)
+    return "".join(parts)
+
+
+def decode_moves(solution: str, max_moves: Optional[int] = None) -> list[Action]:
+    """Return the actions in a solution string.
+
+    If max_moves is given, solutions with more moves are an error. The moves are
+    counted before any are decoded, so a huge run count can't use up memory.
+
+    """
+    if not _SOLUTION_PATTERN.fullmatch(solution):
+        raise RoguelikeSokobanError(f"invalid solution: '{solution}'")
+    runs: list[tuple[int, Action]] = []
+    for count_str, letter in _RUN_PATTERN.findall(solution):
+        try:
+            count = int(count_str or 1)
+        except ValueError as exc:
+            # Too many digits to convert.
+            raise RoguelikeSokobanError("invalid solution: run too long") from exc
+        runs.append((count, _LETTER_MOVES[letter.lower()]))
+    if max_moves is not None and sum(count for count, _ in runs) > max_moves:
+        raise RoguelikeSokobanError(f"solution has more than {max_moves} moves")
+    actions: list[Action] = []
+    for count, act in runs:
+        actions += [act] * count
+    return actions
+
+
+def check_solution(univ: Universe, solution: str, score: int) -> Optional[str]:
+    """Replay solution in a new Universe and return a problem, or None if it's fine.
+
+    The solution is fine if the level is solved by its last move, in score moves.
+    Every saved move moved the player, so solutions longer than score are an error.
+
+    """
+    actions = decode_moves(solution, score)
+    for i, act in enumerate(actions):
+        univ.eval_action(act)
+        if univ.game_won:
+            if i != len(actions) - 1:
+                return f"solved after {i + 1} of {len(actions)} moves"
+            break
+    if not univ.game_won:
+        return "not solved"
+    if univ.moves_taken != score:
+        return f"solved in {univ.moves_taken} moves, not {score}"
+    return None
+
+
+def _check_record(
+    loader: LevelLoader, record: ScoreRecord, solution: str
+) -> Optional[str]:
+    """Check the solution of record against its level in loader."""
+    level_key = loader.get_level_key(record.level_name)
+    if record.content_hash not in (None, level_key.content_hash):
+        return "level changed since the score was set"
+    univ = Universe(record.level_name, loader.levels[record.level_name], loader.symbols)
+    return check_solution(univ, solution, record.score)
+
+
+class SolutionProblem(NamedTuple):
+    """Represents a best score that its solution doesn't back up."""
+
+    record: ScoreRecord
+    problem: str
+
+
+def verify_solutions(records: Iterable[ScoreRecord]) -> list[SolutionProblem]:
+    """Replay the solutions of records against the current level files.
+
+    Each level file is loaded once. Records without a solution, records for levels
+    that no longer exist or whose content changed since the score was set, and
+    solutions that don't solve their level in exactly their score are problems.
+
+    """
+    problems: list[SolutionProblem] = []
+    by_level_file = sorted(records, key=lambda record: str(record.level_filename))
+    for level_filename, level_records in itertools.groupby(
+        by_level_file, key=lambda record: record.level_filename
+    ):
+        loader: Optional[LevelLoader]
+        try:
+            loader = LevelLoader(Path(level_filename), fast_start=True)
+        except (OSError, RoguelikeSokobanError):
+            loader = None
+
+        for record in level_records:
+            if record.solution is None:
+                problem: Optional[str] = "no solution saved"
+            elif loader is None:
+                problem = "level file can't be loaded"
+            elif record.level_name not in loader.levels:
+                problem = "level not found"
+            else:
+                try:
+                    problem = _check_record(loader, record, record.solution)
+                except RoguelikeSokobanError as exc:
+                    problem = str(exc)
+            if problem is not None:
+                problems.append(SolutionProblem(record, problem))
+    return problems
@@ -4,10 +4,9 @@ Licensed under the GNU General Public License (GPL) v3.
 
 """
 from enum import Enum
-from typing import Literal, Optional, Sequence, TypedDict, Union
+from typing import ClassVar, Literal, NamedTuple, Optional, Sequence, TypedDict, Union
 
-from src.levelloader import Symbols
-from src.util import Action, RoguelikeSokobanError
+from src.util import Action, RoguelikeSokobanError, Symbols
 
 
 class _MoveTestItem(TypedDict):
@@ -23,31 +22,92 @@ _MOVE_TEST: dict[Action, _MoveTestItem] = {
 }
 
 
+# (row change, column change) of each move
+MOVE_DELTAS = {
+    act: (item["change"], 0) if item["axis"] == "y" else (0, item["change"])
+    for act, item in _MOVE_TEST.items()
+}
+
+# The bit for each move in the masks of LegalActions.
+ACTION_BITS = {
+    Action.UP: 1,
+    Action.DOWN: 2,
+    Action.LEFT: 4,
+    Action.RIGHT: 8,
+}
+
+
+class LegalActions(NamedTuple):
+    """Masks of ACTION_BITS describing what each move would do.
+
+    moves has the moves that would change the game, pushes has the moves that would
+    push a boulder, and fills has the pushes that would fill a pit.
+
+    """
+
+    moves: int
+    pushes: int
+    fills: int
+
+
 class _MoveMode(Enum):
     DO_MOVE = "do move"
     DRY_RUN = "dry run"
 
 
-class _Movable:
-    """Represents items that can move."""
+class _LevelRules:
+    """Symbols and movement rules shared by everything that moves in a level."""
 
-    _SYMBOL_LOOKUP: str
+    __slots__ = ("level_sym", "walkable", "pushable")
 
-    def __init__(self, start_y: int, start_x: int, level_sym: Symbols):
-        self.curr_y = start_y
-        self.curr_x = start_x
+    def __init__(self, level_sym: Symbols):
         self.level_sym = level_sym
         # things that the player can walk over
-        self.walkable = [self.level_sym["floor"]]
+        self.walkable = (level_sym["floor"],)
         # things that a boulder can be pushed over or into
-        self.pushable = self.walkable[:]
-        self.pushable.append(self.level_sym["pit"])
-        try:
-            self.symbol = self.level_sym[self._SYMBOL_LOOKUP]
-        except KeyError as exc:
+        self.pushable = (level_sym["floor"], level_sym["pit"])
+
+
+class _Movable:
+    """Represents items that can move.
+
+    Only the position is stored per item, everything else comes from the rules
+    shared by the level.
+
+    """
+
+    __slots__ = ("curr_y", "curr_x", "rules")
+
+    _SYMBOL_LOOKUP: ClassVar[str]
+
+    def __init__(self, start_y: int, start_x: int, rules: _LevelRules):
+        self.curr_y = start_y
+        self.curr_x = start_x
+        self.rules = rules
+        if self._SYMBOL_LOOKUP not in rules.level_sym:
             raise RoguelikeSokobanError(
                 f"Unexpected _SYMBOL_LOOKUP: '{self._SYMBOL_LOOKUP}'"
-            ) from exc
+            )
+
+    @property
+    def level_sym(self) -> Symbols:
+        """Return the symbols of the level."""
+        return self.rules.level_sym
+
+    @property
+    def walkable(self) -> tuple[str, ...]:
+        """Return the things that the player can walk over."""
+        return self.rules.walkable
+
+    @property
+    def pushable(self) -> tuple[str, ...]:
+        """Return the things that a boulder can be pushed over or into."""
+        return self.rules.pushable
+
+    @property
+    def symbol(self) -> str:
+        """Return the symbol for this item."""
+        return self.rules.level_sym[self._SYMBOL_LOOKUP]
 
     def _move(
         self, move_dir: Action, univ: "Universe", mode: Optional[_MoveMode] = None
@@ -75,9 +135,9 @@ class _Movable:
             return univ.level_map[self.curr_y][self.curr_x]
 
         if mode == _MoveMode.DRY_RUN:
-            for boulder in univ.boulders:
-                if boulder.curr_y == target_y and boulder.curr_x == target_x:
-                    return boulder
+            boulder = univ.boulders_by_position.get((target_y, target_x))
+            if boulder is not None:
+                return boulder
             return univ.level_map[target_y][target_x]
 
         raise RoguelikeSokobanError(f"Unexpected move mode: {mode}")
@@ -86,22 +146,29 @@ class _Movable:
 class _Boulder(_Movable):
     """Represents boulders."""
 
+    __slots__ = ()
+
     _SYMBOL_LOOKUP = "boulder"
 
     def move(self, move_dir: Action, univ: "Universe") -> Union[str, "_Boulder"]:
         """Check if boulder can move, and if so, move it and update universe."""
         mov = super()._move(move_dir, univ, _MoveMode.DRY_RUN)
         if mov in self.pushable:
+            del univ.boulders_by_position[(self.curr_y, self.curr_x)]
             super()._move(move_dir, univ, _MoveMode.DO_MOVE)
             if mov == self.level_sym["pit"]:
-                univ.level_map[self.curr_y][self.curr_x] = self.level_sym["floor"]
+                univ.fill_pit(self.curr_y, self.curr_x)
                 univ.pits_remaining -= 1
+            else:
+                univ.boulders_by_position[(self.curr_y, self.curr_x)] = self
         return mov
 
 
 class _Player(_Movable):
     """Represents the player."""
 
+    __slots__ = ()
+
     _SYMBOL_LOOKUP = "player"
 
     def move(self, move_dir: Action, univ: "Universe") -> None:
@@ -120,37 +187,151 @@ class _Player(_Movable):
 
 
 class Universe:
-    """Represents the game universe."""
+    """Represents the game universe.
+
+    level_map holds one string per row with the player and boulders replaced by
+    floor, and rows without either are shared with the level_map passed in.
+
+    Universes made by fork() share level_map, actions_taken and the boulders with
+    the Universe they were forked from, and each copies them the first time one of
+    its moves changes them.
+
+    """
 
     def __init__(
         self, level_name: str, level_map: Sequence[str], level_sym: Symbols
     ) -> None:
-        self.level_map = [list(line) for line in level_map]
         self.level_name = level_name
         self.level_sym = level_sym
+        self.rules = _LevelRules(level_sym)
+        self.level_map: list[str] = []
         self.boulders: list[_Boulder] = []
+        self.boulders_by_position: dict[tuple[int, int], _Boulder] = {}
         self.pits_remaining = 0
         self.moves_taken = 0
-        for row_index, row in enumerate(self.level_map):
-            for col_index, square in enumerate(row):
-                if square == self.level_sym["player"]:
-                    self.player = _Player(
-                        row_index,
-                        col_index,
-                        self.level_sym,
-                    )
-                    self.level_map[row_index][col_index] = self.level_sym["floor"]
-                if square == self.level_sym["boulder"]:
-                    self.boulders.append(
-                        _Boulder(row_index, col_index, self.level_sym),
-                    )
-                    self.level_map[row_index][col_index] = self.level_sym["floor"]
-                if square == self.level_sym["pit"]:
-                    self.pits_remaining += 1
+        # Only actions that moved the player, see src/solutions.py.
+        self.actions_taken: list[Action] = []
+        player_sym = level_sym["player"]
+        boulder_sym = level_sym["boulder"]
+        floor_sym = level_sym["floor"]
+        for row_index, row in enumerate(level_map):
+            col_index = row.find(player_sym)
+            if col_index != -1:
+                self.player = _Player(row_index, col_index, self.rules)
+                row = row.replace(player_sym, floor_sym)
+            col_index = row.find(boulder_sym)
+            if col_index != -1:
+                while col_index != -1:
+                    boulder = _Boulder(row_index, col_index, self.rules)
+                    self.boulders.append(boulder)
+                    self.boulders_by_position[(row_index, col_index)] = boulder
+                    col_index = row.find(boulder_sym, col_index + 1)
+                row = row.replace(boulder_sym, floor_sym)
+            self.pits_remaining += row.count(level_sym["pit"])
+            self.level_map.append(row)
         self.game_won = False
+        # Cached until the next move that changes the game.
+        self._legal_actions: Optional[LegalActions] = None
+        # Whether these may be shared with forks, see fork().
+        self._map_shared = False
+        self._boulders_shared = False
+        self._actions_shared = False
+
+    def fork(self) -> "Universe":
+        """Return an independent copy of the game.
+
+        Only the player is copied right away, so forking takes the same short time
+        for any size of level.
+
+        """
+        child = Universe.__new__(Universe)
+        child.level_name = self.level_name
+        child.level_sym = self.level_sym
+        child.rules = self.rules
+        child.level_map = self.level_map
+        child.boulders = self.boulders
+        child.boulders_by_position = self.boulders_by_position
+        child.pits_remaining = self.pits_remaining
+        child.moves_taken = self.moves_taken
+        child.actions_taken = self.actions_taken
+        child.player = _Player(self.player.curr_y, self.player.curr_x, self.rules)
+        child.game_won = self.game_won
+        # pylint: disable=protected-access
+        child._legal_actions = self._legal_actions
+        child._map_shared = self._map_shared = True
+        child._boulders_shared = self._boulders_shared = True
+        child._actions_shared = self._actions_shared = True
+        return child
+
+    def snapshot(self) -> "Universe":
+        """Return a copy of the game to go back to later, such as a saved game.
+
+        This is the same as fork(), so snapshots are as cheap to keep as forks.
+
+        """
+        return self.fork()
+
+    def _unshare_for(self, act: Action) -> None:
+        """Copy what moving in direction act would change, if it may be shared."""
+        bit = ACTION_BITS[act]
+        legal = self.legal_actions()
+        if not legal.moves & bit:
+            return
+        if self._actions_shared:
+            self.actions_taken = list(self.actions_taken)
+            self._actions_shared = False
+        if legal.pushes & bit and self._boulders_shared:
+            self.boulders = [
+                _Boulder(boulder.curr_y, boulder.curr_x, self.rules)
+                for boulder in self.boulders
+            ]
+            self.boulders_by_position = {
+                (boulder.curr_y, boulder.curr_x): boulder for boulder in self.boulders
+            }
+            self._boulders_shared = False
+
+    def fill_pit(self, row_index: int, col_index: int) -> None:
+        """Turn the pit at row_index, col_index into floor."""
+        if self._map_shared:
+            self.level_map = list(self.level_map)
+            self._map_shared = False
+        row = self.level_map[row_index]
+        self.level_map[row_index] = (
+            row[:col_index] + self.level_sym["floor"] + row[col_index + 1 :]
+        )
+
+    def legal_actions(self) -> LegalActions:
+        """Return what each move would do, without changing anything."""
+        if self._legal_actions is None:
+            moves = pushes = fills = 0
+            for act, bit in ACTION_BITS.items():
+                change_y, change_x = MOVE_DELTAS[act]
+                target_y = self.player.curr_y + change_y
+                target_x = self.player.curr_x + change_x
+                if (target_y, target_x) not in self.boulders_by_position:
+                    if self.level_map[target_y][target_x] in self.rules.walkable:
+                        moves |= bit
+                    continue
+                beyond = (target_y + change_y, target_x + change_x)
+                if beyond in self.boulders_by_position:
+                    continue
+                square = self.level_map[beyond[0]][beyond[1]]
+                if square in self.rules.pushable:
+                    moves |= bit
+                    pushes |= bit
+                    if square == self.level_sym["pit"]:
+                        fills |= bit
+            self._legal_actions = LegalActions(moves, pushes, fills)
+        return self._legal_actions
 
     def eval_action(self, act: Action) -> None:
         """Move the player and see if they win."""
         move_dir = act
+        moves_taken = self.moves_taken
+        if self._actions_shared or self._boulders_shared:
+            self._unshare_for(act)
         self.player.move(move_dir, self)
+        if self.moves_taken != moves_taken:
+            self.actions_taken.append(act)
+            self._legal_actions = None
         self.game_won = self.pits_remaining == 0
@@ -9,11 +9,20 @@ from typing import NamedTuple
 
 GAME_NAME = "Roguelike Sokoban"
 
-DEFAULT_LEVEL_FILENAME = Path("levels") / "default_levels.txt"
+LEVELS_DIR = Path("levels")
+DEFAULT_LEVEL_FILENAME = LEVELS_DIR / "default_levels.txt"
 SCORES_FILENAME = Path("scores.json")
 
 QUIT = "q"
 PLAY_AGAIN = "r"
+HINT = "h"
+SORT_LEVELS = "sort"
+FILTER_LEVELS = "filter"
+NEXT_PAGE = "next"
+PREVIOUS_PAGE = "prev"
+# The fields of src.level_index.LevelMetadata, here so the level prompt can list
+# them without importing src.level_index.
+METADATA_FIELDS = ("width", "height", "floor", "boulders", "pits", "spare", "min_moves")
 
 TERMINAL_TOO_SMALL_TEXT = (
     "Your terminal is too small. Please increase your terminal size to at "
@@ -25,6 +34,9 @@ TEST_LEVELS_DIR = TEST_DIR / "test_levels"
 
 UTF_8 = "utf-8"
 
+# Symbol name, like "boulder", -> the character a level file uses for it.
+Symbols = dict[str, str]
+
 
 class Action(Enum):
     """Represents actions the player can choose."""
@@ -35,7 +47,9 @@ class Action(Enum):
     RIGHT = "right"
     QUIT = "quit"
     PLAY_AGAIN = "play again"
+    HINT = "hint"
     OTHER = "other"
+    NONE = "none"
 
 
 class _LevelFileConsts(NamedTuple):
@@ -0,0 +1,145 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src.action_log import (
+    LOG_MAGIC,
+    ActionLogWriter,
+    LevelStart,
+    LoggedAction,
+    read_action_log,
+)
+from src.levelloader import LevelKey
+from src.util import Action, RoguelikeSokobanError
+
+LEVEL = LevelKey("abc123", Path("levels/some_levels.txt"), "Level ✓")
+
+
+class TestActionLog(unittest.TestCase):
+    """Test action logs."""
+
+    def test_round_trip(self) -> None:
+        """Records are read back in order, with render times on the right actions."""
+        with TemporaryDirectory() as temp_dir_str:
+            log_filename = Path(temp_dir_str) / "actions.log"
+            with ActionLogWriter(log_filename) as action_log:
+                action_log.start_level(LEVEL)
+                action_log.record_frame(0.5)
+                action_log.record_action(Action.RIGHT)
+                action_log.record_frame(0.002)
+                action_log.record_action(Action.OTHER)
+                action_log.record_action(Action.QUIT)
+            records = list(read_action_log(log_filename))
+
+        self.assertEqual(
+            LevelStart(
+                action_log.session,
+                records[0].time,
+                LEVEL.level_filename,
+                "Level ✓",
+                "abc123",
+            ),
+            records[0],
+        )
+        self.assertEqual(
+            [(Action.RIGHT, 0.002), (Action.OTHER, None), (Action.QUIT, None)],
+            [
+                (record.action, record.render_time)
+                for record in records[1:]
+                if isinstance(record, LoggedAction)
+            ],
+        )
+        times = [record.time for record in records]
+        self.assertEqual(sorted(times), times)
+        self.assertLess(times[-1] - times[0], 60)
+
+    def test_append_and_stream(self) -> None:
+        """Logs are appended to, and read correctly a small chunk at a time."""
+        with TemporaryDirectory() as temp_dir_str:
+            log_filename = Path(temp_dir_str) / "actions.log"
+            for _ in range(2):
+                with ActionLogWriter(log_filename) as action_log:
+                    action_log.start_level(LEVEL)
+                    for _ in range(1000):
+                        action_log.record_action(Action.UP)
+                        action_log.record_frame(0.001)
+            self.assertEqual(1, log_filename.read_bytes().count(LOG_MAGIC))
+            with mock.patch("src.action_log.READ_CHUNK_SIZE", 7):
+                records = list(read_action_log(log_filename))
+
+        self.assertEqual(2002, len(records))
+        self.assertEqual(2, sum(isinstance(record, LevelStart) for record in records))
+        self.assertTrue(
+            all(
+                record == LoggedAction(record.session, Action.UP, record.time, 0.001)
+                for record in records
+                if isinstance(record, LoggedAction)
+            )
+        )
+
+    def test_shared_log(self) -> None:
+        """Sessions logging to one file at once each read back their own records."""
+        with TemporaryDirectory() as temp_dir_str:
+            log_filename = Path(temp_dir_str) / "actions.log"
+            with ActionLogWriter(log_filename) as first_log, ActionLogWriter(
+                log_filename
+            ) as second_log:
+                first_log.start_level(LEVEL)
+                first_log.record_action(Action.UP)
+                first_log.record_frame(0.001)
+                first_log.flush()
+                second_log.start_level(LEVEL._replace(level_name="Other"))
+                second_log.record_action(Action.DOWN)
+                second_log.record_frame(0.001)
+                second_log.flush()
+                first_log.record_action(Action.LEFT)
+                first_log.record_frame(0.001)
+            self.assertEqual(1, log_filename.read_bytes().count(LOG_MAGIC))
+            records = list(read_action_log(log_filename))
+
+        self.assertNotEqual(first_log.session, second_log.session)
+        by_session: dict[int, list[object]] = {}
+        for record in records:
+            by_session.setdefault(record.session, []).append(
+                record.level_name if isinstance(record, LevelStart) else record.action
+            )
+        self.assertEqual(
+            {
+                first_log.session: ["Level ✓", Action.UP, Action.LEFT],
+                second_log.session: ["Other", Action.DOWN],
+            },
+            by_session,
+        )
+        times = [
+            record.time for record in records if record.session == first_log.session
+        ]
+        self.assertEqual(sorted(times), times)
+
+    def test_bad_logs(self) -> None:
+        """Error if a file isn't an action log or ends in the middle of a record."""
+        with TemporaryDirectory() as temp_dir_str:
+            log_filename = Path(temp_dir_str) / "actions.log"
+            log_filename.write_bytes(b"not a log")
+            with self.assertRaises(RoguelikeSokobanError) as context:
+                ActionLogWriter(log_filename)
+            self.assertEqual(
+                f"not an action log: '{log_filename}'", str(context.exception)
+            )
+            with self.assertRaises(RoguelikeSokobanError):
+                list(read_action_log(log_filename))
+
+            log_filename.unlink()
+            with ActionLogWriter(log_filename) as action_log:
+                action_log.start_level(LEVEL)
+            log_filename.write_bytes(log_filename.read_bytes()[:-3])
+            with self.assertRaises(RoguelikeSokobanError) as context:
+                list(read_action_log(log_filename))
+            self.assertEqual(
+                "action log ends in the middle of a record", str(context.exception)
+            )
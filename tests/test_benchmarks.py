@@ -0,0 +1,75 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from benchmarks.memory import measure_level_file
+from benchmarks.suite import (
+    bench_universe,
+    find_regressions,
+    read_results,
+    run_benchmarks,
+    write_results,
+)
+from src.util import TEST_LEVELS_DIR
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test the benchmark suite."""
+
+    def test_run_benchmarks(self) -> None:
+        """Every benchmark runs and reports a time."""
+        results = run_benchmarks(
+            repeat=1, level_filenames=[TEST_LEVELS_DIR / "simple_level.txt"]
+        )
+        self.assertEqual(
+            [
+                "universe_init",
+                "eval_action",
+                "universe_fork",
+                "display_draw",
+                "load/simple_level.txt",
+                "update_best_score/json",
+                "update_best_score/journal",
+                "update_best_score/sqlite",
+                "convert_level",
+            ],
+            list(results),
+        )
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+        with TemporaryDirectory() as temp_dir_str:
+            results_filename = Path(temp_dir_str) / "results.json"
+            write_results(results_filename, results)
+            self.assertEqual(results, read_results(results_filename))
+
+    def test_many_repeats(self) -> None:
+        """Benchmarks don't run out of input however many times they're repeated."""
+        results = dict(bench_universe(repeat=25))
+        self.assertTrue(all(seconds > 0 for seconds in results.values()))
+
+    def test_find_regressions(self) -> None:
+        """Only results more than the threshold slower than the baseline count."""
+        baseline = {"fast": 1.0, "slow": 1.0, "old": 1.0}
+        results = {"fast": 1.4, "slow": 1.6, "new": 5.0}
+        self.assertEqual(
+            [("slow", 1.6, 1.0)], find_regressions(results, baseline, 0.5)
+        )
+        self.assertEqual([], find_regressions(results, baseline, 1.0))
+
+
+class TestMemoryBenchmark(unittest.TestCase):
+    """Test the memory benchmark."""
+
+    def test_measure_level_file(self) -> None:
+        """Every level in the file is measured."""
+        level_filename = TEST_LEVELS_DIR / "simple_level.txt"
+        result = measure_level_file(level_filename)
+        self.assertEqual(level_filename, result.level_filename)
+        self.assertEqual(1, result.levels)
+        self.assertGreater(result.max_bytes, 0)
+        self.assertLessEqual(result.mean_bytes, result.max_bytes)
@@ -0,0 +1,63 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+
+from src.canonical import canonical_form, canonical_layout, level_hash
+from src.levelloader import LevelLoader
+from src.util import TEST_LEVELS_DIR
+
+SYMBOLS = {"boulder": "0", "floor": ".", "pit": "^", "player": "@"}
+LEVEL = (
+    "------",
+    "|@.0^|",
+    "|....|",
+    "------",
+)
+
+
+class TestCanonical(unittest.TestCase):
+    """Test canonical forms and level hashes."""
+
+    def test_different_symbols(self) -> None:
+        """Levels that only differ by symbols have the same hash."""
+        simple = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+        different = LevelLoader(TEST_LEVELS_DIR / "different_symbols.txt")
+        self.assertEqual(
+            level_hash(simple.levels["Simple Level"], simple.symbols),
+            level_hash(different.levels["Different Symbols Level"], different.symbols),
+        )
+
+    def test_padding_and_walls(self) -> None:
+        """Blank space around a level and the wall symbols don't matter."""
+        padded = (
+            "        ",
+            " ###### ",
+            " #@.0^# ",
+            " #....# ",
+            " ###### ",
+            "        ",
+        )
+        unwalled = ("@.0^", "....")
+        expected = canonical_form(LEVEL, SYMBOLS)
+        self.assertEqual(expected, canonical_form(padded, SYMBOLS))
+        self.assertEqual(expected, canonical_form(unwalled, SYMBOLS))
+
+    def test_rotations_and_reflections(self) -> None:
+        """Rotated and reflected levels have the same hash."""
+        reflected = tuple(row[::-1] for row in LEVEL)
+        rotated = tuple("".join(col) for col in zip(*reversed(LEVEL)))
+        flipped = tuple(reversed(LEVEL))
+        expected = level_hash(LEVEL, SYMBOLS)
+        for level in (reflected, rotated, flipped):
+            self.assertEqual(expected, level_hash(level, SYMBOLS))
+
+    def test_different_levels(self) -> None:
+        """Levels that play differently have different hashes."""
+        moved_pit = ("------", "|@.0.|", "|...^|", "------")
+        self.assertNotEqual(level_hash(LEVEL, SYMBOLS), level_hash(moved_pit, SYMBOLS))
+        self.assertEqual(
+            canonical_layout(LEVEL, SYMBOLS), canonical_layout(moved_pit, SYMBOLS)
+        )
@@ -3,13 +3,18 @@ Copyright Jeremy Nation <jeremy@jeremynation.me>.
 Licensed under the GNU General Public License (GPL) v3.
 
 """
+import contextlib
 import filecmp
+import io
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
-from convert_xsokoban import get_level_groups, get_parser, main
-from src.util import TEST_DIR
+from benchmarks.conversion import make_level
+from convert_xsokoban import get_parser, main
+from src.levelloader import LevelLoader
+from src.sokoban_format import convert_level, is_good_level, level_to_str
+from src.util import TEST_DIR, UTF_8
 
 CONVERTED_LEVELS_DIR = Path("levels")
 SRC_LEVELS_DIR = TEST_DIR / "xsokoban_src"
@@ -20,12 +25,28 @@ CONVERTED_FILENAME_STR = "xsokoban1-10.txt"
 class TestConvertXSokoban(unittest.TestCase):
     """Test convert_sokoban.py."""
 
-    def test_get_level_groups(self) -> None:
-        """Test get_level_groups."""
-        self.assertEqual([(1, 7)], get_level_groups(7))
-        self.assertEqual([(1, 10)], get_level_groups(10))
-        self.assertEqual([(1, 10), (11, 20)], get_level_groups(20))
-        self.assertEqual([(1, 10), (11, 20), (21, 23)], get_level_groups(23))
+    def test_convert_level(self) -> None:
+        """Only blanks with an object on every side become floor."""
+        orig_level = ["  #####", " ##@ $.#", "  #  ##", "  ####"]
+        self.assertEqual(
+            "  -----\n --@.0^|\n  |..--\n  ----",
+            level_to_str(convert_level(orig_level)),
+        )
+
+    def test_is_good_level(self) -> None:
+        """Levels with squares that can't be converted are found in any row."""
+        self.assertTrue(is_good_level(convert_level(["#####", "#@$.#", "#####"])))
+        self.assertFalse(is_good_level(convert_level(["#####", "#@*.#", "#####"])))
+        self.assertFalse(is_good_level(convert_level(["#@*.#", "#####"])))
+
+    def test_convert_large_level(self) -> None:
+        """Large levels convert without the blank space around them becoming floor."""
+        level = convert_level(make_level(300))
+        self.assertEqual(300, len(level))
+        self.assertEqual(" " * 300, "".join(level[0]))
+        self.assertEqual("@", level[2][2])
+        for row in level[2:-2]:
+            self.assertNotIn(" ", "".join(row[2:-2]))
 
     def test_main(self) -> None:
         """Test main."""
@@ -42,9 +63,13 @@ class TestConvertXSokoban(unittest.TestCase):
             output_dir = Path(output_dir_str)
             self.assertEqual(
                 {
+                    "globs": None,
+                    "group_size": 10,
                     "input_dir": SRC_LEVELS_DIR,
                     "max_level": 10,
                     "output_dir": output_dir,
+                    "output_prefix": "xsokoban",
+                    "workers": None,
                 },
                 vars(args),
             )
@@ -56,3 +81,135 @@ class TestConvertXSokoban(unittest.TestCase):
                     output_dir / CONVERTED_FILENAME_STR,
                 )
             )
+
+    def test_main_globs(self) -> None:
+        """Test main with input globs, a group size, and several workers."""
+        with TemporaryDirectory() as output_dir_str:
+            args = get_parser().parse_args(
+                [
+                    "--output-dir",
+                    output_dir_str,
+                    "--glob",
+                    "screen.?",
+                    "--glob",
+                    "screen.1*",
+                    "--group-size",
+                    "4",
+                    "--workers",
+                    "2",
+                    str(SRC_LEVELS_DIR),
+                ]
+            )
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(args)
+
+            output_dir = Path(output_dir_str)
+            self.assertEqual(
+                ["xsokoban1-4.txt", "xsokoban5-8.txt", "xsokoban9-10.txt"],
+                sorted(path.name for path in output_dir.iterdir()),
+            )
+            converted_text = "".join(
+                (output_dir / name).read_text(encoding=UTF_8).split("-> maps\n")[1]
+                for name in ("xsokoban1-4.txt", "xsokoban5-8.txt", "xsokoban9-10.txt")
+            )
+            expected_text = (
+                (CONVERTED_LEVELS_DIR / CONVERTED_FILENAME_STR)
+                .read_text(encoding=UTF_8)
+                .split("-> maps\n")[1]
+            )
+            self.assertEqual(expected_text, converted_text)
+            self.assertIn(
+                "10 of 10 levels converted into 3 level files", output.getvalue()
+            )
+
+    def test_main_skipped_levels(self) -> None:
+        """Levels that can't be played are left out and listed."""
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            (temp_dir / "screen.1").write_text("#####\n#@$.#\n#####\n", encoding=UTF_8)
+            (temp_dir / "screen.2").write_text("#####\n#@*.#\n#####\n", encoding=UTF_8)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(get_parser().parse_args(["--max-level", "2", temp_dir_str]))
+
+            self.assertEqual(
+                "1 of 2 levels converted into 1 level files\n"
+                "Skipped 1 levels that can't be played:\n"
+                "  XSokoban level 2\n",
+                output.getvalue(),
+            )
+            self.assertEqual(
+                ["XSokoban level 1"],
+                [
+                    line.split(": ", 1)[1]
+                    for line in (temp_dir / "xsokoban1-2.txt")
+                    .read_text(encoding=UTF_8)
+                    .splitlines()
+                    if line.startswith("name: ")
+                ],
+            )
+
+    def test_main_collection(self) -> None:
+        """Levels in a standard format collection keep their titles."""
+        with TemporaryDirectory() as output_dir_str:
+            args = get_parser().parse_args(
+                [
+                    "--output-dir",
+                    output_dir_str,
+                    "--glob",
+                    "*.sok",
+                    "--group-size",
+                    "2",
+                    "--output-prefix",
+                    "collection",
+                    str(TEST_DIR / "test_levels"),
+                ]
+            )
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                main(args)
+
+            output_dir = Path(output_dir_str)
+            self.assertEqual(
+                ["collection1-2.txt", "collection3-3.txt"],
+                sorted(path.name for path in output_dir.iterdir()),
+            )
+            self.assertEqual(
+                ["Comment Title", "Titled Level"],
+                [
+                    line.split(": ", 1)[1]
+                    for line in (output_dir / "collection1-2.txt")
+                    .read_text(encoding=UTF_8)
+                    .splitlines()
+                    if line.startswith("name: ")
+                ],
+            )
+            self.assertIn("  Level 3\n", output.getvalue())
+
+    def test_main_untitled_collections(self) -> None:
+        """Untitled levels in different collections get different names."""
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            for name in ("a.sok", "b.sok"):
+                (temp_dir / name).write_text(
+                    "#####\n#@$.#\n#####\n\n#####\n#.$@#\n#####\n", encoding=UTF_8
+                )
+            with contextlib.redirect_stdout(io.StringIO()):
+                main(get_parser().parse_args(["--glob", "*.sok", temp_dir_str]))
+
+            loader = LevelLoader(temp_dir / "xsokoban1-4.txt")
+            self.assertEqual(
+                ["Level 1", "Level 2", "Level 1 (2)", "Level 2 (2)"],
+                list(loader.levels),
+            )
+
+    def test_bad_group_size(self) -> None:
+        """Group sizes below 1 are rejected when parsing arguments."""
+        for group_size in ("0", "-1", "x"):
+            with self.subTest(group_size=group_size), contextlib.redirect_stderr(
+                io.StringIO()
+            ) as stderr:
+                with self.assertRaises(SystemExit):
+                    get_parser().parse_args(["--group-size", group_size, "dir"])
+                self.assertIn("--group-size", stderr.getvalue())
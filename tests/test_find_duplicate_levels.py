@@ -0,0 +1,49 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from find_duplicate_levels import LevelRef, find_duplicates
+from src.util import TEST_LEVELS_DIR, UTF_8
+
+
+class TestFindDuplicateLevels(unittest.TestCase):
+    """Test find_duplicate_levels.py."""
+
+    def test_find_duplicates(self) -> None:
+        """Find duplicates and near duplicates across level files."""
+        simple_filename = TEST_LEVELS_DIR / "simple_level.txt"
+        different_filename = TEST_LEVELS_DIR / "different_symbols.txt"
+        with TemporaryDirectory() as temp_dir_str:
+            near_filename = Path(temp_dir_str) / "near.txt"
+            near_filename.write_text(
+                "boulder: 0\nfloor: .\npit: ^\nplayer: @\n-> maps\n"
+                "name: Near\n.....\n.@0.^\n.....\n",
+                encoding=UTF_8,
+            )
+            duplicates, near_duplicates = find_duplicates(
+                [simple_filename, different_filename, near_filename]
+            )
+        self.assertEqual(
+            [
+                [
+                    LevelRef(simple_filename, "Simple Level"),
+                    LevelRef(different_filename, "Different Symbols Level"),
+                ]
+            ],
+            duplicates,
+        )
+        self.assertEqual(
+            [
+                [
+                    LevelRef(simple_filename, "Simple Level"),
+                    LevelRef(different_filename, "Different Symbols Level"),
+                    LevelRef(near_filename, "Near"),
+                ]
+            ],
+            near_duplicates,
+        )
@@ -0,0 +1,105 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import contextlib
+import io
+import unittest
+
+from fuzz_universe import (
+    Mismatch,
+    ModelUniverse,
+    find_mismatch,
+    fuzz_seeds,
+    get_parser,
+    load_engine,
+    main,
+    make_case,
+    shrink_case,
+)
+from src.universe import Universe
+from src.util import RoguelikeSokobanError
+
+
+class _UnfilledPitUniverse(Universe):
+    """Universe with a bug: pits stay pits after a boulder falls in."""
+
+    def fill_pit(self, row_index: int, col_index: int) -> None:
+        pass
+
+
+class TestFuzzUniverse(unittest.TestCase):
+    """Test fuzz_universe.py."""
+
+    def test_model_universe_agrees(self) -> None:
+        """The model engine and Universe agree on random cases."""
+        self.assertIsNone(fuzz_seeds("fuzz_universe:ModelUniverse", range(200), 100))
+        self.assertIsNone(find_mismatch(make_case(0, 100), ModelUniverse))
+
+    def test_make_case(self) -> None:
+        """The same seed always makes the same case."""
+        case = make_case(7, 50)
+        self.assertEqual(case, make_case(7, 50))
+        self.assertTrue(1 <= len(case.actions) <= 50)
+        self.assertEqual(1, sum(row.count("@") for row in case.level_map))
+
+    def test_shrink_case(self) -> None:
+        """A difference is found and shrunk to a minimal case."""
+        engine_spec = f"{__name__}:_UnfilledPitUniverse"
+        seed = fuzz_seeds(engine_spec, range(1000), 100)
+        self.assertIsNotNone(seed)
+        assert seed is not None
+        engine = load_engine(engine_spec)
+        case = make_case(seed, 100)
+        mismatch = find_mismatch(case, engine)
+        assert mismatch is not None
+        self.assertEqual("level_map", _first_difference(mismatch))
+
+        shrunk = shrink_case(case, engine)
+        self.assertIsNotNone(find_mismatch(shrunk, engine))
+        # One push of a boulder into a pit, inside the outer wall.
+        self.assertEqual(1, len(shrunk.actions))
+        self.assertEqual(15, len("".join(shrunk.level_map)))
+
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            shrink_case(case, Universe)
+        self.assertEqual("engines agree on the case to shrink", str(context.exception))
+
+    def test_main(self) -> None:
+        """The exit status and output report whether a difference was found."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = main(get_parser().parse_args(["--cases", "50", "--workers", "1"]))
+        self.assertEqual(0, status)
+        self.assertEqual("50 cases, no differences found\n", output.getvalue())
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = main(
+                get_parser().parse_args(
+                    ["--engine", f"{__name__}:_UnfilledPitUniverse", "--workers", "1"]
+                )
+            )
+        self.assertEqual(1, status)
+        self.assertIn("shrunk to:\nlevel:\n", output.getvalue())
+
+    def test_load_engine_error(self) -> None:
+        """Error if the engine can't be loaded."""
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            load_engine("fuzz_universe")
+        self.assertEqual(
+            "engine must be module:class: 'fuzz_universe'", str(context.exception)
+        )
+        with self.assertRaises(RoguelikeSokobanError):
+            load_engine("fuzz_universe:NoSuchEngine")
+
+
+def _first_difference(mismatch: Mismatch) -> str:
+    """Return the name of the first field that differs in mismatch."""
+    assert not isinstance(mismatch.expected, str)
+    assert not isinstance(mismatch.actual, str)
+    for field in mismatch.expected._fields:
+        if getattr(mismatch.expected, field) != getattr(mismatch.actual, field):
+            return field
+    return ""
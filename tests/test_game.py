@@ -0,0 +1,74 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from src.game import Game
+from src.levelloader import LevelLoader
+from src.score_tracking import Scores
+from src.util import TEST_LEVELS_DIR, UTF_8
+
+
+class TestGame(unittest.TestCase):
+    """Test playing levels."""
+
+    def test_unplayable_level(self) -> None:
+        """Choosing a level that can't be played asks for another level."""
+        scrn = mock.Mock()
+        loader = LevelLoader(TEST_LEVELS_DIR / "standard_collection.sok")
+        with mock.patch.object(
+            loader, "level_prompt", side_effect=KeyboardInterrupt
+        ) as level_prompt:
+            with self.assertRaises(KeyboardInterrupt):
+                Game(scrn, loader, Scores()).play("Level 3")
+        level_prompt.assert_called_once_with(
+            scrn, "level can't be converted: 'Level 3'"
+        )
+
+    @mock.patch("src.game.Display")
+    def test_hints_per_level(self, _: mock.Mock) -> None:
+        """Mirrored copies of a level share a content hash but get their own hints."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "mirrored.sok"
+            level_filename.write_text(
+                "; Left\n#####\n#@$.#\n#####\n\n; Right\n#####\n#.$@#\n#####\n",
+                encoding=UTF_8,
+            )
+            loader = LevelLoader(level_filename)
+        self.assertEqual(
+            loader.get_level_key("Left").content_hash,
+            loader.get_level_key("Right").content_hash,
+        )
+        game = Game(mock.Mock(), loader, Scores())
+        # pylint: disable=protected-access
+        game._start_level("Left")
+        left_hints = game._hints
+        game._start_level("Right")
+        self.assertIsNot(left_hints, game._hints)
+        game._start_level("Left")
+        self.assertIs(left_hints, game._hints)
+
+    @mock.patch("src.game.Display")
+    def test_failed_hint_search(self, display: mock.Mock) -> None:
+        """A hint search that fails is reported instead of searching forever."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+        game = Game(mock.Mock(), loader, Scores())
+        # pylint: disable=protected-access
+        game._start_level("Simple Level")
+        with mock.patch("src.hints._search", side_effect=RuntimeError("broken")):
+            game._request_hint()
+            self.assertTrue(game._hint_pending)
+            for _ in range(100):
+                if game._check_background_work():
+                    break
+                time.sleep(0.01)
+        self.assertFalse(game._hint_pending)
+        display.return_value.text.__setitem__.assert_called_with(
+            "hint_line", "Hint: search failed: RuntimeError: broken"
+        )
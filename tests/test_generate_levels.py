@@ -0,0 +1,77 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import io
+import random
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from generate_levels import generate_level_rows, get_parser, main, write_levels
+from src.levelloader import LevelLoader
+from src.util import RoguelikeSokobanError
+
+
+class TestGenerateLevels(unittest.TestCase):
+    """Test generate_levels.py."""
+
+    def test_generated_levels_load(self) -> None:
+        """Generated level files pass validation and have what was asked for."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "generated.txt"
+            main(
+                get_parser().parse_args(
+                    [
+                        str(level_filename),
+                        "--width",
+                        "30",
+                        "--height",
+                        "12",
+                        "--boulders",
+                        "6",
+                        "--pits",
+                        "5",
+                        "--wall-density",
+                        "0.3",
+                        "--levels",
+                        "20",
+                    ]
+                )
+            )
+            loader = LevelLoader(level_filename)
+
+        self.assertEqual(20, len(loader.levels))
+        for level_name in loader.levels:
+            # Level arrays are padded by one square on each side.
+            level_map = loader.levels[level_name]
+            self.assertEqual((14, 32), (len(level_map), len(level_map[0])))
+            level_text = "".join(level_map)
+            for symbol_name, count in (("player", 1), ("boulder", 6), ("pit", 5)):
+                self.assertEqual(count, level_text.count(loader.symbols[symbol_name]))
+
+    def test_wall_density(self) -> None:
+        """About wall_density of the inside squares are walls."""
+        rows = list(generate_level_rows(102, 102, 1, 1, 0.25, random.Random(1)))
+        inside = "".join(row[1:-1] for row in rows[1:-1])
+        self.assertAlmostEqual(0.25, inside.count("-") / len(inside), delta=0.02)
+
+    def test_same_seed_same_levels(self) -> None:
+        """The same seed always generates the same levels."""
+        files = [io.StringIO(), io.StringIO()]
+        for file in files:
+            write_levels(file, 3, 10, 6, 2, 2, 0.2, seed=7)
+        self.assertEqual(files[0].getvalue(), files[1].getvalue())
+
+    def test_impossible_levels(self) -> None:
+        """Parameters no valid level can have are errors."""
+        for params, message in (
+            ((2, 10, 1, 1), "level must be at least 3 by 3: 2 by 10"),
+            ((10, 10, 1, 0), "level needs at least one pit"),
+            ((10, 10, 1, 2), "level needs at least as many boulders as pits: 1 < 2"),
+            ((4, 4, 2, 2), "level has room for 4 boulders, pits and players, not 5"),
+        ):
+            with self.assertRaises(RoguelikeSokobanError) as context:
+                write_levels(io.StringIO(), 1, *params, 0.1)
+            self.assertEqual(message, str(context.exception))
@@ -0,0 +1,95 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import time
+import unittest
+from unittest import mock
+
+from src.hints import Hint, HintFinder, get_search_state, search_hints
+from src.sokoban_format import RL_SYMBOLS
+from src.universe import Universe
+from src.util import Action
+
+SOLVABLE_LEVEL = (
+    "-------",
+    "|.....|",
+    "|@.0.^|",
+    "|..0.^|",
+    "-------",
+)
+UNSOLVABLE_LEVEL = (
+    "-----",
+    "|0.^|",
+    "|@..|",
+    "-----",
+)
+
+
+class TestHints(unittest.TestCase):
+    """Test hints."""
+
+    def test_search_hints(self) -> None:
+        """Following the hints solves the level in the fewest moves."""
+        univ = Universe("Solvable", SOLVABLE_LEVEL, RL_SYMBOLS)
+        hints = search_hints(univ)
+        assert hints is not None
+        while not univ.game_won:
+            hint = hints[get_search_state(univ)]
+            assert hint.action is not None
+            univ.eval_action(hint.action)
+        self.assertEqual(len(hints), univ.moves_taken)
+        self.assertEqual(8, univ.moves_taken)
+
+    def test_no_hint(self) -> None:
+        """Searches report unsolvable states, and give up at the search limit."""
+        univ = Universe("Unsolvable", UNSOLVABLE_LEVEL, RL_SYMBOLS)
+        self.assertEqual({get_search_state(univ): Hint(None, True)}, search_hints(univ))
+        self.assertEqual("Hint: no solution from here", Hint(None, True).describe())
+
+        univ = Universe("Solvable", SOLVABLE_LEVEL, RL_SYMBOLS)
+        self.assertEqual(
+            {get_search_state(univ): Hint(None, False)},
+            search_hints(univ, search_limit=5),
+        )
+
+    def test_hint_finder(self) -> None:
+        """Hints are found in the background, remembered, and searches cancelled."""
+        univ = Universe("Solvable", SOLVABLE_LEVEL, RL_SYMBOLS)
+        hints = HintFinder()
+        self.assertIsNone(hints.request_hint(univ))
+        for _ in range(100):
+            if not hints.searching:
+                break
+            time.sleep(0.01)
+        self.assertFalse(hints.searching)
+        self.assertEqual(Hint(Action.RIGHT, False), hints.get_hint(univ))
+        self.assertEqual(Hint(Action.RIGHT, False), hints.request_hint(univ))
+
+        # The next state is on the solution found, so its hint is already known.
+        univ.eval_action(Action.RIGHT)
+        self.assertIsNotNone(hints.request_hint(univ))
+
+        univ.eval_action(Action.UP)
+        hints = HintFinder()
+        self.assertIsNone(hints.request_hint(univ))
+        hints.cancel()
+        self.assertFalse(hints.searching)
+
+    def test_failed_search(self) -> None:
+        """A search that fails gives a hint saying so instead of never finishing."""
+        univ = Universe("Solvable", SOLVABLE_LEVEL, RL_SYMBOLS)
+        hints = HintFinder()
+        with mock.patch("src.hints._search", side_effect=MemoryError("out of memory")):
+            self.assertIsNone(hints.request_hint(univ))
+            for _ in range(100):
+                if not hints.searching:
+                    break
+                time.sleep(0.01)
+        self.assertFalse(hints.searching)
+        hint = hints.get_hint(univ)
+        assert hint is not None
+        self.assertEqual(
+            "Hint: search failed: MemoryError: out of memory", hint.describe()
+        )
@@ -0,0 +1,94 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import shutil
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.level_index import (
+    LevelMetadata,
+    build_metadata,
+    compute_metadata,
+    parse_filter,
+    read_index,
+    write_index,
+)
+from src.levelloader import LevelLoader
+from src.util import (
+    DEFAULT_LEVEL_FILENAME,
+    METADATA_FIELDS,
+    TEST_LEVELS_DIR,
+    RoguelikeSokobanError,
+)
+
+
+class TestLevelIndex(unittest.TestCase):
+    """Test level metadata and level indexes."""
+
+    def test_compute_metadata(self) -> None:
+        """Test compute_metadata."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+        self.assertEqual(
+            {
+                "width": 5,
+                "height": 3,
+                "floor": 15,
+                "boulders": 1,
+                "pits": 1,
+                "spare": 0,
+                "min_moves": 2,
+            },
+            compute_metadata(loader.levels["Simple Level"], loader.symbols),
+        )
+
+    def test_read_write_index(self) -> None:
+        """An index is read back until its level file changes."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "levels.txt"
+            shutil.copy(DEFAULT_LEVEL_FILENAME, level_filename)
+            self.assertIsNone(read_index(level_filename))
+
+            metadata = build_metadata(LevelLoader(level_filename))
+            write_index(level_filename, metadata)
+            self.assertEqual(metadata, read_index(level_filename))
+            self.assertEqual(metadata, LevelLoader(level_filename).get_metadata())
+
+            with level_filename.open(mode="a") as file:
+                file.write("name: Extra\n@0^\n")
+            self.assertIsNone(read_index(level_filename))
+
+    def test_parse_filter(self) -> None:
+        """Test parse_filter."""
+        metadata = compute_metadata(
+            LevelLoader(TEST_LEVELS_DIR / "simple_level.txt").levels["Simple Level"],
+            {"boulder": "0", "floor": ".", "pit": "^", "player": "@"},
+        )
+        self.assertTrue(parse_filter("width=5")(metadata))
+        self.assertTrue(parse_filter("floor >= 15")(metadata))
+        self.assertFalse(parse_filter("boulders>1")(metadata))
+
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            parse_filter("size>1")
+        self.assertEqual("unknown level field: 'size'", str(context.exception))
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            parse_filter("width")
+        self.assertEqual("invalid filter: 'width'", str(context.exception))
+
+    def test_metadata_fields(self) -> None:
+        """The fields listed in the level prompt are the metadata fields."""
+        self.assertEqual(tuple(LevelMetadata.__annotations__), METADATA_FIELDS)
+
+    def test_list_levels(self) -> None:
+        """Levels can be sorted and filtered by metadata."""
+        loader = LevelLoader(DEFAULT_LEVEL_FILENAME)
+        self.assertEqual(list(loader.levels), loader.list_levels())
+        self.assertEqual(
+            ["Warmup", "Trapped!"], loader.list_levels(level_filter="width<10")
+        )
+        self.assertEqual(
+            ["Crossroads", "Rescue Thy Kitten, Mortal!", "Trapped!", "Concentric"],
+            loader.list_levels(sort_by="boulders", level_filter="pits>10")[:4],
+        )
@@ -3,10 +3,24 @@ Copyright Jeremy Nation <jeremy@jeremynation.me>.
 Licensed under the GNU General Public License (GPL) v3.
 
 """
+import os
+import shutil
+import subprocess
+import sys
 import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
 
 from src.levelloader import LevelLoader
-from src.util import TEST_LEVELS_DIR, RoguelikeSokobanError
+from src.util import (
+    DEFAULT_LEVEL_FILENAME,
+    TERMINAL_TOO_SMALL_TEXT,
+    TEST_DIR,
+    TEST_LEVELS_DIR,
+    UTF_8,
+    RoguelikeSokobanError,
+)
 
 
 class TestLevelLoader(unittest.TestCase):
@@ -86,3 +100,184 @@ class TestLevelLoader(unittest.TestCase):
         with self.assertRaises(RoguelikeSokobanError) as context:
             LevelLoader(TEST_LEVELS_DIR / "symbol_too_big.txt")
         self.assertEqual("symbol too big: 'boulder': '0.'", str(context.exception))
+
+    def test_fast_start(self) -> None:
+        """With fast_start, level errors are raised when the level is accessed."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "no_player.txt", fast_start=True)
+        self.assertEqual(["No Player Level"], list(loader.levels))
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            loader.levels["No Player Level"]  # pylint: disable=pointless-statement
+        self.assertEqual(
+            "no player in level: 'No Player Level'", str(context.exception)
+        )
+
+    def test_fast_start_symbols(self) -> None:
+        """With fast_start, symbol errors are still raised up front."""
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            LevelLoader(TEST_LEVELS_DIR / "empty_symbol.txt", fast_start=True)
+        self.assertEqual("empty symbol: 'boulder'", str(context.exception))
+
+    def test_standard_collection(self) -> None:
+        """Standard format collections are loaded and converted per level."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "standard_collection.sok")
+        self.assertEqual(
+            ["Comment Title", "Titled Level", "Level 3"], list(loader.levels)
+        )
+        level = loader.levels["Comment Title"]
+        self.assertEqual(
+            ["       ", " ----- ", " |@0^| ", " ----- ", "       "], list(level)
+        )
+        self.assertIs(level, loader.levels["Comment Title"])
+
+    def test_standard_collection_unconvertible_level(self) -> None:
+        """Error if a chosen standard format level can't be converted."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "standard_collection.sok")
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            loader.levels["Level 3"]  # pylint: disable=pointless-statement
+        self.assertEqual("level can't be converted: 'Level 3'", str(context.exception))
+
+    def test_standard_collection_matches_converted(self) -> None:
+        """XSokoban screens load the same as the levels convert_xsokoban.py made."""
+        converted = LevelLoader(Path("levels") / "xsokoban1-10.txt")
+        with TemporaryDirectory() as temp_dir_str:
+            collection_filename = Path(temp_dir_str) / "xsokoban.xsb"
+            with collection_filename.open(mode="w", encoding=UTF_8) as file:
+                for i in range(1, 11):
+                    file.write(f"; XSokoban level {i}\n")
+                    screen = TEST_DIR / "xsokoban_src" / f"screen.{i}"
+                    file.write(screen.read_text(encoding=UTF_8))
+                    file.write("\n")
+            loader = LevelLoader(collection_filename)
+            for level_name, level in converted.levels.items():
+                self.assertEqual(level, loader.levels[level_name])
+
+    def test_reload_if_changed(self) -> None:
+        """Only levels that changed are reloaded."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "levels.txt"
+            shutil.copy(TEST_LEVELS_DIR / "simple_level.txt", level_filename)
+            loader = LevelLoader(level_filename)
+            simple_level = loader.levels["Simple Level"]
+            self.assertEqual(set(), loader.reload_if_changed())
+
+            def write_levels(text: str) -> None:
+                mtime_ns = level_filename.stat().st_mtime_ns
+                level_filename.write_text(text, encoding=UTF_8)
+                os.utime(level_filename, ns=(mtime_ns + 1, mtime_ns + 1))
+
+            original_text = level_filename.read_text(encoding=UTF_8)
+            write_levels(original_text + "name: New Level\n@0^\n")
+            self.assertEqual({"New Level"}, loader.reload_if_changed())
+            self.assertIs(simple_level, loader.levels["Simple Level"])
+            self.assertEqual(
+                ["     ", " @0^ ", "     "], list(loader.levels["New Level"])
+            )
+
+            write_levels(original_text.replace("@.0.^", "..0.^"))
+            self.assertEqual({"Simple Level", "New Level"}, loader.reload_if_changed())
+            with self.assertRaises(RoguelikeSokobanError) as context:
+                loader.levels["Simple Level"]  # pylint: disable=pointless-statement
+            self.assertEqual(
+                "no player in level: 'Simple Level'", str(context.exception)
+            )
+
+            write_levels(original_text.replace("player: @", "player: P"))
+            self.assertEqual({"Simple Level"}, loader.reload_if_changed())
+            self.assertEqual("P", loader.symbols["player"])
+
+    def test_reload_partial_save(self) -> None:
+        """A level file read halfway through being saved is read again later."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "levels.txt"
+            shutil.copy(TEST_LEVELS_DIR / "simple_level.txt", level_filename)
+            loader = LevelLoader(level_filename)
+            simple_level = loader.levels["Simple Level"]
+            original_bytes = level_filename.read_bytes()
+            mtime_ns = level_filename.stat().st_mtime_ns
+
+            # Cut off in the middle of a UTF-8 character.
+            level_filename.write_bytes(original_bytes + "name: Level ✓".encode()[:-1])
+            os.utime(level_filename, ns=(mtime_ns + 1, mtime_ns + 1))
+            for _ in range(2):
+                with self.assertRaisesRegex(
+                    RoguelikeSokobanError, "can't read level file"
+                ):
+                    loader.reload_if_changed()
+            self.assertIs(simple_level, loader.levels["Simple Level"])
+
+            level_filename.write_bytes(original_bytes + b"name: New Level\n@0^\n")
+            os.utime(level_filename, ns=(mtime_ns + 1, mtime_ns + 1))
+            self.assertEqual({"New Level"}, loader.reload_if_changed())
+
+    def test_get_level_key(self) -> None:
+        """Level keys depend on level content, not on where the level file is."""
+        with TemporaryDirectory() as temp_dir_str:
+            level_filename = Path(temp_dir_str) / "levels.txt"
+            shutil.copy(TEST_LEVELS_DIR / "simple_level.txt", level_filename)
+            loader = LevelLoader(level_filename)
+            level_key = loader.get_level_key("Simple Level")
+            self.assertIs(level_key, loader.get_level_key("Simple Level"))
+            self.assertEqual(level_filename.resolve(), level_key.level_filename)
+            self.assertEqual("Simple Level", level_key.level_name)
+
+            original_loader = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+            self.assertEqual(
+                level_key.content_hash,
+                original_loader.get_level_key("Simple Level").content_hash,
+            )
+
+            mtime_ns = level_filename.stat().st_mtime_ns
+            level_filename.write_text(
+                level_filename.read_text(encoding=UTF_8).replace("@.0.^", "@0..^"),
+                encoding=UTF_8,
+            )
+            os.utime(level_filename, ns=(mtime_ns + 1, mtime_ns + 1))
+            loader.reload_if_changed()
+            self.assertNotEqual(
+                level_key.content_hash,
+                loader.get_level_key("Simple Level").content_hash,
+            )
+
+    def test_level_prompt_pages(self) -> None:
+        """Levels that don't fit on the screen are shown a page at a time."""
+        loader = LevelLoader(DEFAULT_LEVEL_FILENAME)
+        level_names = list(loader.levels)
+        scrn = mock.Mock()
+        # Room for three levels at once.
+        scrn.getmaxyx.return_value = (10, 80)
+        scrn.getyx.return_value = (5, 0)
+        scrn.getstr.side_effect = [b"next", b"5"]
+        with mock.patch("src.levelloader.curses"):
+            self.assertEqual(level_names[4], loader.level_prompt(scrn))
+        scrn.addstr.assert_any_call(3, 0, f"1. {level_names[0]}")
+        scrn.addstr.assert_any_call(3, 0, f"4. {level_names[3]}")
+        page_line = (
+            f"Levels 4-6 of {len(level_names)}, type 'next' or 'prev' to see more:"
+        )
+        scrn.addstr.assert_any_call(2, 0, page_line)
+
+        scrn.getmaxyx.return_value = (7, 80)
+        with mock.patch("src.levelloader.curses"):
+            with self.assertRaises(RoguelikeSokobanError) as context:
+                loader.level_prompt(scrn)
+        self.assertEqual(TERMINAL_TOO_SMALL_TEXT, str(context.exception))
+
+    def test_level_prompt_deferred_metadata(self) -> None:
+        """The level prompt doesn't load level metadata until it's needed."""
+        code = (
+            "import sys\n"
+            "from unittest import mock\n"
+            "from src.levelloader import LevelLoader\n"
+            "from src.util import DEFAULT_LEVEL_FILENAME\n"
+            "scrn = mock.Mock()\n"
+            "scrn.getmaxyx.return_value = (24, 80)\n"
+            "scrn.getyx.return_value = (5, 0)\n"
+            "scrn.getstr.return_value = b'1'\n"
+            "with mock.patch('src.levelloader.curses'):\n"
+            "    LevelLoader(DEFAULT_LEVEL_FILENAME).level_prompt(scrn)\n"
+            "print('src.level_index' in sys.modules)\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, check=True, text=True
+        )
+        self.assertEqual("False", result.stdout.strip())
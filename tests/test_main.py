@@ -0,0 +1,34 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import subprocess
+import sys
+import unittest
+
+
+class TestMain(unittest.TestCase):
+    """Test the main game module."""
+
+    def test_deferred_imports(self) -> None:
+        """Modules not needed for the first screen aren't imported with src.main."""
+        code = (
+            "import sys\n"
+            "import src.main\n"
+            "print(' '.join(sorted(sys.modules)))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, check=True, text=True
+        )
+        modules = result.stdout.split()
+        for module_name in (
+            "filecmp",
+            "json",
+            "shutil",
+            "src.display",
+            "src.score_tracking",
+            "src.universe",
+            "tempfile",
+        ):
+            self.assertNotIn(module_name, modules)
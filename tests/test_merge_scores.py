@@ -0,0 +1,123 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import contextlib
+import io
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from merge_scores import get_parser, main, merge_scores
+from src.levelloader import LevelLoader
+from src.score_tracking import Scores, SqliteScores, write_score_file
+from src.util import TEST_LEVELS_DIR, UTF_8
+
+
+class TestMergeScores(unittest.TestCase):
+    """Test merge_scores.py."""
+
+    def test_merge_scores(self) -> None:
+        """Keep the best score and solution for each level across score files."""
+        level_filename = TEST_LEVELS_DIR / "simple_level.txt"
+        level_key = LevelLoader(level_filename).get_level_key("Simple Level")
+        other_level = level_key._replace(content_hash="0" * 32)
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+
+            json_filename = temp_dir / "scores.json"
+            json_scores = Scores(json_filename)
+            json_scores.update_best_score(level_key, 5, "5r")
+            json_scores.update_best_score(other_level, 7)
+
+            db_filename = temp_dir / "scores.db"
+            db_scores = SqliteScores(db_filename)
+            db_scores.update_best_score(level_key, 4, "4r")
+            db_scores.update_best_score(other_level, 9, "9r")
+            db_scores.close()
+
+            # Saved by an older version on another computer.
+            legacy_filename = temp_dir / "legacy.json"
+            legacy_filename.write_text(
+                json.dumps(
+                    {
+                        "/elsewhere/simple_level.txt": {"Simple Level": 3},
+                        "/elsewhere/unknown.txt": {"Unknown": 6},
+                    }
+                ),
+                encoding=UTF_8,
+            )
+
+            records = merge_scores(
+                [json_filename, db_filename, legacy_filename],
+                [level_filename],
+                workers=2,
+            )
+            by_name = {record.level_name: record for record in records}
+            self.assertEqual(3, len(records))
+            self.assertEqual(3, by_name["Simple Level"].score)
+            self.assertEqual(
+                level_key.content_hash, by_name["Simple Level"].content_hash
+            )
+            self.assertIsNone(by_name["Unknown"].content_hash)
+
+            # Without the level file, the old score can't be matched.
+            records = merge_scores([json_filename, db_filename, legacy_filename])
+            self.assertEqual(4, len(records))
+            best = {record.content_hash: record for record in records}
+            self.assertEqual((4, "4r"), best[level_key.content_hash][2:4])
+            self.assertEqual((7, None), best[other_level.content_hash][2:4])
+
+            merged_filename = temp_dir / "merged.json"
+            write_score_file(merged_filename, records)
+            merged_scores = Scores(merged_filename)
+            self.assertEqual(4, merged_scores.get_score(level_key))
+            self.assertEqual(4, len(list(merged_scores.all_scores())))
+
+    def test_missing_input(self) -> None:
+        """A missing input score file is reported and nothing is written."""
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            json_filename = temp_dir / "scores.json"
+            Scores(json_filename).update_best_score(
+                LevelLoader(TEST_LEVELS_DIR / "simple_level.txt").get_level_key(
+                    "Simple Level"
+                ),
+                5,
+            )
+            missing_filename = temp_dir / "mistyped.json"
+            merged_filename = temp_dir / "merged.json"
+            args = get_parser().parse_args(
+                [str(json_filename), str(missing_filename), "-o", str(merged_filename)]
+            )
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(1, main(args))
+            self.assertEqual(
+                f"Error: score file not found: '{missing_filename}'\n",
+                stderr.getvalue(),
+            )
+            self.assertFalse(merged_filename.exists())
+            self.assertFalse(missing_filename.exists())
+
+    def test_sqlite_output(self) -> None:
+        """An SQLite output score file is rejected and nothing is written."""
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+            json_filename = temp_dir / "scores.json"
+            write_score_file(json_filename, [])
+            merged_filename = temp_dir / "merged.db"
+            args = get_parser().parse_args(
+                [str(json_filename), "-o", str(merged_filename)]
+            )
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                self.assertEqual(1, main(args))
+            self.assertEqual(
+                "Error: output score file must be a JSON file, not "
+                f"'{merged_filename}'\n",
+                stderr.getvalue(),
+            )
+            self.assertFalse(merged_filename.exists())
@@ -0,0 +1,49 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import pstats
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from src.levelloader import LevelLoader
+from src.profiling import profile_session
+from src.util import TEST_LEVELS_DIR, UTF_8
+
+
+class TestProfiling(unittest.TestCase):
+    """Test session profiling."""
+
+    def test_profile_session(self) -> None:
+        """The profile is written even when the session ends with an interrupt."""
+        with TemporaryDirectory() as temp_dir_str:
+            stats_filename = Path(temp_dir_str) / "session.prof"
+            with self.assertRaises(KeyboardInterrupt):
+                with profile_session(stats_filename, trace_memory=True):
+                    LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+                    raise KeyboardInterrupt
+
+            stats = pstats.Stats(str(stats_filename))
+            self.assertGreater(stats.total_calls, 0)  # type: ignore[attr-defined]
+            self.assertIn(
+                "levelloader.py",
+                (Path(temp_dir_str) / "session.prof.txt").read_text(encoding=UTF_8),
+            )
+            self.assertTrue(
+                (Path(temp_dir_str) / "session.prof.memory.txt")
+                .read_text(encoding=UTF_8)
+                .strip()
+            )
+
+    def test_profile_session_without_memory(self) -> None:
+        """Memory is only traced when asked for."""
+        with TemporaryDirectory() as temp_dir_str:
+            stats_filename = Path(temp_dir_str) / "session.prof"
+            with profile_session(stats_filename):
+                pass
+            self.assertEqual(
+                ["session.prof", "session.prof.txt"],
+                sorted(path.name for path in Path(temp_dir_str).iterdir()),
+            )
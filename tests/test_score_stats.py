@@ -0,0 +1,73 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+
+from src.levelloader import LevelLoader
+from src.score_stats import PackStats, ScoreStats
+from src.score_tracking import ScoreRecord
+from src.util import TEST_LEVELS_DIR, RoguelikeSokobanError
+
+SIMPLE_LEVEL_FILENAME = TEST_LEVELS_DIR / "simple_level.txt"
+STANDARD_COLLECTION_FILENAME = TEST_LEVELS_DIR / "standard_collection.sok"
+
+
+class TestScoreStats(unittest.TestCase):
+    """Test score statistics."""
+
+    def test_score_stats(self) -> None:
+        """Test the ScoreStats queries."""
+        simple_level = LevelLoader(SIMPLE_LEVEL_FILENAME).get_level_key("Simple Level")
+        standard_level = LevelLoader(STANDARD_COLLECTION_FILENAME).get_level_key(
+            "Titled Level"
+        )
+        best_record = ScoreRecord(
+            simple_level.level_filename,
+            simple_level.level_name,
+            3,
+            "3r",
+            simple_level.content_hash,
+        )
+        legacy_record = ScoreRecord(
+            standard_level.level_filename, "Comment Title", 2, "rr"
+        )
+        other_record = ScoreRecord(
+            standard_level.level_filename, "Other Level", 5, None, "0" * 32
+        )
+        stats = ScoreStats(
+            [best_record._replace(score=4), best_record, legacy_record, other_record],
+            [SIMPLE_LEVEL_FILENAME, STANDARD_COLLECTION_FILENAME],
+            [best_record._replace(score=2)],
+        )
+
+        self.assertEqual(
+            [
+                PackStats(SIMPLE_LEVEL_FILENAME, 1, 1),
+                PackStats(STANDARD_COLLECTION_FILENAME, 2, 1),
+            ],
+            stats.pack_stats(),
+        )
+        self.assertEqual(0.5, stats.pack_stats()[1].completion)
+        self.assertEqual(
+            [legacy_record, best_record, other_record], stats.top_scores(10)
+        )
+        self.assertEqual([legacy_record], stats.top_scores(1))
+        self.assertEqual(
+            [legacy_record], stats.top_scores(10, STANDARD_COLLECTION_FILENAME)
+        )
+        self.assertEqual([standard_level], stats.unsolved_levels())
+        self.assertEqual([], stats.unsolved_levels(SIMPLE_LEVEL_FILENAME))
+
+        [score_gap] = stats.score_gaps()
+        self.assertEqual(best_record, score_gap.record)
+        self.assertEqual(1, score_gap.gap)
+
+    def test_unknown_level_file(self) -> None:
+        """Asking about a level file the stats weren't made with is an error."""
+        stats = ScoreStats([], [SIMPLE_LEVEL_FILENAME])
+        with self.assertRaises(RoguelikeSokobanError):
+            stats.top_scores(10, STANDARD_COLLECTION_FILENAME)
+        with self.assertRaises(RoguelikeSokobanError):
+            stats.unsolved_levels(STANDARD_COLLECTION_FILENAME)
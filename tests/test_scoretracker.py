@@ -4,56 +4,104 @@ Licensed under the GNU General Public License (GPL) v3.
 
 """
 import json
+import sqlite3
+import threading
+import time
 import unittest
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import Optional
 
-from src.score_tracking import Scores
-from src.util import UTF_8
+from src.levelloader import LevelKey
+from src.score_tracking import (
+    BufferedScores,
+    JournalScores,
+    ScoreRecord,
+    Scores,
+    SqliteScores,
+    flush_all_scores,
+    open_scores,
+    read_score_records,
+)
+from src.util import UTF_8, RoguelikeSokobanError
+
+
+class _SlowScores(Scores):
+    """Scores that wait for finish_saving before saving each score."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.saving = threading.Event()
+        self.finish_saving = threading.Event()
+        self.saved = False
+
+    def update_best_score(
+        self, level: LevelKey, score: int, solution: Optional[str] = None
+    ) -> None:
+        self.saving.set()
+        self.finish_saving.wait(5)
+        super().update_best_score(level, score, solution)
+        self.saved = True
 
 
 class TestScoreTracker(unittest.TestCase):
     """Test the score tracker."""
 
-    _filename: Path
-    _level_name: str
+    _level: LevelKey
+    _second_level: LevelKey
 
     @classmethod
     def setUpClass(cls) -> None:
-        cls._filename = Path("my_file")
-        cls._level_name = "my_level"
+        cls._level = LevelKey("1" * 32, Path("my_file"), "my_level")
+        cls._second_level = LevelKey("2" * 32, Path("my_file"), "my_level_2")
         return super().setUpClass()
 
+    @staticmethod
+    def _scores_data(*level_scores: tuple[LevelKey, int]) -> dict[str, object]:
+        """Return the expected score file contents for level_scores."""
+        return {
+            "version": 2,
+            "scores": {
+                level.content_hash: {
+                    "file": str(level.level_filename),
+                    "hash": level.content_hash,
+                    "level": level.level_name,
+                    "score": score,
+                }
+                for level, score in level_scores
+            },
+        }
+
     def test_set_get_score(self) -> None:
         """Test setting and getting scores."""
         scores = Scores()
-        self.assertEqual(scores.get_score(self._filename, self._level_name), None)
+        self.assertEqual(scores.get_score(self._level), None)
 
-        scores.set_score(self._filename, self._level_name, 1)
-        self.assertEqual(scores.get_score(self._filename, self._level_name), 1)
+        scores.set_score(self._level, 1)
+        self.assertEqual(scores.get_score(self._level), 1)
 
-        scores.set_score(self._filename, self._level_name, 2)
-        self.assertEqual(scores.get_score(self._filename, self._level_name), 2)
+        scores.set_score(self._level, 2)
+        self.assertEqual(scores.get_score(self._level), 2)
 
     def test_update_best_score(self) -> None:
         """Test simple update_best_score."""
         scores = Scores()
-        scores.update_best_score(self._filename, self._level_name, 10)
-        self.assertEqual(scores.get_score(self._filename, self._level_name), 10)
+        scores.update_best_score(self._level, 10)
+        self.assertEqual(scores.get_score(self._level), 10)
 
     def test_update_best_score_with_better_score(self) -> None:
         """Test update_best_score with a better score."""
         scores = Scores()
-        scores.update_best_score(self._filename, self._level_name, 10)
-        scores.update_best_score(self._filename, self._level_name, 5)
-        self.assertEqual(scores.get_score(self._filename, self._level_name), 5)
+        scores.update_best_score(self._level, 10)
+        scores.update_best_score(self._level, 5)
+        self.assertEqual(scores.get_score(self._level), 5)
 
     def test_update_best_score_with_worse_score(self) -> None:
         """Test update_best_score with a worse score."""
         scores = Scores()
-        scores.update_best_score(self._filename, self._level_name, 10)
-        scores.update_best_score(self._filename, self._level_name, 15)
-        self.assertEqual(scores.get_score(self._filename, self._level_name), 10)
+        scores.update_best_score(self._level, 10)
+        scores.update_best_score(self._level, 15)
+        self.assertEqual(scores.get_score(self._level), 10)
 
     def test_update_best_score_file(self) -> None:
         """Test update_best_score when writing to a file."""
@@ -61,21 +109,384 @@ class TestScoreTracker(unittest.TestCase):
             filename = Path(temp_dir_str) / "test_scores.json"
             scores = Scores(filename)
 
-            scores.update_best_score(filename, self._level_name, 10)
+            scores.update_best_score(self._level, 10)
             with filename.open(encoding=UTF_8) as file:
                 scores_data = json.load(file)
-            self.assertEqual({str(filename): {self._level_name: 10}}, scores_data)
+            self.assertEqual(self._scores_data((self._level, 10)), scores_data)
 
-            scores.update_best_score(filename, self._level_name, 5)
+            scores.update_best_score(self._level, 5)
             with filename.open(encoding=UTF_8) as file:
                 scores_data = json.load(file)
-            self.assertEqual({str(filename): {self._level_name: 5}}, scores_data)
+            self.assertEqual(self._scores_data((self._level, 5)), scores_data)
 
-            second_level_name = self._level_name + "x"
-            scores.update_best_score(filename, second_level_name, 15)
+            scores.update_best_score(self._second_level, 15)
             with filename.open(encoding=UTF_8) as file:
                 scores_data = json.load(file)
             self.assertEqual(
-                {str(filename): {second_level_name: 15, self._level_name: 5}},
+                self._scores_data((self._level, 5), (self._second_level, 15)),
                 scores_data,
             )
+
+    def test_journal_scores(self) -> None:
+        """Test that JournalScores saves scores to a journal and replays it."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            journal_filename = Path(temp_dir_str) / "test_scores.json.journal"
+            scores = JournalScores(filename)
+
+            scores.update_best_score(self._level, 10)
+            scores.update_best_score(self._level, 5)
+            scores.update_best_score(self._level, 15)
+            self.assertFalse(filename.exists())
+            self.assertEqual(
+                2, len(journal_filename.read_text(encoding=UTF_8).splitlines())
+            )
+
+            scores = JournalScores(filename)
+            self.assertEqual(5, scores.get_score(self._level))
+
+    def test_journal_scores_compact(self) -> None:
+        """Test that the journal is folded into the score file."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            journal_filename = Path(temp_dir_str) / "test_scores.json.journal"
+            scores = JournalScores(filename, compact_after=2)
+
+            scores.update_best_score(self._level, 10)
+            scores.update_best_score(self._level, 5)
+            self.assertEqual("", journal_filename.read_text(encoding=UTF_8))
+            with filename.open(encoding=UTF_8) as file:
+                scores_data = json.load(file)
+            self.assertEqual(self._scores_data((self._level, 5)), scores_data)
+
+            scores.update_best_score(self._level, 4)
+            scores = JournalScores(filename)
+            self.assertEqual(4, scores.get_score(self._level))
+
+    def test_journal_scores_shared(self) -> None:
+        """Test that folding the journal keeps scores saved by other games."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            scores = JournalScores(filename)
+            other_scores = JournalScores(filename)
+            scores.update_best_score(self._level, 10)
+            other_scores.update_best_score(self._level, 8)
+            other_scores.update_best_score(self._second_level, 15)
+            other_scores.compact()
+            scores.update_best_score(self._second_level, 20)
+
+            scores.compact()
+            self.assertEqual([], list(Path(temp_dir_str).glob("*.tmp")))
+            scores = JournalScores(filename)
+            self.assertEqual(8, scores.get_score(self._level))
+            self.assertEqual(15, scores.get_score(self._second_level))
+
+    def test_journal_scores_partial_record(self) -> None:
+        """Test that a partial last journal record from a crash is dropped."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            journal_filename = Path(temp_dir_str) / "test_scores.json.journal"
+            scores = JournalScores(filename)
+            scores.update_best_score(self._level, 10)
+            with journal_filename.open(mode="a", encoding=UTF_8) as file:
+                file.write('{"file": ')
+
+            scores = JournalScores(filename)
+            self.assertEqual(10, scores.get_score(self._level))
+            scores.update_best_score(self._level, 5)
+            scores = JournalScores(filename)
+            self.assertEqual(5, scores.get_score(self._level))
+
+    def test_sqlite_scores(self) -> None:
+        """Test SqliteScores, including two games sharing a database."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.db"
+            scores = open_scores(filename)
+            other_scores = open_scores(filename)
+            assert isinstance(scores, SqliteScores)
+            assert isinstance(other_scores, SqliteScores)
+            try:
+                self.assertIsNone(scores.get_score(self._level))
+                scores.update_best_score(self._level, 10)
+                other_scores.update_best_score(self._level, 8)
+                scores.update_best_score(self._level, 9)
+                self.assertEqual(8, scores.get_score(self._level))
+
+                scores.set_score(self._level, 12)
+                self.assertEqual(
+                    12, other_scores.get_score(self._level)
+                )
+            finally:
+                scores.close()
+                other_scores.close()
+
+    def test_open_scores(self) -> None:
+        """Test that open_scores picks the storage from the file suffix."""
+        with TemporaryDirectory() as temp_dir_str:
+            self.assertIsInstance(
+                open_scores(Path(temp_dir_str) / "scores.json"), JournalScores
+            )
+
+    def test_buffered_scores(self) -> None:
+        """Test that BufferedScores saves scores in batches."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            scores = BufferedScores(Scores(filename), flush_after=2, flush_interval=60)
+            try:
+                scores.update_best_score(self._level, 10)
+                scores.update_best_score(self._level, 5)
+                self.assertEqual(5, scores.get_score(self._level))
+                self.assertFalse(filename.exists())
+
+                scores.update_best_score(self._second_level, 15)
+                self.assertEqual(
+                    5, Scores(filename).get_score(self._level)
+                )
+
+                scores.update_best_score(self._level, 4)
+                flush_all_scores()
+                self.assertEqual(
+                    4, Scores(filename).get_score(self._level)
+                )
+            finally:
+                scores.close()
+
+    def test_buffered_scores_slow_save(self) -> None:
+        """Test that BufferedScores doesn't wait for a slow save in progress."""
+        saved_scores = _SlowScores()
+        scores = BufferedScores(saved_scores, flush_interval=60)
+        flusher = threading.Thread(target=scores.flush)
+        try:
+            scores.update_best_score(self._level, 10)
+            flusher.start()
+            self.assertTrue(saved_scores.saving.wait(5))
+
+            scores.update_best_score(self._second_level, 15)
+            self.assertEqual(10, scores.get_score(self._level))
+            self.assertEqual(15, scores.get_score(self._second_level))
+            self.assertFalse(saved_scores.saved)
+        finally:
+            saved_scores.finish_saving.set()
+            flusher.join()
+            scores.close()
+        self.assertEqual(10, saved_scores.get_score(self._level))
+        self.assertEqual(15, saved_scores.get_score(self._second_level))
+
+    def test_buffered_scores_timer(self) -> None:
+        """Test that BufferedScores saves scores from its background thread."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            scores = BufferedScores(Scores(filename), flush_interval=0.01)
+            try:
+                scores.update_best_score(self._level, 10)
+                for _ in range(500):
+                    if filename.exists():
+                        break
+                    time.sleep(0.01)
+                self.assertEqual(
+                    10, Scores(filename).get_score(self._level)
+                )
+            finally:
+                scores.close()
+
+    def test_solutions(self) -> None:
+        """Test that solutions are saved with best scores."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            db_filename = Path(temp_dir_str) / "test_scores.db"
+            sqlite_scores = SqliteScores(db_filename)
+            try:
+                for scores in (
+                    Scores(filename),
+                    JournalScores(filename),
+                    sqlite_scores,
+                    BufferedScores(Scores()),
+                ):
+                    scores.update_best_score(self._level, 10, "9r")
+                    scores.update_best_score(self._level, 8, "8r")
+                    scores.update_best_score(self._level, 9, "9r")
+                    self.assertEqual(
+                        "8r", scores.get_solution(self._level)
+                    )
+                    record = ScoreRecord(
+                        self._level.level_filename,
+                        self._level.level_name,
+                        8,
+                        "8r",
+                        self._level.content_hash,
+                    )
+                    self.assertEqual([record], list(scores.all_scores()))
+            finally:
+                sqlite_scores.close()
+
+            with filename.open(encoding=UTF_8) as file:
+                scores_data = json.load(file)
+            self.assertEqual(
+                "8r", scores_data["scores"][self._level.content_hash]["solution"]
+            )
+
+    def test_scores_follow_level_content(self) -> None:
+        """Test that scores are found by content hash wherever the level file is."""
+        scores = Scores()
+        scores.update_best_score(self._level, 10)
+        moved_level = self._level._replace(level_filename=Path("moved/my_file"))
+        self.assertEqual(10, scores.get_score(moved_level))
+        changed_level = self._level._replace(content_hash="3" * 32)
+        self.assertIsNone(scores.get_score(changed_level))
+
+    def test_legacy_scores(self) -> None:
+        """Test that scores saved by level file path are moved to content hashes."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.json"
+            filename.write_text(
+                json.dumps(
+                    {
+                        str(self._level.level_filename): {
+                            self._level.level_name: {"score": 8, "solution": "8r"},
+                            self._second_level.level_name: 15,
+                        }
+                    }
+                ),
+                encoding=UTF_8,
+            )
+            scores = Scores(filename)
+            self.assertEqual(8, scores.get_score(self._level))
+            self.assertEqual("8r", scores.get_solution(self._level))
+            scores.update_best_score(self._level, 7)
+
+            scores = Scores(filename)
+            self.assertEqual(2, len(list(scores.all_scores())))
+            self.assertEqual(7, scores.get_score(self._level))
+            self.assertEqual(15, scores.get_score(self._second_level))
+
+    def test_legacy_sqlite_scores(self) -> None:
+        """Test that SqliteScores moves scores saved by level file path."""
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.db"
+            connection = sqlite3.connect(filename)
+            connection.execute(
+                "CREATE TABLE scores (level_file TEXT, level_name TEXT, "
+                "score INTEGER, PRIMARY KEY (level_file, level_name))"
+            )
+            connection.execute(
+                "INSERT INTO scores VALUES (?, ?, ?)",
+                (str(self._level.level_filename), self._level.level_name, 8),
+            )
+            connection.commit()
+            connection.close()
+
+            scores = SqliteScores(filename)
+            try:
+                legacy_record = ScoreRecord(
+                    self._level.level_filename, self._level.level_name, 8
+                )
+                self.assertEqual([legacy_record], list(scores.all_scores()))
+                self.assertEqual(8, scores.get_score(self._level))
+                self.assertEqual(
+                    [self._level.content_hash],
+                    [record.content_hash for record in scores.all_scores()],
+                )
+            finally:
+                scores.close()
+
+    def test_legacy_sqlite_lookups_read_only(self) -> None:
+        """Test that looking up unscored levels doesn't lock a database for writing."""
+        unscored_level = LevelKey("3" * 32, Path("my_file"), "unscored")
+        with TemporaryDirectory() as temp_dir_str:
+            filename = Path(temp_dir_str) / "test_scores.db"
+            connection = sqlite3.connect(filename)
+            connection.execute(
+                "CREATE TABLE scores (level_file TEXT, level_name TEXT, "
+                "score INTEGER, solution TEXT, PRIMARY KEY (level_file, level_name))"
+            )
+            for level, score in ((self._level, 8), (self._second_level, 9)):
+                connection.execute(
+                    "INSERT INTO scores VALUES (?, ?, ?, NULL)",
+                    (str(level.level_filename), level.level_name, score),
+                )
+            connection.commit()
+            connection.close()
+
+            scores = SqliteScores(filename)
+            statements: list[str] = []
+            # pylint: disable=protected-access
+            scores._connection.set_trace_callback(statements.append)
+            try:
+                self.assertEqual(8, scores.get_score(self._level))
+                self.assertIn("BEGIN IMMEDIATE", statements)
+
+                # The second level's score hasn't been moved yet.
+                statements.clear()
+                self.assertIsNone(scores.get_score(unscored_level))
+                self.assertEqual(
+                    [], [sql for sql in statements if not sql.startswith("SELECT")]
+                )
+
+                # Moving the last score drops the old table.
+                self.assertEqual(9, scores.get_score(self._second_level))
+                statements.clear()
+                self.assertIsNone(scores.get_score(unscored_level))
+                self.assertEqual(1, len(statements))
+                self.assertNotIn("FROM scores", statements[0])
+            finally:
+                scores.close()
+
+            connection = sqlite3.connect(filename)
+            tables = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+            connection.close()
+            self.assertEqual([("level_scores",)], tables)
+
+    def test_read_score_records(self) -> None:
+        """Test that score files are read without being changed or created."""
+        with TemporaryDirectory() as temp_dir_str:
+            temp_dir = Path(temp_dir_str)
+
+            filename = temp_dir / "test_scores.json"
+            journal_filename = temp_dir / "test_scores.json.journal"
+            scores = JournalScores(filename)
+            scores.update_best_score(self._level, 10)
+            scores.update_best_score(self._second_level, 15)
+            with journal_filename.open(mode="a", encoding=UTF_8) as file:
+                file.write('{"file": ')
+            journal = journal_filename.read_bytes()
+            self.assertEqual(
+                [10, 15], [record.score for record in read_score_records(filename)]
+            )
+            self.assertFalse(filename.exists())
+            self.assertEqual(journal, journal_filename.read_bytes())
+
+            db_filename = temp_dir / "test_scores.db"
+            db_scores = SqliteScores(db_filename)
+            db_scores.update_best_score(self._level, 8, "8r")
+            db_scores.close()
+            self.assertEqual(
+                [(8, "8r")],
+                [record[2:4] for record in read_score_records(db_filename)],
+            )
+
+            legacy_filename = temp_dir / "legacy_scores.db"
+            connection = sqlite3.connect(legacy_filename)
+            connection.execute(
+                "CREATE TABLE scores (level_file TEXT, level_name TEXT, "
+                "score INTEGER, PRIMARY KEY (level_file, level_name))"
+            )
+            connection.execute("INSERT INTO scores VALUES ('my_file', 'my_level', 3)")
+            connection.commit()
+            connection.close()
+            self.assertEqual(
+                [ScoreRecord(Path("my_file"), "my_level", 3)],
+                read_score_records(legacy_filename),
+            )
+            connection = sqlite3.connect(legacy_filename)
+            tables = connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall()
+            connection.close()
+            self.assertEqual([("scores",)], tables)
+
+            for missing_filename in ("missing.json", "missing.db"):
+                with self.assertRaisesRegex(RoguelikeSokobanError, "not found"):
+                    read_score_records(temp_dir / missing_filename)
+                self.assertFalse((temp_dir / missing_filename).exists())
@@ -0,0 +1,173 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import asyncio
+import contextlib
+import unittest
+from typing import Optional
+
+from src.levelloader import LevelLoader
+from src.server import (
+    KEY_ENTER,
+    KEY_LEFT,
+    KEY_RIGHT,
+    KEY_UP,
+    GameServer,
+    _InputDecoder,
+    render_level,
+)
+from src.universe import Universe
+from src.util import TEST_LEVELS_DIR, Action
+
+RIGHT_ARROW = b"\x1b[C"
+
+
+async def _read_until(reader: asyncio.StreamReader, text: bytes) -> bytes:
+    """Read from reader until text has been read."""
+    return await asyncio.wait_for(reader.readuntil(text), 5)
+
+
+class TestInputDecoder(unittest.TestCase):
+    """Test turning client bytes into keys."""
+
+    def test_keys(self) -> None:
+        """Arrow keys, enter and characters are decoded, split or not."""
+        decoder = _InputDecoder()
+        self.assertEqual(
+            decoder.feed(b"\x1b[A\x1bOD7\r\n\r\x00q"),
+            [KEY_UP, KEY_LEFT, "7", KEY_ENTER, KEY_ENTER, "q"],
+        )
+        self.assertEqual(decoder.feed(b"\x1b"), [])
+        self.assertEqual(decoder.feed(b"["), [])
+        self.assertEqual(decoder.feed(b"Cr"), [KEY_RIGHT, "r"])
+
+    def test_telnet(self) -> None:
+        """Telnet commands are skipped and window sizes are read."""
+        decoder = _InputDecoder()
+        naws = b"\xff\xfa\x1f\x00\x50\x00\x18\xff\xf0"
+        self.assertEqual(decoder.feed(b"\xff\xfb\x1f" + naws[:4]), [])
+        self.assertEqual(decoder.feed(naws[4:] + b"q"), ["q"])
+        self.assertEqual(decoder.window_size, (24, 80))
+        self.assertEqual(decoder.feed(b"\xff\xfa\x1f\x00\x0a\x00\x05\xff\xf0"), [])
+        self.assertEqual(decoder.window_size, (5, 10))
+
+
+class TestRenderLevel(unittest.TestCase):
+    """Test drawing levels as text."""
+
+    def setUp(self) -> None:
+        loader = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+        level_map = loader.levels["Simple Level"]
+        self.univ = Universe("Simple Level", level_map, loader.symbols)
+
+    def test_whole_level(self) -> None:
+        """Levels that fit are drawn whole, with the player in reverse video."""
+        self.assertEqual(
+            render_level(self.univ, 10, 10),
+            ["       ", " ..... ", " \x1b[7m@\x1b[0m.0.^ ", " ..... ", "       "],
+        )
+
+    def test_viewport(self) -> None:
+        """Only the part of the level around the player is drawn if it doesn't fit."""
+        self.univ.eval_action(Action.RIGHT)
+        self.univ.eval_action(Action.RIGHT)
+        self.assertEqual(render_level(self.univ, 1, 3), [".\x1b[7m@\x1b[0m0"])
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    """Test serving games over sockets."""
+
+    async def asyncSetUp(self) -> None:
+        self._game_server: Optional[GameServer] = None
+        self._server: Optional[asyncio.Server] = None
+        self._writers: list[asyncio.StreamWriter] = []
+
+    async def asyncTearDown(self) -> None:
+        for writer in self._writers:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+        if self._game_server is not None:
+            await asyncio.wait_for(self._game_server.wait_closed(), 5)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _start(self, game_server: GameServer) -> int:
+        """Start game_server, to be stopped after the test, and return its port."""
+        self._game_server = game_server
+        self._server = await game_server.start("127.0.0.1", 0)
+        port: int = self._server.sockets[0].getsockname()[1]
+        return port
+
+    async def _connect(
+        self, port: int
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Connect to the server on port, to be disconnected after the test."""
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        self._writers.append(writer)
+        return reader, writer
+
+    async def test_sessions(self) -> None:
+        """Several players play their own games at once."""
+
+        async def play(port: int) -> bytes:
+            reader, writer = await self._connect(port)
+            await _read_until(reader, b"Moves used: 0")
+            writer.write(RIGHT_ARROW * 3)
+            screen = await _read_until(reader, b"Congratulations!")
+            writer.write(b"q")
+            await _read_until(reader, b"Thanks for playing!\r\n")
+            self.assertEqual(await asyncio.wait_for(reader.read(), 5), b"")
+            return screen
+
+        game_server = GameServer(LevelLoader(TEST_LEVELS_DIR / "simple_level.txt"))
+        port = await self._start(game_server)
+        screens = await asyncio.gather(*(play(port) for _ in range(5)))
+        await asyncio.wait_for(game_server.wait_closed(), 5)
+        self.assertEqual(game_server.sessions, 0)
+        for screen in screens:
+            self.assertIn(b"You solved the puzzle in 3 moves!", screen)
+
+    async def test_choose_level(self) -> None:
+        """Players choose a level by number when there are several."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "standard_collection.sok")
+        port = await self._start(GameServer(loader))
+        reader, writer = await self._connect(port)
+        await _read_until(reader, b"quit: ")
+        writer.write(b"x\r\n")
+        await _read_until(reader, b"Invalid choice: 'x'")
+        writer.write(b"2\r\n")
+        screen = await _read_until(reader, b"Moves used: 0")
+        level_name = list(loader.levels)[1]
+        self.assertIn(f"Level: {level_name}".encode(), screen)
+
+    async def test_server_full(self) -> None:
+        """Players are turned away when the server is full."""
+        loader = LevelLoader(TEST_LEVELS_DIR / "simple_level.txt")
+        port = await self._start(GameServer(loader, max_sessions=1))
+        reader, _ = await self._connect(port)
+        await _read_until(reader, b"Moves used: 0")
+        second_reader, _ = await self._connect(port)
+        self.assertEqual(
+            await asyncio.wait_for(second_reader.read(), 5),
+            b"The server is full, please try again later.\r\n",
+        )
+
+    async def test_shutdown(self) -> None:
+        """Sessions still running when the server shuts down end quietly."""
+        game_server = GameServer(LevelLoader(TEST_LEVELS_DIR / "simple_level.txt"))
+        port = await self._start(game_server)
+        reader, _ = await self._connect(port)
+        await _read_until(reader, b"Moves used: 0")
+        # pylint: disable=protected-access
+        self.assertEqual(len(game_server._handlers), 1)
+        handler = next(iter(game_server._handlers))
+        handler.cancel()
+        await asyncio.wait_for(game_server.wait_closed(), 5)
+        self.assertFalse(handler.cancelled())
+        await asyncio.wait_for(reader.read(), 5)
+        self.assertTrue(reader.at_eof())
+        self.assertEqual(game_server.sessions, 0)
@@ -0,0 +1,86 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import unittest
+
+from src.levelloader import LevelLoader
+from src.score_tracking import ScoreRecord
+from src.solutions import decode_moves, encode_moves, verify_solutions
+from src.universe import Universe
+from src.util import TEST_LEVELS_DIR, Action, RoguelikeSokobanError
+
+SIMPLE_LEVEL_FILENAME = TEST_LEVELS_DIR / "simple_level.txt"
+SIMPLE_LEVEL_NAME = "Simple Level"
+
+
+class TestSolutions(unittest.TestCase):
+    """Test solution strings and verifying them."""
+
+    def test_encode_decode_moves(self) -> None:
+        """Test encode_moves and decode_moves."""
+        actions = [Action.RIGHT] * 3 + [Action.UP, Action.LEFT] + [Action.DOWN] * 12
+        self.assertEqual("3rul12d", encode_moves(actions))
+        self.assertEqual(actions, decode_moves("3rul12d"))
+        self.assertEqual(actions, decode_moves("3RUl12D"))
+        self.assertEqual("", encode_moves([]))
+
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            decode_moves("3x")
+        self.assertEqual("invalid solution: '3x'", str(context.exception))
+
+        self.assertEqual(actions, decode_moves("3rul12d", 17))
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            decode_moves("3rul999999999999d", 17)
+        self.assertEqual("solution has more than 17 moves", str(context.exception))
+        with self.assertRaises(RoguelikeSokobanError) as context:
+            decode_moves("9" * 5000 + "d", 17)
+        self.assertEqual("invalid solution: run too long", str(context.exception))
+
+    def test_actions_taken(self) -> None:
+        """Only actions that move the player are recorded."""
+        loader = LevelLoader(SIMPLE_LEVEL_FILENAME)
+        univ = Universe(
+            SIMPLE_LEVEL_NAME, loader.levels[SIMPLE_LEVEL_NAME], loader.symbols
+        )
+        for act in (Action.LEFT, Action.RIGHT, Action.RIGHT, Action.RIGHT):
+            univ.eval_action(act)
+        self.assertTrue(univ.game_won)
+        self.assertEqual("3r", encode_moves(univ.actions_taken))
+
+    def test_verify_solutions(self) -> None:
+        """Test verify_solutions."""
+        missing_file = TEST_LEVELS_DIR / "missing.txt"
+        level_key = LevelLoader(SIMPLE_LEVEL_FILENAME).get_level_key(SIMPLE_LEVEL_NAME)
+        records = [
+            ScoreRecord(
+                SIMPLE_LEVEL_FILENAME,
+                SIMPLE_LEVEL_NAME,
+                3,
+                "3r",
+                level_key.content_hash,
+            ),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 3, "3r"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 2, "3r"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 4, "3rl"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 2, "2r"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 3, "999999999999r"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 3),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, "Missing Level", 3, "3r"),
+            ScoreRecord(missing_file, SIMPLE_LEVEL_NAME, 3, "3r"),
+            ScoreRecord(SIMPLE_LEVEL_FILENAME, SIMPLE_LEVEL_NAME, 3, "3r", "0" * 32),
+        ]
+        self.assertCountEqual(
+            [
+                "solution has more than 2 moves",
+                "solution has more than 3 moves",
+                "solved after 3 of 4 moves",
+                "not solved",
+                "no solution saved",
+                "level not found",
+                "level file can't be loaded",
+                "level changed since the score was set",
+            ],
+            [problem.problem for problem in verify_solutions(records)],
+        )
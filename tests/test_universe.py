@@ -0,0 +1,93 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Licensed under the GNU General Public License (GPL) v3.
+
+"""
+import copy
+import unittest
+
+from fuzz_universe import get_state, make_case
+from src.sokoban_format import RL_SYMBOLS
+from src.universe import ACTION_BITS, LegalActions, Universe
+from src.util import Action
+
+PUSH_LEVEL = (
+    "------",
+    "|^0@.|",
+    "|..0.|",
+    "|.^..|",
+    "------",
+)
+
+
+class TestUniverse(unittest.TestCase):
+    """Test the game universe."""
+
+    def test_legal_actions(self) -> None:
+        """Moves, pushes and pit fills are reported for each direction."""
+        univ = Universe("Push level", PUSH_LEVEL, RL_SYMBOLS)
+        left, right, down = (
+            ACTION_BITS[Action.LEFT],
+            ACTION_BITS[Action.RIGHT],
+            ACTION_BITS[Action.DOWN],
+        )
+        self.assertEqual(
+            LegalActions(left | right | down, left | down, left), univ.legal_actions()
+        )
+
+        univ.eval_action(Action.UP)
+        self.assertEqual(0, univ.moves_taken)
+        univ.eval_action(Action.LEFT)
+        self.assertEqual(1, univ.pits_remaining)
+        self.assertEqual(LegalActions(left | right | down, 0, 0), univ.legal_actions())
+
+    def test_legal_actions_match_moves(self) -> None:
+        """legal_actions agrees with what eval_action does in random levels."""
+        for seed in range(100):
+            case = make_case(seed, 30)
+            univ = Universe("Random level", case.level_map, RL_SYMBOLS)
+            for act in case.actions:
+                legal = univ.legal_actions()
+                for trial_act, bit in ACTION_BITS.items():
+                    trial = copy.deepcopy(univ)
+                    trial.eval_action(trial_act)
+                    boulders = {(b.curr_y, b.curr_x) for b in univ.boulders}
+                    trial_boulders = {(b.curr_y, b.curr_x) for b in trial.boulders}
+                    self.assertEqual(
+                        (
+                            trial.moves_taken != univ.moves_taken,
+                            trial_boulders != boulders,
+                            trial.pits_remaining != univ.pits_remaining,
+                        ),
+                        (
+                            bool(legal.moves & bit),
+                            bool(legal.pushes & bit),
+                            bool(legal.fills & bit),
+                        ),
+                    )
+                univ.eval_action(act)
+
+    def test_fork(self) -> None:
+        """Forks and their parents play on without changing each other."""
+        for seed in range(100):
+            case = make_case(seed, 60)
+            univ = Universe("Random level", case.level_map, RL_SYMBOLS)
+            half = len(case.actions) // 2
+            for act in case.actions[:half]:
+                univ.eval_action(act)
+            expected_parent = copy.deepcopy(univ)
+            expected_child = copy.deepcopy(univ)
+            child = univ.fork()
+            grandchild = child.snapshot()
+            expected_grandchild = copy.deepcopy(child)
+            for act in case.actions[half:]:
+                univ.eval_action(act)
+                expected_parent.eval_action(act)
+            for act in reversed(case.actions):
+                child.eval_action(act)
+                expected_child.eval_action(act)
+            self.assertEqual(get_state(expected_parent), get_state(univ))
+            self.assertEqual(get_state(expected_child), get_state(child))
+            self.assertEqual(get_state(expected_grandchild), get_state(grandchild))
+            self.assertEqual(expected_parent.actions_taken, univ.actions_taken)
+            self.assertEqual(expected_child.actions_taken, child.actions_taken)
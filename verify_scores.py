@@ -0,0 +1,58 @@
+"""
+Copyright Jeremy Nation <jeremy@jeremynation.me>.
+Released under the GPLv3. See included LICENSE file.
+
+Script that checks best scores by replaying their saved solutions.
+
+Each best score is saved with the moves that set it. This script replays those moves
+against the current level files and reports best scores that they don't back up,
+for example because the score was edited by hand or the level has changed since.
+See src/solutions.py for details.
+
+The exit status is nonzero if any best score has a problem.
+
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from src.score_tracking import read_score_records
+from src.solutions import verify_solutions
+from src.util import SCORES_FILENAME, RoguelikeSokobanError
+
+
+def main(args: argparse.Namespace) -> int:
+    """Main function for script."""
+    try:
+        records = read_score_records(args.scores_filename)
+    except RoguelikeSokobanError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    problems = verify_solutions(records)
+    for record, problem in problems:
+        print(
+            f"{record.level_filename}: {record.level_name}: "
+            f"score {record.score}: {problem}"
+        )
+    print(f"{len(records) - len(problems)} of {len(records)} best scores verified")
+    return 1 if problems else 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """Get the argparse parser."""
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "scores_filename",
+        default=SCORES_FILENAME,
+        help="score file to check",
+        metavar="scores-file",
+        nargs="?",
+        type=Path,
+    )
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(get_parser().parse_args()))